@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+"""
+Delta Reconciliation Against the Previous Fetch
+
+The Plaid, Yapily, YAXI and Flinks scrapers used to match and reconcile their
+full institution list on every run, although only a few institutions change
+from one day to the next. Each of them now keeps a snapshot of what it
+fetched, one normalized record per institution (the fields reconciliation
+uses), in scraped-data/<aggregator>/snapshot.jsonl.zst (snapshot.jsonl.gz
+without the zstandard package). On the next run:
+
+- the previous snapshot is loaded into a dict keyed on the institution ID,
+  and every fetched institution is looked up in it (a hash join): it is
+  added (new ID), changed (different record) or unchanged
+- only added and changed institutions are passed on to be matched and
+  reconciled; IDs of the previous snapshot that were not fetched again are
+  removed, and only reported (scrapers never take an aggregator off a
+  provider)
+- the delta is printed and, once the plan was executed, saved to
+  scraped-data/<aggregator>/delta.json together with the new snapshot;
+  institutions that were not applied (fuzzy matches only reported, or
+  provider files that could not be updated; see ReconcilePlan.unapplied()
+  in provider_reconcile.py) are left out of it with forget(), so the next
+  run passes them on again
+
+Without a previous snapshot, or with --full (e.g. after provider files were
+edited by hand), every institution is reconciled; the delta is still
+reported. Dry runs save nothing.
+
+Usage:
+    from aggregator_snapshot import AggregatorSnapshot
+
+    snapshot = AggregatorSnapshot("plaid", path, key=lambda i: i["institution_id"],
+                                  normalize=lambda i: {"name": i["name"], ...})
+    plan, mappings = plan_bank_providers(snapshot.delta(institutions), index)
+    snapshot.print_report()
+    if not dry_run:
+        plan.execute()
+        snapshot.save()
+"""
+
+import gzip
+import json
+from pathlib import Path
+from typing import Callable, Iterable, Iterator, Optional
+
+from json_writer import save_json, write_if_changed
+
+HAS_ZSTANDARD = False
+try:
+    import zstandard
+    HAS_ZSTANDARD = True
+except ImportError:
+    pass
+
+BASE_PATH = Path(__file__).parent.parent
+SCRAPED_DATA_PATH = BASE_PATH / "scraped-data"
+
+SNAPSHOT_NAME = "snapshot.jsonl"
+DELTA_REPORT_NAME = "delta.json"
+ZSTD_LEVEL = 10
+
+# Institutions listed per kind of change in the printed report
+REPORT_LIMIT = 20
+
+
+def encode_record(record: dict) -> bytes:
+    """One snapshot line: the record as compact JSON with sorted keys."""
+    return json.dumps(record, sort_keys=True, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+
+def _compress(content: bytes) -> tuple[str, bytes]:
+    """File suffix and compressed content (zstandard if installed, else gzip)."""
+    if HAS_ZSTANDARD:
+        return ".zst", zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(content)
+    # mtime=0 keeps the output identical for identical snapshots
+    return ".gz", gzip.compress(content, mtime=0)
+
+
+def _read_snapshot(path: Path) -> Optional[bytes]:
+    """Decompressed content of the snapshot in a directory (None if there is none)."""
+    zst_file = path / f"{SNAPSHOT_NAME}.zst"
+    gz_file = path / f"{SNAPSHOT_NAME}.gz"
+    if zst_file.exists():
+        if HAS_ZSTANDARD:
+            with open(zst_file, "rb") as f:
+                return zstandard.ZstdDecompressor().stream_reader(f).read()
+        if not gz_file.exists():
+            print(f"  Warning: {zst_file} needs the zstandard package, reconciling every institution")
+            return None
+    if gz_file.exists():
+        with gzip.open(gz_file, "rb") as f:
+            return f.read()
+    return None
+
+
+class AggregatorSnapshot:
+    """
+    The institutions of an aggregator's previous run, and the delta of this one.
+
+    Args:
+        aggregator: Aggregator ID, used in the report
+        path: Directory of the snapshot and delta report
+        key: Returns an institution's ID
+        normalize: Returns the record of an institution to store and compare
+            (with a "name", used in the report)
+        full: Pass every institution on, not only the changed ones
+    """
+
+    def __init__(self, aggregator: str, path: Path, key: Callable[[dict], object],
+                 normalize: Callable[[dict], dict], full: bool = False):
+        self.aggregator = aggregator
+        self.path = Path(path)
+        self.key = key
+        self.normalize = normalize
+        self.full = full
+        self.added: list[str] = []
+        self.changed: list[str] = []
+        self.unchanged = 0
+        # Institutions fetched more than once (e.g. Plaid lists one in every country)
+        self.repeated = 0
+        self._current: dict[str, bytes] = {}
+        self._passed: set[str] = set()
+        self._forgotten: set[str] = set()
+
+        content = _read_snapshot(self.path)
+        self.has_previous = content is not None
+        self._previous: dict[str, bytes] = {}
+        for line in (content or b"").splitlines():
+            if line:
+                self._previous[json.loads(line)["_id"]] = line
+
+    def delta(self, institutions: Iterable[dict]) -> Iterator[dict]:
+        """
+        Yield the institutions to reconcile: the added and changed ones (all with full).
+
+        May be called several times (e.g. once per country); the removed
+        institutions are known once every call was consumed.
+        """
+        for institution in institutions:
+            institution_id = str(self.key(institution))
+            if institution_id in self._current:
+                # Decided on the first occurrence
+                self.repeated += 1
+                if institution_id in self._passed:
+                    yield institution
+                continue
+
+            line = encode_record({"_id": institution_id, **self.normalize(institution)})
+            self._current[institution_id] = line
+            previous = self._previous.get(institution_id)
+            if previous is None:
+                self.added.append(institution_id)
+            elif previous != line:
+                self.changed.append(institution_id)
+            else:
+                self.unchanged += 1
+                if not self.full:
+                    continue
+            self._passed.add(institution_id)
+            yield institution
+
+    def forget(self, institutions: Iterable[dict]) -> None:
+        """Leave institutions out of the saved snapshot, so the next run passes them on again."""
+        for institution in institutions:
+            self._forgotten.add(str(self.key(institution)))
+
+    @property
+    def removed(self) -> list[str]:
+        """IDs of the previous snapshot that were not fetched in this run."""
+        return sorted(self._previous.keys() - self._current.keys())
+
+    def _record(self, institution_id: str, previous: bool = False) -> dict:
+        line = (self._previous if previous else self._current)[institution_id]
+        return json.loads(line)
+
+    def _changed_fields(self, institution_id: str) -> list[str]:
+        before = self._record(institution_id, previous=True)
+        after = self._record(institution_id)
+        return sorted(field for field in before.keys() | after.keys() if before.get(field) != after.get(field))
+
+    def report(self) -> dict:
+        """The delta of this run, as saved to delta.json."""
+        return {
+            "aggregator": self.aggregator,
+            "previous": len(self._previous) if self.has_previous else None,
+            "fetched": len(self._current),
+            "unchanged": self.unchanged,
+            "added": [{"id": i, "name": self._record(i).get("name")} for i in self.added],
+            "changed": [{"id": i, "name": self._record(i).get("name"), "fields": self._changed_fields(i)}
+                        for i in self.changed],
+            "removed": [{"id": i, "name": self._record(i, previous=True).get("name")} for i in self.removed],
+        }
+
+    def print_report(self) -> None:
+        """Print the delta (the first REPORT_LIMIT institutions of each kind)."""
+        report = self.report()
+        if not self.has_previous:
+            print(f"\nNo previous {self.aggregator} snapshot: reconciling all {report['fetched']} institutions")
+            return
+        mode = "all reconciled (--full)" if self.full else "only added and changed reconciled"
+        print(f"\nDelta against the previous {self.aggregator} snapshot ({report['previous']} institutions): "
+              f"{len(report['added'])} added, {len(report['changed'])} changed, "
+              f"{len(report['removed'])} removed, {report['unchanged']} unchanged; {mode}")
+        for kind in ("added", "changed", "removed"):
+            for entry in report[kind][:REPORT_LIMIT]:
+                fields = f" ({', '.join(entry['fields'])})" if entry.get("fields") else ""
+                print(f"  {kind.capitalize()}: {entry['name']} [{entry['id']}]{fields}")
+            if len(report[kind]) > REPORT_LIMIT:
+                print(f"  ... and {len(report[kind]) - REPORT_LIMIT} more {kind}")
+
+    def save(self) -> None:
+        """
+        Save this run's snapshot and delta report.
+
+        Call only after the delta was reconciled, or the next run would skip
+        institutions that were never applied.
+        """
+        self.path.mkdir(parents=True, exist_ok=True)
+        content = b"".join(line + b"\n" for institution_id, line in sorted(self._current.items())
+                           if institution_id not in self._forgotten)
+        suffix, compressed = _compress(content)
+        write_if_changed(self.path / f"{SNAPSHOT_NAME}{suffix}", compressed)
+        # Only one format is kept, so a run with the other one does not read a stale snapshot
+        other = self.path / f"{SNAPSHOT_NAME}{'.gz' if suffix == '.zst' else '.zst'}"
+        if other.exists():
+            other.unlink()
+        save_json(self.path / DELTA_REPORT_NAME, self.report())
+        saved = len(self._current.keys() - self._forgotten)
+        print(f"Saved {saved} institutions to {self.path / (SNAPSHOT_NAME + suffix)}")
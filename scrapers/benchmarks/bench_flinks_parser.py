@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+"""
+Benchmark and golden-output check for the Flinks status page parser
+
+Compares flinks_scraper.parse_status_page (a single regex pass over the
+page) against the two implementations it replaced, the BeautifulSoup parser
+(when bs4 is installed) and the regex fallback, on a saved status page, then
+times all of them. Without --page, a status page with the same structure and --components
+component links per section is generated.
+
+Bank names are compared after decoding HTML character references, which the
+regex fallback left in place (so "Citizen&#x27;s Bank" missed its mapping).
+The generated page ends with an incident history whose headings mention the
+US and Canada, followed by component links; they are outside every component
+group, so no parser may take them as banks.
+
+Usage:
+    # Save the page once, then benchmark against it
+    curl -s https://status.flinks.com/ -o flinks-status.html
+    python scrapers/benchmarks/bench_flinks_parser.py --page flinks-status.html
+
+    python scrapers/benchmarks/bench_flinks_parser.py [--components N] [--repeat N]
+
+Exits with status 1 if any output differs from a reference.
+"""
+
+import argparse
+import html as html_lib
+import re
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from flinks_scraper import BANK_NAME_MAPPINGS, parse_status_page  # noqa: E402
+
+HAS_BS4 = False
+try:
+    from bs4 import BeautifulSoup
+    HAS_BS4 = True
+except ImportError:
+    pass
+
+# Sections of the generated page: (title, component name prefix)
+SECTIONS = [
+    ("Major Financial Institutions - Canada", "Caisse"),
+    ("Major Financial Institutions - USA", "Federal"),
+    ("Wealth Financial Institutions", "Wealth"),
+    ("FlinksPay", "Payments"),
+]
+
+
+def legacy_parse_bs4(html: str) -> dict[str, list[dict]]:
+    """The BeautifulSoup parser previously used by flinks_scraper."""
+    soup = BeautifulSoup(html, 'html.parser')
+    all_banks = {"CA": [], "US": []}
+    seen_names = set()
+    for section in soup.find_all('div', class_='component-group'):
+        title_elem = section.find('h2') or section.find('h3')
+        if not title_elem:
+            continue
+        title = title_elem.get_text(strip=True)
+        if "Canada" in title:
+            country = "CA"
+        elif "USA" in title or "US" in title:
+            country = "US"
+        elif "Wealth" in title:
+            country = "CA"
+        else:
+            continue
+        for link in section.find_all('a', href=True):
+            if '/components/' not in link.get('href', ''):
+                continue
+            bank_name = link.get_text(strip=True)
+            if not bank_name or bank_name in seen_names:
+                continue
+            mapped_name = BANK_NAME_MAPPINGS.get(bank_name, bank_name)
+            if mapped_name is None:
+                continue
+            seen_names.add(bank_name)
+            all_banks[country].append({"name": mapped_name, "country": country, "status_page_name": bank_name})
+    return all_banks
+
+
+def legacy_parse_regex(html: str) -> dict[str, list[dict]]:
+    """The regex fallback previously used by flinks_scraper (one search per section)."""
+    all_banks = {"CA": [], "US": []}
+    seen_names = set()
+    sections = [
+        ("CA", r'Major Financial Institutions - Canada.*?(?=Major Financial Institutions - USA|Wealth Financial|$)'),
+        ("US", r'Major Financial Institutions - USA.*?(?=Wealth Financial|FlinksPay|Recent History|$)'),
+        ("CA", r'Wealth Financial Institutions.*?(?=FlinksPay|Recent History|$)'),
+    ]
+    link_pattern = re.compile(r'href="[^"]*?/components/[^"]*?"[^>]*>([^<]+)</a>', re.IGNORECASE)
+    for country, pattern in sections:
+        match = re.search(pattern, html, re.DOTALL | re.IGNORECASE)
+        for link in link_pattern.finditer(match.group(0) if match else ""):
+            bank_name = link.group(1).strip()
+            if bank_name and bank_name not in seen_names:
+                mapped_name = BANK_NAME_MAPPINGS.get(bank_name, bank_name)
+                if mapped_name is not None:
+                    seen_names.add(bank_name)
+                    all_banks[country].append({"name": mapped_name, "country": country,
+                                               "status_page_name": bank_name})
+    return all_banks
+
+
+def generate_page(components: int) -> str:
+    """Generate a status page with the structure the parsers expect."""
+    parts = ["<!DOCTYPE html><html><head><title>Flinks Status</title></head><body>",
+             '<div class="components-container">']
+    known = [name for name in BANK_NAME_MAPPINGS]
+    for number, (title, prefix) in enumerate(SECTIONS):
+        parts.append(f'<div class="component-group"><h2 class="group-name">{title}</h2><ul>')
+        for i in range(components):
+            name = known[i] if number == 0 and i < len(known) else f"{prefix} Institution {i}"
+            component_id = f"{number:02d}{i:010x}"
+            parts.append(
+                f'<li class="component-inner-container status-green" data-component-id="{component_id}">'
+                f'<a href="https://status.flinks.com/components/{component_id}" class="name">'
+                f'{html_lib.escape(name)}</a>'
+                '<span class="component-status">Operational</span></li>'
+            )
+        parts.append("</ul></div>")
+    parts.append('</div><div class="incidents-list"><h2>Recent History</h2>')
+    for i in range(components):
+        parts.append(f'<div class="incident"><h3>Degraded performance for US and Canada customers</h3>'
+                     f'<a href="/incidents/{i:08x}">Details</a>'
+                     f'<p>Resolved - connectivity to <a href="https://status.flinks.com/components/99{i:010x}">'
+                     f'Incident Institution {i}</a> was restored.</p></div>')
+    parts.append("</div></body></html>")
+    return "".join(parts)
+
+
+def normalized(all_banks: dict[str, list[dict]]) -> dict[str, list[tuple[str, str]]]:
+    """
+    (name, status page name) per country, with character references decoded.
+
+    The name mapping is applied again to the decoded status page names, as the
+    regex fallback looked the encoded names up.
+    """
+    result = {}
+    for country, banks in all_banks.items():
+        result[country] = []
+        for bank in banks:
+            bank_name = html_lib.unescape(bank["status_page_name"])
+            mapped_name = BANK_NAME_MAPPINGS.get(bank_name, bank_name)
+            if mapped_name is not None:
+                result[country].append((mapped_name, bank_name))
+    return result
+
+
+def time_parser(parse, html: str, repeat: int) -> float:
+    """Best time of repeat parses, in seconds."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        parse(html)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    """Main entry point with argument parsing."""
+    parser = argparse.ArgumentParser(description="Check and benchmark the Flinks status page parser")
+    parser.add_argument("--page", type=Path, help="Saved status page (default: generate one)")
+    parser.add_argument("--components", type=int, default=500,
+                        help="Component links per section of the generated page (default: 500)")
+    parser.add_argument("--repeat", type=int, default=5, help="Timing repetitions (default: 5)")
+    args = parser.parse_args()
+
+    if args.page:
+        html = args.page.read_text(encoding="utf-8")
+        source = str(args.page)
+    else:
+        html = generate_page(args.components)
+        source = f"generated page, {args.components} components per section"
+    print(f"Status page: {source} ({len(html) / 1024:.0f} KB)")
+
+    parsers = [("single-pass", parse_status_page), ("regex", legacy_parse_regex)]
+    if HAS_BS4:
+        parsers.append(("beautifulsoup", legacy_parse_bs4))
+    else:
+        print("  beautifulsoup4 not installed; skipping the BeautifulSoup reference")
+
+    result = normalized(parse_status_page(html))
+    print(f"  Banks: {', '.join(f'{country} {len(banks)}' for country, banks in result.items())}")
+    mismatches = 0
+    for name, parse in parsers[1:]:
+        reference = normalized(parse(html))
+        for country in sorted(set(result) | set(reference)):
+            missing = [bank for bank in reference.get(country, []) if bank not in result.get(country, [])]
+            extra = [bank for bank in result.get(country, []) if bank not in reference.get(country, [])]
+            if missing or extra or reference.get(country) != result.get(country):
+                mismatches += 1
+                print(f"  MISMATCH vs {name} ({country}): missing {missing[:5]}, extra {extra[:5]}"
+                      + ("" if missing or extra else ", different order"))
+    if not mismatches:
+        print(f"  Output identical to {' and '.join(name for name, _ in parsers[1:])}")
+
+    print(f"\nBest of {args.repeat}:")
+    baseline = None
+    for name, parse in parsers:
+        elapsed = time_parser(parse, html, args.repeat)
+        baseline = baseline or elapsed
+        print(f"  {name:<15}{elapsed * 1000:>10.1f} ms{elapsed / baseline:>8.1f}x")
+
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
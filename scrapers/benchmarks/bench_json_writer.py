@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Benchmark and golden-output check for the canonical JSON serializer
+
+Serializes every provider file with json_writer.dump_json() (orjson when
+installed) and with the json module fallback, checks that both produce the
+same bytes, then times them, the parse of the corpus, and the unchanged-file
+check save_json() makes before writing. Nothing is written.
+
+Usage:
+    python scrapers/benchmarks/bench_json_writer.py [--providers DIR] [--repeat N]
+
+Exits with status 1 if the two serializers disagree on any file.
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from json_writer import (  # noqa: E402
+    ACCOUNT_PROVIDERS_PATH, HAS_ORJSON, collect_json_files, dump_json, dump_json_stdlib, is_unchanged,
+    load_json_bytes,
+)
+
+# Values where orjson and json format differently; dump_json() must fall back
+EDGE_CASES = [
+    {"float": 1e16, "small": 1e-7, "plain": 0.1},
+    {"big": 2 ** 70},
+    {1: "non-string key"},
+    {"text": "Café \"quoted\" back\\slash\ttab\x1f ", "empty": [], "nested": [{}]},
+    {"name": "Bank 1e-5 Branch"},
+]
+
+
+def best_of(repeat: int, function, *args) -> float:
+    """Best time of repeat calls, in seconds."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function(*args)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    """Main entry point with argument parsing."""
+    parser = argparse.ArgumentParser(description="Check and benchmark the canonical JSON serializer")
+    parser.add_argument("--providers", type=Path, default=ACCOUNT_PROVIDERS_PATH,
+                        help="Provider directory (default: data/account-providers)")
+    parser.add_argument("--repeat", type=int, default=3, help="Timing repetitions (default: 3)")
+    args = parser.parse_args()
+
+    files = collect_json_files([args.providers])
+    contents = [path.read_bytes() for path in files]
+    documents = [load_json_bytes(content) for content in contents]
+    print(f"Corpus: {len(files)} files, {sum(map(len, contents)) / (1024 * 1024):.1f} MB "
+          f"(encoder: {'orjson' if HAS_ORJSON else 'json only'})")
+
+    mismatches = 0
+    canonical = 0
+    for path, content, document in zip(files, contents, documents):
+        fast = dump_json(document)
+        if fast != dump_json_stdlib(document):
+            mismatches += 1
+            if mismatches <= 5:
+                print(f"  MISMATCH: {path.name}")
+        canonical += fast == content
+    for document in EDGE_CASES:
+        if dump_json(document) != dump_json_stdlib(document):
+            mismatches += 1
+            print(f"  MISMATCH on edge case {document!r}")
+    if not mismatches:
+        print(f"  dump_json() output identical to json.dumps for every file and {len(EDGE_CASES)} edge cases")
+    print(f"  {canonical} of {len(files)} files are in the canonical format "
+          f"(run json_writer.py to reformat the other {len(files) - canonical})")
+
+    def serialize_all(dump):
+        for document in documents:
+            dump(document)
+
+    def check_unchanged():
+        for path, document in zip(files, documents):
+            is_unchanged(path, dump_json(document))
+
+    timings = [
+        ("parse", lambda: [load_json_bytes(content) for content in contents]),
+        ("json.dumps", lambda: serialize_all(dump_json_stdlib)),
+        ("dump_json", lambda: serialize_all(dump_json)),
+        ("unchanged check", check_unchanged),
+    ]
+    print(f"\nBest of {args.repeat} over the corpus:")
+    for name, function in timings:
+        elapsed = best_of(args.repeat, function)
+        print(f"  {name:<17}{elapsed:>8.2f}s{elapsed / len(files) * 1e6:>10.1f} us/file")
+
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Benchmark for provider_matcher.ProviderMatcher
+
+Builds the matching index over data/account-providers and times best_match()
+for a sample of provider names (exact hits) and perturbed variants of them
+(different legal suffix, dropped words, typos), reporting latency percentiles
+and how often a variant resolves back to its provider.
+
+Usage:
+    python scrapers/benchmarks/bench_provider_matcher.py [--sample N] [--seed N]
+"""
+
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from provider_index import ACCOUNT_PROVIDERS_PATH, load_provider_index  # noqa: E402
+
+SUFFIXES = ["Ltd", "Limited", "PLC", "S.A.", "AG", "GmbH", "Bank", "Inc."]
+
+
+def perturb(name: str, rng: random.Random) -> str:
+    """Return a plausible variant of an institution name."""
+    words = name.split()
+    choice = rng.randrange(3)
+    if choice == 0:
+        return f"{name} {rng.choice(SUFFIXES)}"
+    if choice == 1 and len(words) > 2:
+        return " ".join(words[:-1])
+    position = rng.randrange(len(name))
+    return name[:position] + name[position + 1:]
+
+
+def percentile(values: list[float], fraction: float) -> float:
+    """Return a percentile of a sorted list."""
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def run(label: str, matcher, queries: list[tuple[str, str, str]]) -> None:
+    """Time best_match() over (expected_id, name, country) queries."""
+    timings = []
+    hits = 0
+    for expected_id, name, country in queries:
+        start = time.perf_counter()
+        match = matcher.best_match(name, country)
+        timings.append(time.perf_counter() - start)
+        if match and match[0] == expected_id:
+            hits += 1
+    timings.sort()
+    print(f"  {label:<10} p50 {percentile(timings, 0.5) * 1000:.3f} ms  "
+          f"p99 {percentile(timings, 0.99) * 1000:.3f} ms  "
+          f"max {timings[-1] * 1000:.3f} ms  "
+          f"resolved to the same provider: {hits}/{len(queries)}")
+
+
+def main():
+    """Main entry point with argument parsing."""
+    parser = argparse.ArgumentParser(description="Benchmark fuzzy provider matching")
+    parser.add_argument("--sample", type=int, default=5000, help="Names to query (default: 5000)")
+    parser.add_argument("--seed", type=int, default=1, help="Random seed (default: 1)")
+    args = parser.parse_args()
+
+    index = load_provider_index(ACCOUNT_PROVIDERS_PATH)
+    start = time.perf_counter()
+    matcher = index.matcher
+    print(f"Built matching index over {len(matcher)} providers in "
+          f"{(time.perf_counter() - start) * 1000:.0f} ms")
+
+    rng = random.Random(args.seed)
+    providers = [
+        (provider_id, index.get_name(provider_id), (index.get_countries(provider_id) or [None])[0])
+        for provider_id in sorted(index.ids) if index.get_name(provider_id)
+    ]
+    sample = rng.sample(providers, min(args.sample, len(providers)))
+
+    print("\nbest_match() latency:")
+    run("exact", matcher, sample)
+    run("variants", matcher, [(pid, perturb(name, rng), country) for pid, name, country in sample])
+    print("\n  (an exact or variant name may legitimately resolve to a duplicate provider)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
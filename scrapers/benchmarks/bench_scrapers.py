@@ -0,0 +1,337 @@
+#!/usr/bin/env python3
+"""
+End-to-End Scraper Benchmarks
+
+Times each scraper's provider update (fetch, match, write) against the local
+stand-in server and a temporary copy of data/account-providers, to catch
+performance regressions before a nightly run exceeds its time budget:
+- the stand-in server (standin_server.py) serves synthetic payloads of the
+  requested size, or replays recorded fixtures with --fixtures
+- every scraper runs in its own process, with its API URL pointed at the
+  server and its ID mapping files, provider index cache and data files
+  redirected into a temporary directory; the provider directory is a
+  hard-linked copy (scrapers replace files through an atomic rename, so the
+  originals are never modified), in the flat or, with --layout sharded, the
+  sharded layout (provider_paths.py)
+- the provider index of the copy is built before the timed section, and
+  reported separately
+- results can be saved with --output and compared with --baseline; the run
+  fails when a scraper got slower than the baseline by more than --tolerance
+
+Benchmarked: plaid (update_bank_providers), yapily (get_yapily_institutions
++ update_bank_providers), yaxi (update_bank_providers), opensanctions (main,
+download included), and flinks (scrape_flinks_coverage +
+update_bank_providers) when its status page was recorded with --fixtures.
+"all" runs plaid, yapily, yaxi and opensanctions together through
+run_all.py (concurrent fetches, one write pass), for comparison with the sum
+of the separate runs. With --stream, plaid and yapily match institutions
+while later pages download (page_queue.py). With --rerun, each scraper runs
+a second time in the same temporary directory, as the next nightly run
+would: with the snapshots and ID mapping files of the first run, so only
+changed institutions are reconciled (aggregator_snapshot.py) and known ones
+are not matched again (provider_reconcile.py).
+
+Usage:
+    python scrapers/benchmarks/bench_scrapers.py [--institutions N] [--scrapers plaid,yaxi]
+    python scrapers/benchmarks/bench_scrapers.py --output bench.json
+    python scrapers/benchmarks/bench_scrapers.py --baseline bench.json --tolerance 0.25
+    python scrapers/benchmarks/bench_scrapers.py --layout sharded
+    python scrapers/benchmarks/bench_scrapers.py --scrapers plaid,yapily --stream
+    python scrapers/benchmarks/bench_scrapers.py --scrapers plaid,yapily,yaxi --rerun
+"""
+
+import argparse
+import functools
+import importlib
+import json
+import os
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+SCRAPERS_PATH = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(SCRAPERS_PATH))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from fixtures import FixtureStore  # noqa: E402
+from provider_index import ACCOUNT_PROVIDERS_PATH  # noqa: E402
+from provider_paths import FLAT, SHARDED, ProviderLayout, get_layout  # noqa: E402
+from standin_server import StandInServer, plaid_country_codes, standin_url  # noqa: E402
+from synthetic import DEFAULT_KNOWN_FRACTION, SyntheticData, known_providers  # noqa: E402
+
+# Benchmark name -> scraper module
+SCRAPERS = {
+    "plaid": "plaid_scraper",
+    "yapily": "yapily_scraper",
+    "yaxi": "yaxi_scraper",
+    "opensanctions": "opensanctions_bic_scraper",
+    "flinks": "flinks_scraper",
+    "all": "run_all",
+}
+DEFAULT_SCRAPERS = ["plaid", "yapily", "yaxi", "opensanctions"]
+
+# The stand-in server has no rate limit; keep Plaid's limiter out of the measurement
+PLAID_BENCH_RATE_LIMIT = 1000.0
+
+# Scrapers run together by the "all" benchmark
+RUN_ALL_SCRAPERS = ["plaid", "yapily", "yaxi", "opensanctions"]
+
+# Slowdowns below this many seconds are treated as noise
+MIN_REGRESSION_SECONDS = 0.5
+
+
+def link_providers(source: Path, target: Path, layout: str = FLAT) -> int:
+    """Hard-link (or copy, across filesystems) every provider file into target, in a layout."""
+    target.mkdir(parents=True)
+    target_layout = ProviderLayout(target, layout)
+    count = 0
+    for entry in get_layout(source).iter_files():
+        destination = target_layout.new_path(entry.name[:-5])
+        target_layout.prepare(destination)
+        try:
+            os.link(entry.path, destination)
+        except OSError:
+            shutil.copy2(entry.path, destination)
+        count += 1
+    return count
+
+
+def count_providers(providers_path: Path) -> int:
+    """Number of provider files in a directory, in either layout."""
+    return sum(1 for _ in ProviderLayout(providers_path).iter_files())
+
+
+def prepare_scraper(name: str, base_url: str, workdir: Path, stream: bool = False):
+    """
+    Import a scraper and redirect its endpoints and files into the workdir.
+
+    Args:
+        stream: Run plaid and yapily in their streaming mode
+
+    Returns:
+        Function running the benchmarked part of the scraper
+    """
+    import icon_store
+    import provider_index
+
+    module = importlib.import_module(SCRAPERS[name])
+    providers_path = workdir / "account-providers"
+    module.ACCOUNT_PROVIDERS_PATH = providers_path
+    module.load_provider_index = functools.partial(provider_index.load_provider_index,
+                                                   cache_path=workdir / "cache")
+    if hasattr(module, "SNAPSHOT_PATH"):
+        module.SNAPSHOT_PATH = workdir / "scraped-data" / name
+
+    if name == "plaid":
+        os.environ.update(PLAID_CLIENT_ID="bench", PLAID_SECRET="bench", PLAID_ENV="production")
+        module.PLAID_API_URL = standin_url(module.PLAID_API_URL, base_url)
+        module.PLAID_INSTITUTION_IDS_PATH = workdir / "plaid_institution_ids.json"
+        module.ICON_STORE = icon_store.IconStore(workdir / "icons")
+        module.PLAID_LOGOS_PATH = workdir / "icons" / "plaid_institution_logos.json"
+        return lambda: module.update_bank_providers(module.DEFAULT_WORKERS, PLAID_BENCH_RATE_LIMIT,
+                                                    stream=stream)
+    if name == "yapily":
+        os.environ.update(YAPILY_APPLICATION_UUID="bench", YAPILY_SECRET="bench")
+        module.YAPILY_API_URL = standin_url(module.YAPILY_API_URL, base_url)
+        module.YAPILY_INSTITUTION_IDS_PATH = workdir / "yapily_institution_ids.json"
+        if stream:
+            return module.stream_bank_providers
+        return lambda: module.update_bank_providers(module.get_yapily_institutions())
+    if name == "yaxi":
+        module.YAXI_SEARCH_URL = standin_url(module.YAXI_SEARCH_URL, base_url)
+        module.CONNECTION_IDS_PATH = workdir / "yaxi_connection_ids.json"
+        return module.update_bank_providers
+    if name == "opensanctions":
+        module.OPENSANCTIONS_URL = standin_url(module.OPENSANCTIONS_URL, base_url)
+        module.DATA_FILE = workdir / "opensanctions_bic_data.json"
+        module.LEDGER_FILE = workdir / "opensanctions_bic_ledger.bin"
+        sys.argv = ["opensanctions_bic_scraper.py", "--full"]
+        return module.main
+    if name == "flinks":
+        module.FLINKS_STATUS_URL = standin_url(module.FLINKS_STATUS_URL, base_url)
+        module.SCRAPED_DATA_PATH = workdir / "scraped-data" / name
+        return lambda: module.update_bank_providers(module.scrape_flinks_coverage())
+    if name == "all":
+        for scraper in RUN_ALL_SCRAPERS:
+            prepare_scraper(scraper, base_url, workdir)
+        # run_all also updates the market coverage in the aggregator files
+        for scraper, attribute in (("plaid", "PLAID_JSON_PATH"), ("yapily", "YAPILY_JSON_PATH")):
+            scraper_module = sys.modules[SCRAPERS[scraper]]
+            copy = workdir / getattr(scraper_module, attribute).name
+            shutil.copy2(getattr(scraper_module, attribute), copy)
+            setattr(scraper_module, attribute, copy)
+        options = argparse.Namespace(
+            max_concurrency=module.DEFAULT_MAX_CONCURRENCY, plaid_workers=sys.modules["plaid_scraper"].DEFAULT_WORKERS,
+            plaid_rate_limit=PLAID_BENCH_RATE_LIMIT, opensanctions_workers=os.cpu_count() or 1,
+            full=True, dry_run=False, apply_fuzzy=False,
+        )
+        return lambda: module.run_scrapers(RUN_ALL_SCRAPERS, options)
+    raise ValueError(f"Unknown scraper: {name}")
+
+
+def run_scraper(name: str, base_url: str, workdir: Path, stream: bool = False) -> dict:
+    """Run one scraper benchmark in this process (the child side of run_child())."""
+    import provider_index
+    import resumable_download
+
+    providers_path = workdir / "account-providers"
+    before = count_providers(providers_path)
+    run = prepare_scraper(name, base_url, workdir, stream)
+
+    start = time.perf_counter()
+    provider_index.load_provider_index(providers_path, cache_path=workdir / "cache")
+    index_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    run()
+    seconds = time.perf_counter() - start
+
+    module = sys.modules[SCRAPERS[name]]
+    clients = [getattr(module, "HTTP_CLIENT", None), resumable_download.HTTP_CLIENT]
+    if name == "all":
+        clients.extend(scraper_module.HTTP_CLIENT for scraper_module in module.MODULES.values())
+    http_seconds = 0.0
+    for client in {id(c): c for c in clients if c}.values():
+        for stats in client.timing_summary().values():
+            http_seconds += stats["connect"] + stats["wait"] + stats["transfer"]
+
+    return {
+        "scraper": name,
+        "seconds": seconds,
+        "index_seconds": index_seconds,
+        "http_seconds": http_seconds,
+        "created": count_providers(providers_path) - before,
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }
+
+
+def run_child(name: str, base_url: str, workdir: Path, stream: bool = False) -> dict:
+    """Run one scraper benchmark in a fresh process; its output goes to workdir/output.log."""
+    result_file = workdir / "result.json"
+    command = [sys.executable, __file__, "--child", name, "--base-url", base_url, "--workdir", str(workdir)]
+    if stream:
+        command.append("--stream")
+    with open(workdir / "output.log", "w", encoding="utf-8") as log:
+        completed = subprocess.run(command, stdout=log, stderr=subprocess.STDOUT)
+    if completed.returncode != 0 or not result_file.exists():
+        return {"scraper": name, "error": f"exit code {completed.returncode}, see {workdir / 'output.log'}"}
+    with open(result_file, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def compare(results: list[dict], baseline: dict, tolerance: float) -> list[str]:
+    """Return a message per scraper that is slower than its baseline."""
+    regressions = []
+    for result in results:
+        previous = baseline.get(result["scraper"])
+        if "seconds" not in result or "seconds" not in (previous or {}):
+            continue
+        limit = previous["seconds"] * (1 + tolerance)
+        if result["seconds"] > limit and result["seconds"] - previous["seconds"] > MIN_REGRESSION_SECONDS:
+            regressions.append(f"{result['scraper']}: {result['seconds']:.1f}s vs "
+                               f"{previous['seconds']:.1f}s baseline (limit {limit:.1f}s)")
+    return regressions
+
+
+def main():
+    """Main entry point with argument parsing."""
+    parser = argparse.ArgumentParser(description="Benchmark the scrapers end to end against a stand-in server")
+    parser.add_argument("--institutions", type=int, default=10000,
+                        help="Synthetic institutions per scraper (default: 10000)")
+    parser.add_argument("--scrapers", default=",".join(DEFAULT_SCRAPERS),
+                        help=f"Comma-separated scrapers out of {', '.join(SCRAPERS)} "
+                             f"(default: {','.join(DEFAULT_SCRAPERS)})")
+    parser.add_argument("--known-fraction", type=float, default=DEFAULT_KNOWN_FRACTION,
+                        help=f"Share of institutions named after existing providers (default: {DEFAULT_KNOWN_FRACTION})")
+    parser.add_argument("--fixtures", type=Path, help="Replay recorded fixtures from this directory")
+    parser.add_argument("--output", type=Path, help="Save the results as JSON")
+    parser.add_argument("--baseline", type=Path, help="Compare with results saved by --output")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="Allowed slowdown against the baseline (default: 0.25 = 25%%)")
+    parser.add_argument("--layout", choices=[FLAT, SHARDED], default=FLAT,
+                        help="Layout of the temporary provider directories (default: flat)")
+    parser.add_argument("--stream", action="store_true",
+                        help="Run plaid and yapily in their streaming mode (--stream)")
+    parser.add_argument("--rerun", action="store_true",
+                        help="Run each scraper a second time on its own output, reported as <scraper>-rerun")
+    parser.add_argument("--keep", action="store_true", help="Keep the temporary directories")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    parser.add_argument("--base-url", help=argparse.SUPPRESS)
+    parser.add_argument("--workdir", type=Path, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        result = run_scraper(args.child, args.base_url, args.workdir, args.stream)
+        with open(args.workdir / "result.json", "w", encoding="utf-8") as f:
+            json.dump(result, f)
+        return 0
+
+    scrapers = [name.strip() for name in args.scrapers.split(",") if name.strip()]
+    unknown = sorted(set(scrapers) - set(SCRAPERS))
+    if unknown:
+        parser.error(f"unknown scrapers: {', '.join(unknown)}")
+
+    known = known_providers() if args.known_fraction > 0 else []
+    data = SyntheticData(args.institutions, known, args.known_fraction)
+    fixtures = FixtureStore(args.fixtures) if args.fixtures else None
+    server = StandInServer(("127.0.0.1", 0), data, fixtures, plaid_country_codes()).start()
+    source = "recorded fixtures" if fixtures else f"{args.institutions} synthetic institutions"
+    print(f"Stand-in server on {server.base_url} ({source})")
+
+    results = []
+    for name in scrapers:
+        workdir = Path(tempfile.mkdtemp(prefix=f"bench-{name}-"))
+        providers = link_providers(ACCOUNT_PROVIDERS_PATH, workdir / "account-providers", args.layout)
+        print(f"\n{name}: {providers} providers ({args.layout}) in {workdir}")
+        for run in range(2 if args.rerun else 1):
+            result = run_child(name, server.base_url, workdir, args.stream)
+            if run:
+                result["scraper"] = f"{name}-rerun"
+            results.append(result)
+            if "error" in result:
+                print(f"  failed: {result['error']}")
+                break
+            print(f"  {'rerun: ' if run else ''}{result['seconds']:.2f}s "
+                  f"({result['http_seconds']:.2f}s in HTTP requests), "
+                  f"index {result['index_seconds']:.2f}s, {result['created']} providers created, "
+                  f"peak RSS {result['peak_rss_mb']:.0f} MB")
+        if not args.keep:
+            shutil.rmtree(workdir)
+    server.shutdown()
+
+    print(f"\n{'scraper':<15}{'seconds':>10}{'http':>10}{'index':>10}{'created':>10}{'RSS MB':>10}")
+    for result in results:
+        if "error" in result:
+            print(f"{result['scraper']:<15}{'failed':>10}")
+            continue
+        print(f"{result['scraper']:<15}{result['seconds']:>10.2f}{result['http_seconds']:>10.2f}"
+              f"{result['index_seconds']:>10.2f}{result['created']:>10}{result['peak_rss_mb']:>10.0f}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"institutions": args.institutions,
+                       "results": {result["scraper"]: result for result in results}}, f, indent=2)
+            f.write("\n")
+        print(f"\nSaved results to {args.output}")
+
+    failed = any("error" in result for result in results)
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        if baseline.get("institutions") != args.institutions:
+            print(f"\nWarning: baseline was run with {baseline.get('institutions')} institutions")
+        regressions = compare(results, baseline.get("results", {}), args.tolerance)
+        for message in regressions:
+            print(f"REGRESSION {message}")
+        if regressions:
+            return 1
+        print(f"\nNo regressions against {args.baseline} (tolerance {args.tolerance:.0%})")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Benchmark and golden-output check for slugs.slugify
+
+Compares the shared slugify()/slugify_truncated() against the per-scraper
+implementation they replaced, over the name of every provider in
+data/account-providers plus a set of edge cases, then times both.
+
+Usage:
+    python scrapers/benchmarks/bench_slugify.py [--repeat N]
+
+Exits with status 1 if any output differs from the reference.
+"""
+
+import argparse
+import json
+import re
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from provider_paths import get_layout  # noqa: E402
+from slugs import TRANSLITERATIONS, slugify, slugify_truncated  # noqa: E402
+
+BASE_PATH = Path(__file__).resolve().parent.parent.parent
+ACCOUNT_PROVIDERS_PATH = BASE_PATH / "data" / "account-providers"
+
+# Names exercising whitespace, hyphen runs, casing and characters outside the table
+EDGE_CASES = [
+    "", " ", "-", "---", "  Bank  ", "-Bank-", "Bank - of -- Foo", "Bank\tof\nFoo",
+    "Bank of Foo", "A.B.C. Bank", "A & B", "ÄÖÜ ß SS", "STRASSE Straße",
+    "ẞank", "İş Bankası", "ÿ Ÿ", "Œuvre Æther", "Ærø Sparekasse", "Kelvin K",
+    "日本銀行", "Banco do Brasil S/A", "Caixa (Geral) de Depósitos", "x" * 120,
+    "Sparkasse " * 12, "Crédit Agricole Corporate and Investment Bank - Succursale",
+]
+
+
+def legacy_slugify(name: str) -> str:
+    """The slugify implementation previously copied into each scraper."""
+    slug = name
+    for char, replacement in TRANSLITERATIONS.items():
+        slug = slug.replace(char, replacement)
+        slug = slug.replace(char.upper(), replacement)
+    slug = slug.lower()
+    slug = re.sub(r'[^a-z0-9\s-]', '', slug)
+    slug = re.sub(r'\s+', '-', slug)
+    slug = re.sub(r'-+', '-', slug)
+    return slug.strip('-')
+
+
+def legacy_slugify_truncated(name: str) -> str:
+    """The previous OpenSanctions variant (limited to 80 characters)."""
+    return legacy_slugify(name)[:80]
+
+
+def load_names() -> list[str]:
+    """Load the name of every account provider, plus the edge cases."""
+    names = []
+    for entry in sorted(get_layout(ACCOUNT_PROVIDERS_PATH).iter_files(), key=lambda entry: entry.name):
+        try:
+            with open(entry.path, "r", encoding="utf-8") as f:
+                name = json.load(f).get("name")
+        except (OSError, ValueError):
+            continue
+        if isinstance(name, str):
+            names.append(name)
+    return names + EDGE_CASES
+
+
+def check(names: list[str]) -> int:
+    """Compare against the reference implementation; returns the number of mismatches."""
+    mismatches = 0
+    for name in names:
+        for new, old in ((slugify, legacy_slugify), (slugify_truncated, legacy_slugify_truncated)):
+            expected = old(name)
+            actual = new(name)
+            if actual != expected:
+                mismatches += 1
+                if mismatches <= 20:
+                    print(f"  MISMATCH {new.__name__}({name!r}): {actual!r} != {expected!r}")
+    return mismatches
+
+
+def bench(label: str, fn, names: list[str], repeat: int, setup=None) -> float:
+    """Time fn over all names, best of `repeat` runs."""
+    best = float("inf")
+    for _ in range(repeat):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        for name in names:
+            fn(name)
+        best = min(best, time.perf_counter() - start)
+    per_name = best / len(names) * 1e6
+    print(f"  {label:<28} {best * 1000:8.1f} ms  ({per_name:.2f} us/name)")
+    return best
+
+
+def main():
+    """Main entry point with argument parsing."""
+    parser = argparse.ArgumentParser(description="Check and benchmark slugs.slugify")
+    parser.add_argument("--repeat", type=int, default=5, help="Timing runs per variant (default: 5)")
+    args = parser.parse_args()
+
+    names = load_names()
+    print(f"Checking {len(names)} names against the reference implementation...")
+    mismatches = check(names)
+    if mismatches:
+        print(f"FAILED: {mismatches} mismatches")
+        return 1
+    print("  All outputs identical")
+
+    print("\nTiming:")
+    legacy = bench("legacy slugify", legacy_slugify, names, args.repeat)
+    cold = bench("slugify (cold cache)", slugify.__wrapped__, names, args.repeat)
+    warm = bench("slugify (warm cache)", slugify, names, args.repeat)
+    print(f"\n  Speedup: {legacy / cold:.1f}x uncached, {legacy / warm:.1f}x cached")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
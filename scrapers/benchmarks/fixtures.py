@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""
+Recorded HTTP Fixtures
+
+Records the HTTP exchanges of a real scraper run so they can be replayed by
+the stand-in server (standin_server.py) without live endpoints or
+credentials:
+- record runs a scraper's main() with a response hook on its HTTPClient and
+  stores every request()/response pair under scraped-data/fixtures/ (one
+  .json description and one .body file per exchange)
+- exchanges are matched on a signature of method, path + query and request
+  body; credentials in JSON bodies (Plaid's client_id/secret) are left out
+  of both the signature and the stored request, so a replay with other
+  credentials still matches
+
+Recording makes the scraper's usual changes; pass the scraper's own --dry-run
+where it has one. Streamed downloads (OpenSanctions) are not recorded; the
+stand-in server generates that payload instead.
+
+Usage:
+    # Record a Yapily run
+    python scrapers/benchmarks/fixtures.py record yapily_scraper -- --dry-run
+
+    # List recorded exchanges
+    python scrapers/benchmarks/fixtures.py list
+"""
+
+import argparse
+import hashlib
+import http.client
+import importlib
+import json
+import sys
+from pathlib import Path
+from typing import Optional
+from urllib.parse import urlsplit
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+BASE_PATH = Path(__file__).resolve().parent.parent.parent
+FIXTURES_PATH = BASE_PATH / "scraped-data" / "fixtures"
+
+# JSON request body fields that carry credentials
+REDACTED_FIELDS = frozenset({"client_id", "secret"})
+
+# Headers that describe the transferred (not the stored, decoded) body
+TRANSFER_HEADERS = frozenset({"content-encoding", "content-length", "transfer-encoding", "connection"})
+
+
+def request_target(url: str) -> str:
+    """Path and query of a URL (the host is not part of a fixture's identity)."""
+    parts = urlsplit(url)
+    target = parts.path or "/"
+    return f"{target}?{parts.query}" if parts.query else target
+
+
+def redact_body(body: Optional[bytes]):
+    """
+    Return the request body as stored in a fixture.
+
+    JSON objects lose their credential fields; other bodies are kept as text.
+    """
+    if not body:
+        return None
+    try:
+        data = json.loads(body)
+    except ValueError:
+        return body.decode("utf-8", errors="replace")
+    if isinstance(data, dict):
+        data = {key: value for key, value in data.items() if key not in REDACTED_FIELDS}
+    return data
+
+
+def request_signature(method: str, url: str, body: Optional[bytes]) -> str:
+    """Signature matching a request to its recorded exchange."""
+    canonical = json.dumps(redact_body(body), sort_keys=True, separators=(",", ":"))
+    text = f"{method.upper()}\n{request_target(url)}\n{canonical}"
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()[:32]
+
+
+class FixtureRecorder:
+    """
+    HTTPClient response hook that stores each exchange in a fixture directory.
+
+    Args:
+        directory: Fixture directory (created if needed)
+    """
+
+    def __init__(self, directory: Path = FIXTURES_PATH):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.recorded = 0
+
+    def __call__(self, method: str, url: str, body: Optional[bytes], response) -> None:
+        signature = request_signature(method, url, body)
+        (self.directory / f"{signature}.body").write_bytes(response.content)
+        description = {
+            "method": method.upper(),
+            "url": url,
+            "request": redact_body(body),
+            "status": response.status,
+            "headers": [(name, value) for name, value in response.headers.items()
+                        if name.lower() not in TRANSFER_HEADERS],
+            "body": f"{signature}.body",
+        }
+        with open(self.directory / f"{signature}.json", "w", encoding="utf-8") as f:
+            json.dump(description, f, indent=2, ensure_ascii=False)
+            f.write("\n")
+        self.recorded += 1
+
+
+class FixtureStore:
+    """
+    Recorded exchanges of a fixture directory, looked up by request.
+
+    Args:
+        directory: Fixture directory
+    """
+
+    def __init__(self, directory: Path = FIXTURES_PATH):
+        self.directory = Path(directory)
+        self.exchanges: dict[str, dict] = {}
+        for path in sorted(self.directory.glob("*.json")):
+            with open(path, "r", encoding="utf-8") as f:
+                self.exchanges[path.stem] = json.load(f)
+
+    def __len__(self) -> int:
+        return len(self.exchanges)
+
+    def lookup(self, method: str, url: str, body: Optional[bytes]) -> Optional[tuple[int, list, bytes]]:
+        """
+        Find the recorded response to a request.
+
+        Returns:
+            Tuple of (status, headers, body), or None if it was not recorded
+        """
+        exchange = self.exchanges.get(request_signature(method, url, body))
+        if exchange is None:
+            return None
+        content = (self.directory / exchange["body"]).read_bytes()
+        return exchange["status"], exchange["headers"], content
+
+
+def record(scraper: str, directory: Path, scraper_args: list[str]) -> int:
+    """
+    Run a scraper's main() and record its HTTP exchanges.
+
+    Args:
+        scraper: Scraper module name (e.g. yapily_scraper)
+        directory: Fixture directory
+        scraper_args: Command line arguments for the scraper
+
+    Returns:
+        Number of recorded exchanges
+    """
+    module = importlib.import_module(scraper)
+    client = getattr(module, "HTTP_CLIENT", None)
+    if client is None:
+        raise SystemExit(f"{scraper} has no HTTP_CLIENT to record")
+    recorder = FixtureRecorder(directory)
+    client.response_hooks.append(recorder)
+
+    sys.argv = [f"{scraper}.py", *scraper_args]
+    module.main()
+    return recorder.recorded
+
+
+def main():
+    """Main entry point with argument parsing."""
+    parser = argparse.ArgumentParser(description="Record and inspect scraper HTTP fixtures")
+    parser.add_argument("--dir", type=Path, default=FIXTURES_PATH,
+                        help=f"Fixture directory (default: {FIXTURES_PATH})")
+    commands = parser.add_subparsers(dest="command", required=True)
+    record_parser = commands.add_parser("record", help="Run a scraper and record its HTTP exchanges")
+    record_parser.add_argument("scraper", help="Scraper module, e.g. yapily_scraper")
+    record_parser.add_argument("scraper_args", nargs=argparse.REMAINDER,
+                               help="Arguments for the scraper (after --)")
+    commands.add_parser("list", help="List recorded exchanges")
+    args = parser.parse_args()
+
+    if args.command == "record":
+        scraper_args = args.scraper_args[1:] if args.scraper_args[:1] == ["--"] else args.scraper_args
+        recorded = record(args.scraper.removesuffix(".py"), args.dir, scraper_args)
+        print(f"\nRecorded {recorded} HTTP exchanges in {args.dir}")
+        return 0
+
+    store = FixtureStore(args.dir)
+    for signature, exchange in sorted(store.exchanges.items(), key=lambda item: item[1]["url"]):
+        size = (args.dir / exchange["body"]).stat().st_size
+        status = http.client.responses.get(exchange["status"], "")
+        print(f"  {signature}  {exchange['method']:<4} {exchange['url']}  "
+              f"{exchange['status']} {status}, {size / 1024:.0f} KB")
+    print(f"{len(store)} recorded exchanges in {args.dir}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+"""
+Local Stand-In Server for the Aggregator APIs
+
+Serves the endpoints the scrapers call, so they can run without live
+endpoints or credentials:
+- recorded fixtures (see fixtures.py) are replayed first, matched on method,
+  path + query and request body
+- otherwise synthetic data (see synthetic.py) answers Plaid's
+  POST /institutions/get (paginated per country), Yapily's GET /institutions,
+  YAXI's POST /search and the OpenSanctions GET /entities.ftm.json bulk file;
+  large bodies are generated and sent in chunks
+
+Point a scraper at it by replacing the scheme and host of its API URL
+constant with the server's, e.g. plaid_scraper.PLAID_API_URL.
+
+Usage:
+    # Synthetic data for 100k institutions on port 8700
+    python scrapers/benchmarks/standin_server.py --institutions 100000 --port 8700
+
+    # Replay recorded fixtures (synthetic data for everything else)
+    python scrapers/benchmarks/standin_server.py --fixtures scraped-data/fixtures
+"""
+
+import argparse
+import json
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Iterator, Optional
+from urllib.parse import urlsplit
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from fixtures import FixtureStore  # noqa: E402
+from synthetic import DEFAULT_KNOWN_FRACTION, SyntheticData, known_providers  # noqa: E402
+
+# Bytes collected before a chunk of a generated body is sent
+CHUNK_SIZE = 256 * 1024
+
+
+def standin_url(url: str, base_url: str) -> str:
+    """
+    Replace the scheme and host of url with those of the stand-in server.
+
+    A bare host (e.g. PLAID_API_URL) maps to the bare base URL, since the
+    scrapers append their endpoint paths to it.
+    """
+    parts = urlsplit(url)
+    target = parts.path
+    if parts.query:
+        target = f"{target}?{parts.query}"
+    return base_url.rstrip("/") + target
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server: "StandInServer"
+
+    def log_message(self, format, *args) -> None:
+        pass
+
+    def _read_body(self) -> bytes:
+        length = int(self.headers.get("Content-Length") or 0)
+        return self.rfile.read(length) if length else b""
+
+    def _send(self, status: int, body: bytes, headers: list = (),
+              content_type: str = "application/json") -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        for name, value in headers:
+            if name.lower() != "content-type":
+                self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_json(self, data, status: int = 200) -> None:
+        self._send(status, json.dumps(data).encode("utf-8"))
+
+    def _send_chunked(self, chunks: Iterator[bytes], headers: list = (),
+                      content_type: str = "application/json") -> None:
+        """Send a generated body with chunked transfer encoding."""
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        for name, value in headers:
+            self.send_header(name, value)
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        buffer = []
+        size = 0
+        for chunk in chunks:
+            buffer.append(chunk)
+            size += len(chunk)
+            if size >= CHUNK_SIZE:
+                data = b"".join(buffer)
+                self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+                buffer, size = [], 0
+        if buffer:
+            data = b"".join(buffer)
+            self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+        self.wfile.write(b"0\r\n\r\n")
+
+    def _replay(self, body: bytes) -> bool:
+        """Answer from the recorded fixtures, if the request was recorded."""
+        fixtures = self.server.fixtures
+        recorded = fixtures.lookup(self.command, self.path, body) if fixtures else None
+        if recorded is None:
+            return False
+        status, headers, content = recorded
+        content_type = next((value for name, value in headers if name.lower() == "content-type"),
+                            "application/octet-stream")
+        self._send(status, content, headers, content_type)
+        return True
+
+    def do_GET(self) -> None:
+        if self._replay(b""):
+            return
+        data = self.server.data
+        path = urlsplit(self.path).path
+        if path == "/institutions":
+            self._send_chunked(data.yapily_payload())
+        elif path.endswith("/entities.ftm.json"):
+            self._send_chunked(data.opensanctions_payload(),
+                               headers=[("ETag", f'"synthetic-{data.institutions}"')])
+        else:
+            self._send_json({"error": f"No stand-in for GET {path}"}, status=404)
+
+    def do_POST(self) -> None:
+        body = self._read_body()
+        if self._replay(body):
+            return
+        data = self.server.data
+        path = urlsplit(self.path).path
+        if path == "/institutions/get":
+            request = json.loads(body or b"{}")
+            country = (request.get("country_codes") or ["US"])[0]
+            self._send_json(data.plaid_page(country, int(request.get("offset", 0)),
+                                            int(request.get("count", 100)), self.server.plaid_countries))
+        elif path == "/search":
+            self._send_chunked(data.yaxi_payload())
+        else:
+            self._send_json({"error": f"No stand-in for POST {path}"}, status=404)
+
+
+class StandInServer(ThreadingHTTPServer):
+    """
+    Threaded stand-in server.
+
+    Args:
+        address: (host, port) to listen on; port 0 picks a free port
+        data: Synthetic data answering requests without a recorded fixture
+        fixtures: Recorded exchanges, replayed first
+        plaid_countries: Countries Plaid's institutions are spread over
+    """
+
+    daemon_threads = True
+
+    def __init__(self, address: tuple[str, int], data: SyntheticData,
+                 fixtures: Optional[FixtureStore] = None, plaid_countries: Optional[list[str]] = None):
+        super().__init__(address, StandInHandler)
+        self.data = data
+        self.fixtures = fixtures
+        self.plaid_countries = plaid_countries or ["US"]
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "StandInServer":
+        """Serve from a background thread."""
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+
+def plaid_country_codes() -> list[str]:
+    """The countries plaid_scraper requests institutions for."""
+    from plaid_scraper import PLAID_COUNTRIES
+
+    return list(PLAID_COUNTRIES.keys())
+
+
+def main():
+    """Main entry point with argument parsing."""
+    parser = argparse.ArgumentParser(description="Serve synthetic or recorded aggregator API responses")
+    parser.add_argument("--port", type=int, default=8700, help="Port to listen on (default: 8700)")
+    parser.add_argument("--institutions", type=int, default=10000,
+                        help="Synthetic institutions per payload (default: 10000)")
+    parser.add_argument("--known-fraction", type=float, default=DEFAULT_KNOWN_FRACTION,
+                        help=f"Share named after existing providers (default: {DEFAULT_KNOWN_FRACTION})")
+    parser.add_argument("--fixtures", type=Path, help="Replay recorded fixtures from this directory")
+    args = parser.parse_args()
+
+    known = known_providers() if args.known_fraction > 0 else []
+    data = SyntheticData(args.institutions, known, args.known_fraction)
+    fixtures = FixtureStore(args.fixtures) if args.fixtures else None
+    server = StandInServer(("127.0.0.1", args.port), data, fixtures, plaid_country_codes())
+    replaying = f", replaying {len(fixtures)} recorded exchanges" if fixtures else ""
+    print(f"Stand-in server on {server.base_url} ({args.institutions} synthetic institutions{replaying})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
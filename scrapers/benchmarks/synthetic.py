@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+"""
+Synthetic Aggregator Payloads
+
+Generates Plaid, Yapily, YAXI and OpenSanctions payloads of any size (10k to
+1M institutions) in the shape the scrapers parse, for the stand-in server and
+the scraper benchmarks. Institution i is a pure function of i, so a page or a
+line can be generated without materializing the rest, and two runs produce
+the same data:
+- names combine a prefix, a made-up place and a generic bank word, spread
+  over the index so neighbouring institutions differ
+- a fraction of institutions reuse existing provider names (with their
+  countries), so the benchmarks exercise the update and fuzzy-match paths
+  as well as provider creation
+
+Usage:
+    from synthetic import SyntheticData
+
+    data = SyntheticData(10000, known=known_providers())
+    page = data.plaid_page("GB", offset=0, count=500, countries=["US", "GB"])
+
+    # Write a payload to a file
+    python scrapers/benchmarks/synthetic.py yapily --institutions 100000 --output yapily.json
+"""
+
+import argparse
+import base64
+import hashlib
+import json
+import sys
+from pathlib import Path
+from typing import Iterator, Optional
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from slugs import slugify  # noqa: E402
+
+# Share of institutions named after existing providers
+DEFAULT_KNOWN_FRACTION = 0.3
+
+PREFIXES = [
+    "First", "United", "Citizens", "Community", "Peoples", "National", "Metro",
+    "Pacific", "Atlantic", "Heritage", "Pioneer", "Summit", "Liberty", "Harbor",
+    "Valley", "Northern", "Southern", "Eastern", "Western", "Central",
+]
+SYLLABLES = [
+    "ar", "bel", "cor", "dal", "en", "fen", "gar", "hol", "is", "jor", "kel",
+    "lin", "mar", "nor", "ost", "pra", "quin", "ros", "sil", "tor", "ul",
+    "ver", "wes", "yar", "zen",
+]
+CORES = [
+    "Bank", "Savings Bank", "Credit Union", "Trust", "Building Society",
+    "Cooperative Bank", "Sparkasse", "Banque", "Capital", "Financial",
+    "Investments", "Federal Savings",
+]
+NAME_COMBINATIONS = len(PREFIXES) * len(SYLLABLES) ** 2 * len(CORES)
+# Coprime with NAME_COMBINATIONS, so i -> name is a bijection within each round
+NAME_STRIDE = 7919
+
+PLAID_PRODUCTS = ["auth", "balance", "identity", "transactions", "investments", "liabilities"]
+YAPILY_COUNTRIES = ["GB", "DE", "FR", "ES", "IT", "NL", "BE", "AT", "IE", "SE", "DK", "NO", "FI", "PL", "PT"]
+YAXI_COUNTRIES = ["DE", "AT", "CH"]
+OPENSANCTIONS_COUNTRIES = ["de", "fr", "it", "es", "us", "gb", "ch", "at", "nl", "pl", "br", "in", "jp", "za"]
+
+ALPHANUMERIC = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+
+# A stand-in logo, comparable in size to the base64 logos Plaid returns
+LOGO = base64.b64encode(hashlib.sha512(b"logo").digest() * 24).decode("ascii")
+
+
+def known_providers(limit: Optional[int] = None) -> list[tuple[str, list[str]]]:
+    """
+    Names and countries of existing providers, to mix into synthetic data.
+
+    Returns:
+        List of (name, countries) tuples, sorted by provider ID
+    """
+    from provider_index import ACCOUNT_PROVIDERS_PATH, load_provider_index
+
+    index = load_provider_index(ACCOUNT_PROVIDERS_PATH)
+    providers = []
+    for provider_id in sorted(index.ids):
+        name = index.get_name(provider_id)
+        if name:
+            providers.append((name, index.get_countries(provider_id) or []))
+    return providers[:limit] if limit else providers
+
+
+class SyntheticData:
+    """
+    Deterministic synthetic institutions.
+
+    Args:
+        institutions: Number of institutions (per payload; Plaid spreads them
+            over the requested countries)
+        known: (name, countries) of existing providers to reuse
+        known_fraction: Share of institutions that reuse a known name
+    """
+
+    def __init__(self, institutions: int, known: Optional[list[tuple[str, list[str]]]] = None,
+                 known_fraction: float = DEFAULT_KNOWN_FRACTION):
+        self.institutions = institutions
+        self.known = known or []
+        self.known_percent = int(known_fraction * 100) if self.known else 0
+
+    def name(self, i: int) -> tuple[str, Optional[str]]:
+        """Return (name, country of the known provider or None) of institution i."""
+        if (i * 2654435761) % 100 < self.known_percent:
+            name, countries = self.known[(i * 40503) % len(self.known)]
+            return name, countries[0] if countries else None
+        position, round_ = (i * NAME_STRIDE) % NAME_COMBINATIONS, i // NAME_COMBINATIONS
+        position, core = divmod(position, len(CORES))
+        position, second = divmod(position, len(SYLLABLES))
+        prefix, first = divmod(position, len(SYLLABLES))
+        place = (SYLLABLES[first] + SYLLABLES[second]).capitalize()
+        name = f"{PREFIXES[prefix]} {place} {CORES[core]}"
+        return (f"{name} {round_ + 1}" if round_ else name), None
+
+    def plaid_institution(self, i: int, country: str) -> dict:
+        """Plaid /institutions/get entry for institution i."""
+        name, _ = self.name(i)
+        slug = slugify(name)
+        return {
+            "institution_id": f"ins_{100000 + i}",
+            "name": name,
+            "products": PLAID_PRODUCTS[:2 + i % 5],
+            "country_codes": [country],
+            "url": f"https://www.{slug}.com" if i % 4 else None,
+            "primary_color": f"#{i * 2654435761 % 0xFFFFFF:06x}",
+            "logo": LOGO if i % 3 == 0 else None,
+            "routing_numbers": [f"{(i * 7919) % 10 ** 9:09d}"] if country == "US" else [],
+            "oauth": i % 2 == 0,
+            "status": None,
+        }
+
+    def plaid_page(self, country: str, offset: int, count: int, countries: list[str]) -> dict:
+        """
+        Plaid /institutions/get response for one country.
+
+        The institutions are spread evenly over countries; country picks the
+        slice this page comes from.
+        """
+        per_country = -(-self.institutions // len(countries))
+        start = countries.index(country) * per_country if country in countries else 0
+        total = max(0, min(per_country, self.institutions - start))
+        end = min(total, offset + count)
+        return {
+            "institutions": [self.plaid_institution(start + i, country) for i in range(offset, end)],
+            "total": total,
+            "request_id": f"synthetic-{country}-{offset}",
+        }
+
+    def yapily_institution(self, i: int) -> dict:
+        """Yapily /institutions entry for institution i."""
+        name, known_country = self.name(i)
+        country = known_country or YAPILY_COUNTRIES[i % len(YAPILY_COUNTRIES)]
+        return {
+            "id": f"{slugify(name).replace('-', '')}_{i}",
+            "name": name,
+            "fullName": f"{name} Ltd" if i % 2 else name,
+            "countries": [{"displayName": country, "countryCode2": country}],
+            "environmentType": "LIVE",
+            "credentialsType": "OPEN_BANKING_UK_AUTO",
+            "media": [{"source": f"https://images.yapily.com/image/{i}/icon.png", "type": "icon"}],
+            "features": ["ACCOUNT_TRANSACTIONS", "ACCOUNT_BALANCES", "INITIATE_DOMESTIC_SINGLE_PAYMENT"],
+        }
+
+    def yapily_payload(self) -> Iterator[bytes]:
+        """Yapily /institutions response body, in chunks."""
+        meta = {"tracingId": "synthetic", "count": self.institutions}
+        yield b'{"meta": ' + json.dumps(meta).encode() + b', "data": ['
+        for i in range(self.institutions):
+            yield (b", " if i else b"") + json.dumps(self.yapily_institution(i)).encode()
+        yield b"]}"
+
+    def yaxi_connection(self, i: int) -> dict:
+        """YAXI /search entry for institution i."""
+        name, known_country = self.name(i)
+        country = known_country or YAXI_COUNTRIES[i % len(YAXI_COUNTRIES)]
+        return {
+            "id": f"{i:08x}-0000-4000-8000-{i * 2654435761 % 16 ** 12:012x}",
+            "displayName": name,
+            "countries": [country],
+            "logoId": f"logo-{i}",
+            "ibanDetection": True,
+        }
+
+    def yaxi_payload(self) -> Iterator[bytes]:
+        """YAXI /search response body, in chunks."""
+        yield b"["
+        for i in range(self.institutions):
+            yield (b", " if i else b"") + json.dumps(self.yaxi_connection(i)).encode()
+        yield b"]"
+
+    def opensanctions_entity(self, i: int) -> dict:
+        """OpenSanctions iso9362_bic entity for institution i."""
+        name, known_country = self.name(i)
+        country = (known_country or OPENSANCTIONS_COUNTRIES[i % len(OPENSANCTIONS_COUNTRIES)]).lower()
+        # Bank code from the low base-26 digits of i, location from the rest
+        rest, letters = i, ""
+        for _ in range(4):
+            rest, letter = divmod(rest, 26)
+            letters += ALPHANUMERIC[10 + letter]
+        location = ALPHANUMERIC[(10 + rest // 36) % 36] + ALPHANUMERIC[rest % 36]
+        bic = f"{letters}{country.upper()}{location}" + ("XXX" if i % 3 == 0 else "")
+        return {
+            "id": f"iso9362-{hashlib.sha1(bic.encode()).hexdigest()[:14]}",
+            "caption": name,
+            "schema": "Organization",
+            "properties": {
+                "name": [name],
+                "country": [country],
+                "swiftBic": [bic],
+                "address": [f"{i % 200 + 1} Main Street"],
+                "topics": ["fin"],
+            },
+            "referents": [],
+            "datasets": ["iso9362_bic"],
+            "first_seen": "2024-01-01T00:00:00",
+            "last_seen": "2026-01-01T00:00:00",
+            "target": False,
+        }
+
+    def opensanctions_payload(self) -> Iterator[bytes]:
+        """OpenSanctions entities.ftm.json body (one entity per line), in chunks."""
+        for i in range(self.institutions):
+            yield json.dumps(self.opensanctions_entity(i)).encode() + b"\n"
+
+
+PAYLOADS = ("plaid", "yapily", "yaxi", "opensanctions")
+
+
+def main():
+    """Main entry point with argument parsing."""
+    parser = argparse.ArgumentParser(description="Write a synthetic aggregator payload")
+    parser.add_argument("payload", choices=PAYLOADS, help="Payload to generate")
+    parser.add_argument("--institutions", type=int, default=10000, help="Number of institutions (default: 10000)")
+    parser.add_argument("--known-fraction", type=float, default=DEFAULT_KNOWN_FRACTION,
+                        help=f"Share named after existing providers (default: {DEFAULT_KNOWN_FRACTION})")
+    parser.add_argument("--output", type=Path, help="Output file (default: stdout)")
+    args = parser.parse_args()
+
+    known = known_providers() if args.known_fraction > 0 else []
+    data = SyntheticData(args.institutions, known, args.known_fraction)
+    if args.payload == "plaid":
+        page = data.plaid_page("US", 0, args.institutions, ["US"])
+        chunks = iter([json.dumps(page).encode()])
+    else:
+        chunks = getattr(data, f"{args.payload}_payload")()
+
+    output = open(args.output, "wb") if args.output else sys.stdout.buffer
+    try:
+        for chunk in chunks:
+            output.write(chunk)
+    finally:
+        if args.output:
+            output.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
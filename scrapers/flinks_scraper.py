@@ -12,10 +12,6 @@ It updates:
 
 Source: https://status.flinks.com/
 
-REQUIREMENTS:
-- requests (pip install requests)
-- beautifulsoup4 (pip install beautifulsoup4)
-
 Usage:
     # Scrape from status page
     python scrapers/flinks_scraper.py
@@ -28,23 +24,22 @@ Usage:
 """
 
 import argparse
+import html
+import http.client
 import json
 import re
-import subprocess
 import sys
 from datetime import datetime
 from pathlib import Path
 from typing import Optional
 
-# Try to import requests and BeautifulSoup
-DEPS_AVAILABLE = False
-try:
-    import requests
-    from bs4 import BeautifulSoup
-    DEPS_AVAILABLE = True
-except ImportError:
-    pass
-
+from aggregator_snapshot import AggregatorSnapshot
+from http_cache import add_cache_arguments, cache_from_args
+from http_client import HTTPClient
+from json_writer import save_json
+from provider_index import ProviderIndex, load_provider_index
+from provider_reconcile import ReconcilePlan
+from slugs import slugify
 
 # URLs
 FLINKS_STATUS_URL = "https://status.flinks.com/"
@@ -58,6 +53,20 @@ SCRAPED_DATA_PATH = BASE_PATH / "scraped-data" / "flinks"
 
 # Request settings
 REQUEST_TIMEOUT = 30
+HTTP_CLIENT = HTTPClient(timeout=REQUEST_TIMEOUT)
+
+# Status page elements, in document order: comments/scripts/styles (skipped),
+# div start and end tags (to find the component groups), section headings and links
+STATUS_PAGE_EVENTS = re.compile(
+    r'<!--.*?-->|<(script|style)\b.*?</\1\s*>'
+    r'|<div\b([^>]*)>|(</div)\s*>'
+    r'|<(h[23])\b[^>]*>(.*?)</\4\s*>'
+    r'|<a\b([^>]*)>(.*?)</a\s*>',
+    re.DOTALL | re.IGNORECASE
+)
+LINK_HREF = re.compile(r'\bhref\s*=\s*(["\']?)([^"\'\s>]*)\1', re.IGNORECASE)
+CLASS_ATTRIBUTE = re.compile(r'\bclass\s*=\s*(["\']?)([^"\'>]*)\1', re.IGNORECASE)
+HTML_TAG = re.compile(r'<[^>]*>')
 
 # Flinks market coverage - known markets
 FLINKS_MARKETS = {
@@ -129,59 +138,6 @@ BANK_NAME_MAPPINGS = {
     "BMO Nesbitt Burns": "BMO Nesbitt Burns",
 }
 
-# Transliteration map for special characters
-TRANSLITERATIONS = {
-    'ä': 'ae', 'ö': 'oe', 'ü': 'ue', 'ß': 'ss',
-    'Ä': 'ae', 'Ö': 'oe', 'Ü': 'ue',
-    'á': 'a', 'à': 'a', 'â': 'a', 'ã': 'a', 'å': 'a', 'ą': 'a',
-    'é': 'e', 'è': 'e', 'ê': 'e', 'ë': 'e', 'ę': 'e', 'ě': 'e',
-    'í': 'i', 'ì': 'i', 'î': 'i', 'ï': 'i',
-    'ó': 'o', 'ò': 'o', 'ô': 'o', 'õ': 'o', 'ø': 'o', 'ő': 'o',
-    'ú': 'u', 'ù': 'u', 'û': 'u', 'ű': 'u',
-    'ý': 'y', 'ÿ': 'y',
-    'ñ': 'n', 'ń': 'n',
-    'ç': 'c', 'ć': 'c', 'č': 'c',
-    'ş': 's', 'ś': 's', 'š': 's',
-    'ž': 'z', 'ź': 'z', 'ż': 'z',
-    'ł': 'l', 'đ': 'd', 'ř': 'r',
-    'ţ': 't', 'ť': 't',
-    'æ': 'ae', 'œ': 'oe',
-    'ă': 'a', 'ș': 's', 'ț': 't',
-}
-
-
-def slugify(name: str) -> str:
-    """
-    Convert a bank name to a slug suitable for use as an ID.
-    
-    Args:
-        name: The bank name to convert
-        
-    Returns:
-        A lowercase, hyphenated slug
-        
-    Example:
-        >>> slugify("Royal Bank of Canada")
-        'royal-bank-of-canada'
-    """
-    # Apply transliterations
-    slug = name
-    for char, replacement in TRANSLITERATIONS.items():
-        slug = slug.replace(char, replacement)
-        slug = slug.replace(char.upper(), replacement)
-    
-    # Convert to lowercase
-    slug = slug.lower()
-    # Remove special characters, keep alphanumeric and spaces
-    slug = re.sub(r'[^a-z0-9\s-]', '', slug)
-    # Replace spaces with hyphens
-    slug = re.sub(r'\s+', '-', slug)
-    # Remove multiple consecutive hyphens
-    slug = re.sub(r'-+', '-', slug)
-    # Remove leading/trailing hyphens
-    slug = slug.strip('-')
-    return slug
-
 
 def fetch_url(url: str) -> Optional[str]:
     """
@@ -195,29 +151,14 @@ def fetch_url(url: str) -> Optional[str]:
     """
     print(f"Fetching {url}...")
     
-    if DEPS_AVAILABLE:
-        try:
-            response = requests.get(url, timeout=REQUEST_TIMEOUT)
-            response.raise_for_status()
-            return response.text
-        except Exception as e:
-            print(f"  Warning: Failed to fetch {url}: {e}")
-            return None
-    else:
-        # Fallback to curl
-        try:
-            result = subprocess.run(
-                ["curl", "-s", "-L", "--connect-timeout", str(REQUEST_TIMEOUT), url],
-                capture_output=True,
-                text=True,
-                timeout=REQUEST_TIMEOUT + 10
-            )
-            if result.returncode == 0 and result.stdout:
-                return result.stdout
-            return None
-        except Exception as e:
-            print(f"  Warning: Failed to fetch {url}: {e}")
-            return None
+    try:
+        response = HTTP_CLIENT.get(url)
+        response.raise_for_status()
+    except (OSError, http.client.HTTPException) as e:
+        print(f"  Warning: Failed to fetch {url}: {e}")
+        return None
+    print(f"  {response.timing}")
+    return response.text or None
 
 
 def load_json(path: Path) -> dict:
@@ -226,26 +167,6 @@ def load_json(path: Path) -> dict:
         return json.load(f)
 
 
-def save_json(path: Path, data: dict) -> None:
-    """Save data to a JSON file with consistent formatting."""
-    with open(path, "w", encoding="utf-8") as f:
-        json.dump(data, f, indent=2)
-        f.write("\n")
-
-
-def get_existing_provider_ids() -> set[str]:
-    """
-    Get the set of existing account provider IDs.
-    
-    Returns:
-        A set of provider ID strings
-    """
-    provider_ids = set()
-    for json_file in ACCOUNT_PROVIDERS_PATH.glob("*.json"):
-        provider_ids.add(json_file.stem)
-    return provider_ids
-
-
 def find_matching_provider(bank_id: str, existing_ids: set[str]) -> Optional[str]:
     """
     Find an existing provider ID that matches the given bank ID.
@@ -337,30 +258,30 @@ def create_account_provider(bank: dict) -> dict:
     return provider
 
 
-def add_flinks_to_existing_provider(provider_path: Path) -> bool:
+def element_text(fragment: str) -> str:
+    """Text of an HTML fragment: tags removed, references decoded, whitespace collapsed."""
+    return " ".join(html.unescape(HTML_TAG.sub("", fragment)).split())
+
+
+def section_country(title: str) -> Optional[str]:
     """
-    Add 'flinks' to an existing provider's apiAggregators list.
-    
+    Determine the country of a status page section from its title.
+
     Args:
-        provider_path: Path to the provider JSON file
-        
+        title: Section heading text
+
     Returns:
-        True if the file was modified, False otherwise
+        Country code, or None for sections that are skipped
     """
-    provider = load_json(provider_path)
-    
-    aggregators = provider.get("apiAggregators", [])
-    if aggregators is None:
-        aggregators = []
-    
-    if "flinks" not in aggregators:
-        aggregators.append("flinks")
-        aggregators.sort()
-        provider["apiAggregators"] = aggregators
-        save_json(provider_path, provider)
-        return True
-    
-    return False
+    if "Canada" in title:
+        return "CA"
+    if "USA" in title or "US" in title:
+        return "US"
+    if "Wealth" in title:
+        # Wealth institutions are typically Canadian
+        return "CA"
+    # Payment services (FlinksPay: EFT, Interac, etc.), incident history, ...
+    return None
 
 
 def parse_status_page(html: str) -> dict[str, list[dict]]:
@@ -372,171 +293,71 @@ def parse_status_page(html: str) -> dict[str, list[dict]]:
     - Major Financial Institutions - USA
     - Wealth Financial Institutions
     
+    The page is scanned once from start to end: STATUS_PAGE_EVENTS yields the
+    div tags, section headings (h2/h3) and links in document order. Open divs
+    are counted to know when the current <div class="component-group"> ends;
+    its first heading names the section, and its component links
+    (<a href=".../components/...">) are taken as banks of that section.
+    Headings and links outside a component group (incident history, ...)
+    are ignored.
+    
     Args:
         html: The HTML content of the status page
         
     Returns:
         A dictionary mapping country codes to lists of bank data
     """
-    if not DEPS_AVAILABLE:
-        print("  Warning: beautifulsoup4 not available, using regex parsing")
-        return parse_status_page_regex(html)
-    
-    soup = BeautifulSoup(html, 'html.parser')
     all_banks = {"CA": [], "US": []}
     seen_names = set()
-    
-    # Find all component groups (sections)
-    sections = soup.find_all('div', class_='component-group')
-    
-    for section in sections:
-        # Get section title
-        title_elem = section.find('h2') or section.find('h3')
-        if not title_elem:
+    depth = 0  # Open divs
+    group_depth = None  # Depth of the enclosing component group, if any
+    country = None
+    titled = False
+    
+    for match in STATUS_PAGE_EVENTS.finditer(html):
+        div, div_end, heading, title, attributes, text = match.group(2, 3, 4, 5, 6, 7)
+        if div is not None:
+            depth += 1
+            if group_depth is None:
+                classes = CLASS_ATTRIBUTE.search(div)
+                if classes and "component-group" in classes.group(2).split():
+                    group_depth = depth
+                    country = None
+                    titled = False
             continue
-        
-        title = title_elem.get_text(strip=True)
-        
-        # Determine country from section title
-        if "Canada" in title:
-            country = "CA"
-        elif "USA" in title or "US" in title:
-            country = "US"
-        elif "Wealth" in title:
-            # Wealth institutions are typically Canadian
-            country = "CA"
-        elif "FlinksPay" in title or "Pay" in title:
-            # Skip payment services section (EFT, Interac, etc.)
+        if div_end:
+            if depth == group_depth:
+                group_depth = None
+                country = None
+            depth = max(depth - 1, 0)
             continue
-        else:
+        if group_depth is None:
+            continue
+        if heading:
+            if not titled:
+                country = section_country(element_text(title))
+                titled = True
+            continue
+        if not attributes or not country:
+            # Comment, script or style, or a link outside the bank sections
+            continue
+        href = LINK_HREF.search(attributes)
+        if not href or '/components/' not in href.group(2):
             continue
         
-        # Find all bank links in this section
-        links = section.find_all('a', href=True)
-        
-        for link in links:
-            href = link.get('href', '')
-            # Only process component links (not issue links)
-            if '/components/' not in href:
-                continue
-            
-            bank_name = link.get_text(strip=True)
-            
-            # Skip empty or already seen
-            if not bank_name or bank_name in seen_names:
-                continue
-            
-            # Apply name mapping
-            mapped_name = BANK_NAME_MAPPINGS.get(bank_name, bank_name)
-            
-            # Skip if mapping returns None (e.g., test banks)
-            if mapped_name is None:
-                continue
-            
-            seen_names.add(bank_name)
-            
-            all_banks[country].append({
-                "name": mapped_name,
-                "country": country,
-                "status_page_name": bank_name,
-            })
-    
-    # If BeautifulSoup didn't find anything, try regex
-    if not all_banks["CA"] and not all_banks["US"]:
-        return parse_status_page_regex(html)
-    
-    return all_banks
-
-
-def parse_status_page_regex(html: str) -> dict[str, list[dict]]:
-    """
-    Parse the Flinks status page using regex (fallback method).
-    
-    Args:
-        html: The HTML content of the status page
+        bank_name = element_text(text)
+        if not bank_name or bank_name in seen_names:
+            continue
+        mapped_name = BANK_NAME_MAPPINGS.get(bank_name, bank_name)
+        if mapped_name is None:
+            continue
         
-    Returns:
-        A dictionary mapping country codes to lists of bank data
-    """
-    all_banks = {"CA": [], "US": []}
-    seen_names = set()
-    
-    # Find bank links with pattern: <a href="/components/...">Bank Name</a>
-    # The sections are marked with headers like "Major Financial Institutions - Canada"
-    
-    # Split by section headers
-    canada_section = ""
-    usa_section = ""
-    wealth_section = ""
-    
-    # Find Canada section
-    canada_match = re.search(
-        r'Major Financial Institutions - Canada.*?(?=Major Financial Institutions - USA|Wealth Financial|$)',
-        html, re.DOTALL | re.IGNORECASE
-    )
-    if canada_match:
-        canada_section = canada_match.group(0)
-    
-    # Find USA section  
-    usa_match = re.search(
-        r'Major Financial Institutions - USA.*?(?=Wealth Financial|FlinksPay|Recent History|$)',
-        html, re.DOTALL | re.IGNORECASE
-    )
-    if usa_match:
-        usa_section = usa_match.group(0)
-    
-    # Note: We skip the FlinksPay section as it contains payment services (EFT, Interac)
-    # not financial institutions
-    
-    # Find Wealth section
-    wealth_match = re.search(
-        r'Wealth Financial Institutions.*?(?=FlinksPay|Recent History|$)',
-        html, re.DOTALL | re.IGNORECASE
-    )
-    if wealth_match:
-        wealth_section = wealth_match.group(0)
-    
-    # Extract bank names from each section
-    link_pattern = re.compile(r'href="[^"]*?/components/[^"]*?"[^>]*>([^<]+)</a>', re.IGNORECASE)
-    
-    # Process Canada section
-    for match in link_pattern.finditer(canada_section):
-        bank_name = match.group(1).strip()
-        if bank_name and bank_name not in seen_names:
-            mapped_name = BANK_NAME_MAPPINGS.get(bank_name, bank_name)
-            if mapped_name is not None:
-                seen_names.add(bank_name)
-                all_banks["CA"].append({
-                    "name": mapped_name,
-                    "country": "CA",
-                    "status_page_name": bank_name,
-                })
-    
-    # Process USA section
-    for match in link_pattern.finditer(usa_section):
-        bank_name = match.group(1).strip()
-        if bank_name and bank_name not in seen_names:
-            mapped_name = BANK_NAME_MAPPINGS.get(bank_name, bank_name)
-            if mapped_name is not None:
-                seen_names.add(bank_name)
-                all_banks["US"].append({
-                    "name": mapped_name,
-                    "country": "US",
-                    "status_page_name": bank_name,
-                })
-    
-    # Process Wealth section (add to Canada)
-    for match in link_pattern.finditer(wealth_section):
-        bank_name = match.group(1).strip()
-        if bank_name and bank_name not in seen_names:
-            mapped_name = BANK_NAME_MAPPINGS.get(bank_name, bank_name)
-            if mapped_name is not None:
-                seen_names.add(bank_name)
-                all_banks["CA"].append({
-                    "name": mapped_name,
-                    "country": "CA",
-                    "status_page_name": bank_name,
-                })
+        seen_names.add(bank_name)
+        all_banks[country].append({
+            "name": mapped_name,
+            "country": country,
+            "status_page_name": bank_name,
+        })
     
     return all_banks
 
@@ -597,27 +418,19 @@ def update_flinks_coverage(country_codes: list[str]) -> None:
         print("  No changes to market coverage.")
 
 
-def update_bank_providers(all_banks: dict[str, list[dict]]) -> None:
+def plan_bank_providers(all_banks: dict[str, list[dict]], index: ProviderIndex,
+                        apply_fuzzy: bool = False) -> ReconcilePlan:
     """
-    Create/update account providers from scraped bank data.
+    Match scraped banks against the providers and plan the changes.
     
     Args:
         all_banks: Dictionary mapping country codes to lists of bank data
+        index: The provider index (planned providers are added to it)
+        apply_fuzzy: Update providers found only by fuzzy matching (default:
+            report them)
     """
-    print("\n=== Updating Bank Providers ===\n")
-    
-    # Count total banks
-    total_banks = sum(len(banks) for banks in all_banks.values())
-    print(f"Processing {total_banks} banks from {len(all_banks)} markets...")
-    
-    # Get existing provider IDs
-    existing_ids = get_existing_provider_ids()
-    print(f"Found {len(existing_ids)} existing account providers")
-    
-    # Track statistics
-    new_count = 0
-    updated_count = 0
-    skipped_count = 0
+    # Plan all changes in memory; files are written once, when the plan is executed
+    plan = ReconcilePlan(index, "flinks", apply_fuzzy=apply_fuzzy)
     
     # Process all banks
     for country_code, banks in all_banks.items():
@@ -628,29 +441,82 @@ def update_bank_providers(all_banks: dict[str, list[dict]]) -> None:
                 continue
             
             # Try to find a matching existing provider
-            matching_id = find_matching_provider(bank_id, existing_ids)
-            
+            matching_id, score = plan.match(bank["name"], bank_id, country_code, find_matching_provider)
             if matching_id:
                 # Add Flinks to existing provider's aggregators
-                provider_path = ACCOUNT_PROVIDERS_PATH / f"{matching_id}.json"
-                if add_flinks_to_existing_provider(provider_path):
-                    updated_count += 1
-                    if matching_id != bank_id:
-                        print(f"  Updated: {bank['name']} -> {matching_id}.json (added flinks)")
-                    else:
-                        print(f"  Updated: {bank['name']} (added flinks)")
-                else:
-                    skipped_count += 1
+                plan.update(bank["name"], bank_id, matching_id, score=score, source=bank)
             else:
                 # Create new provider
-                provider_path = ACCOUNT_PROVIDERS_PATH / f"{bank_id}.json"
-                provider = create_account_provider(bank)
-                save_json(provider_path, provider)
-                existing_ids.add(bank_id)
-                new_count += 1
-                print(f"  Created: {bank['name']} ({bank_id}.json)")
+                plan.create(bank["name"], create_account_provider(bank), source=bank)
     
-    print(f"\nSummary: {new_count} new, {updated_count} updated, {skipped_count} already had flinks")
+    return plan
+
+
+def report_bank_providers(stats: dict) -> None:
+    """Print the summary of an executed plan."""
+    print(f"\nSummary: {stats['created']} new, {stats['updated']} updated, "
+          f"{stats['unchanged']} already had flinks, {stats['conflicts']} conflicting names merged, "
+          f"{stats['fuzzy']} fuzzy matches not applied")
+
+
+def bank_snapshot(full: bool = False) -> AggregatorSnapshot:
+    """
+    The banks of the last run, to reconcile only the ones that changed.
+    
+    Args:
+        full: Reconcile every bank, not only the changed ones
+    """
+    return AggregatorSnapshot(
+        "flinks", SCRAPED_DATA_PATH,
+        key=lambda bank: f"{bank['country']}/{bank.get('status_page_name', bank['name'])}",
+        normalize=lambda bank: {"name": bank["name"], "country": bank["country"]},
+        full=full,
+    )
+
+
+def bank_delta(all_banks: dict[str, list[dict]], snapshot: AggregatorSnapshot) -> dict[str, list[dict]]:
+    """The banks of each country that the snapshot passes on (see AggregatorSnapshot.delta())."""
+    return {country_code: list(snapshot.delta(banks)) for country_code, banks in all_banks.items()}
+
+
+def update_bank_providers(all_banks: dict[str, list[dict]], dry_run: bool = False, full: bool = False,
+                          apply_fuzzy: bool = False) -> None:
+    """
+    Create/update account providers from scraped bank data.
+    
+    Args:
+        all_banks: Dictionary mapping country codes to lists of bank data
+        dry_run: Print the planned changes instead of making them
+        full: Reconcile every bank, not only the ones that changed since
+            the last run's snapshot, and check every provider file for
+            edits made in place
+        apply_fuzzy: Update providers found only by fuzzy matching (default:
+            report them)
+    """
+    print("\n=== Updating Bank Providers ===\n")
+    
+    # Count total banks
+    total_banks = sum(len(banks) for banks in all_banks.values())
+    print(f"Processing {total_banks} banks from {len(all_banks)} markets...")
+    
+    # Get existing provider IDs
+    index = load_provider_index(ACCOUNT_PROVIDERS_PATH, verify=full)
+    print(f"Found {len(index.ids)} existing account providers")
+    
+    snapshot = bank_snapshot(full)
+    plan = plan_bank_providers(bank_delta(all_banks, snapshot), index, apply_fuzzy)
+    snapshot.print_report()
+    
+    if dry_run:
+        plan.print_plan()
+        plan.discard()
+        return
+    
+    stats = plan.execute()
+    index.save()
+    report_bank_providers(stats)
+    snapshot.forget(plan.unapplied())
+    snapshot.save()
 
 
 def save_scraped_data(all_banks: dict[str, list[dict]]) -> None:
@@ -711,18 +577,26 @@ Examples:
         action="store_true",
         help="Show what would be done without making changes"
     )
+    parser.add_argument(
+        "--full",
+        action="store_true",
+        help="Reconcile every bank, not only those changed since the last run's snapshot, "
+             "and check provider files for edits made in place"
+    )
+    parser.add_argument(
+        "--apply-fuzzy",
+        action="store_true",
+        help="Add the aggregator to providers found only by fuzzy name matching (default: report them)"
+    )
     
+    add_cache_arguments(parser)
     args = parser.parse_args()
+    HTTP_CLIENT.cache = cache_from_args(args)
     
     print("=" * 60)
     print("Flinks Bank Coverage Scraper")
     print("=" * 60)
     
-    # Check for dependencies
-    if not DEPS_AVAILABLE:
-        print("\nNote: requests/beautifulsoup4 not available, using fallback methods.")
-        print("Install for better parsing: pip install requests beautifulsoup4")
-    
     all_banks = {}
     
     if args.coverage_only:
@@ -762,10 +636,8 @@ Examples:
     
     # Update bank providers (unless skipped)
     if not args.skip_providers and not args.coverage_only and all_banks:
-        if not args.dry_run:
-            update_bank_providers(all_banks)
-        else:
-            print(f"[DRY RUN] Would process bank providers")
+        update_bank_providers(all_banks, dry_run=args.dry_run, full=args.full,
+                              apply_fuzzy=args.apply_fuzzy)
     else:
         print("\nSkipping provider updates.")
     
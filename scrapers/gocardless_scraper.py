@@ -28,11 +28,15 @@ Usage:
 import argparse
 import csv
 import json
-import re
 from datetime import datetime
 from pathlib import Path
 from typing import Optional
 
+from json_writer import save_json
+from provider_index import load_provider_index
+from provider_reconcile import ReconcilePlan
+from slugs import slugify
+
 
 # Paths relative to this script's location
 BASE_PATH = Path(__file__).parent.parent
@@ -85,55 +89,6 @@ COUNTRY_NAMES = {
     "SK": "Slovakia",
 }
 
-# Transliteration map for special characters
-TRANSLITERATIONS = {
-    'ä': 'ae', 'ö': 'oe', 'ü': 'ue', 'ß': 'ss',
-    'Ä': 'ae', 'Ö': 'oe', 'Ü': 'ue',
-    'á': 'a', 'à': 'a', 'â': 'a', 'ã': 'a', 'å': 'a', 'ą': 'a',
-    'é': 'e', 'è': 'e', 'ê': 'e', 'ë': 'e', 'ę': 'e', 'ě': 'e',
-    'í': 'i', 'ì': 'i', 'î': 'i', 'ï': 'i',
-    'ó': 'o', 'ò': 'o', 'ô': 'o', 'õ': 'o', 'ø': 'o', 'ő': 'o',
-    'ú': 'u', 'ù': 'u', 'û': 'u', 'ű': 'u',
-    'ý': 'y', 'ÿ': 'y',
-    'ñ': 'n', 'ń': 'n',
-    'ç': 'c', 'ć': 'c', 'č': 'c',
-    'ş': 's', 'ś': 's', 'š': 's',
-    'ž': 'z', 'ź': 'z', 'ż': 'z',
-    'ł': 'l', 'đ': 'd', 'ř': 'r',
-    'ţ': 't', 'ť': 't',
-    'æ': 'ae', 'œ': 'oe',
-    'ă': 'a', 'ș': 's', 'ț': 't',
-}
-
-
-def slugify(name: str) -> str:
-    """
-    Convert a bank name to a slug suitable for use as an ID.
-    
-    Args:
-        name: The bank name to convert
-        
-    Returns:
-        A lowercase, hyphenated slug
-    """
-    # Apply transliterations
-    slug = name
-    for char, replacement in TRANSLITERATIONS.items():
-        slug = slug.replace(char, replacement)
-        slug = slug.replace(char.upper(), replacement)
-    
-    # Convert to lowercase
-    slug = slug.lower()
-    # Remove special characters, keep alphanumeric and spaces
-    slug = re.sub(r'[^a-z0-9\s-]', '', slug)
-    # Replace spaces with hyphens
-    slug = re.sub(r'\s+', '-', slug)
-    # Remove multiple consecutive hyphens
-    slug = re.sub(r'-+', '-', slug)
-    # Remove leading/trailing hyphens
-    slug = slug.strip('-')
-    return slug
-
 
 def parse_countries(country_str: str) -> list[str]:
     """
@@ -166,26 +121,6 @@ def load_json(path: Path) -> dict:
         return json.load(f)
 
 
-def save_json(path: Path, data: dict) -> None:
-    """Save data to a JSON file with consistent formatting."""
-    with open(path, "w", encoding="utf-8") as f:
-        json.dump(data, f, indent=2, ensure_ascii=False)
-        f.write("\n")
-
-
-def get_existing_provider_ids() -> set[str]:
-    """
-    Get the set of existing account provider IDs.
-    
-    Returns:
-        A set of provider ID strings
-    """
-    provider_ids = set()
-    for json_file in ACCOUNT_PROVIDERS_PATH.glob("*.json"):
-        provider_ids.add(json_file.stem)
-    return provider_ids
-
-
 def find_matching_provider(bank_id: str, existing_ids: set[str]) -> Optional[str]:
     """
     Find an existing provider ID that matches the given bank ID.
@@ -285,43 +220,6 @@ def create_account_provider(institution: dict) -> dict:
     return provider
 
 
-def add_gocardless_to_existing_provider(provider_path: Path, bic_code: str = None) -> tuple[bool, bool]:
-    """
-    Add 'gocardless' to an existing provider's apiAggregators list and optionally add BIC code.
-    
-    Args:
-        provider_path: Path to the provider JSON file
-        bic_code: Optional SWIFT/BIC code to add if not present
-        
-    Returns:
-        Tuple of (aggregator_modified, bic_modified)
-    """
-    provider = load_json(provider_path)
-    aggregator_modified = False
-    bic_modified = False
-    
-    # Add gocardless to aggregators
-    aggregators = provider.get("apiAggregators", [])
-    if aggregators is None:
-        aggregators = []
-    
-    if "gocardless" not in aggregators:
-        aggregators.append("gocardless")
-        aggregators.sort()
-        provider["apiAggregators"] = aggregators
-        aggregator_modified = True
-    
-    # Add BIC code if not present and we have one
-    if bic_code and not provider.get("bic"):
-        provider["bic"] = bic_code
-        bic_modified = True
-    
-    if aggregator_modified or bic_modified:
-        save_json(provider_path, provider)
-    
-    return aggregator_modified, bic_modified
-
-
 def parse_csv_file(csv_path: Path) -> dict[str, list[dict]]:
     """
     Parse the GoCardless coverage CSV file.
@@ -454,12 +352,16 @@ def update_gocardless_coverage(country_codes: list[str]) -> None:
         print("  No changes to market coverage.")
 
 
-def update_bank_providers(all_institutions: dict[str, list[dict]]) -> None:
+def update_bank_providers(all_institutions: dict[str, list[dict]], dry_run: bool = False,
+                          apply_fuzzy: bool = False) -> None:
     """
     Create/update account providers from parsed institution data.
     
     Args:
         all_institutions: Dictionary mapping country codes to lists of institution data
+        dry_run: Print the planned changes instead of making them
+        apply_fuzzy: Update providers found only by fuzzy matching (default:
+            report them)
     """
     print("\n=== Updating Bank Providers ===\n")
     
@@ -474,14 +376,11 @@ def update_bank_providers(all_institutions: dict[str, list[dict]]) -> None:
     print(f"Processing {len(unique_institutions)} unique institutions...")
     
     # Get existing provider IDs
-    existing_ids = get_existing_provider_ids()
-    print(f"Found {len(existing_ids)} existing account providers")
+    index = load_provider_index(ACCOUNT_PROVIDERS_PATH)
+    print(f"Found {len(index.ids)} existing account providers")
     
-    # Track statistics
-    new_count = 0
-    updated_aggregator_count = 0
-    updated_bic_count = 0
-    skipped_count = 0
+    # Plan all changes in memory; files are written once, when the plan is executed
+    plan = ReconcilePlan(index, "gocardless", apply_fuzzy=apply_fuzzy)
     
     # Process all institutions
     for inst_id, institution in unique_institutions.items():
@@ -495,44 +394,36 @@ def update_bank_providers(all_institutions: dict[str, list[dict]]) -> None:
         if not bank_id:
             continue
         
-        # Try to find a matching existing provider
-        matching_id = find_matching_provider(bank_id, existing_ids)
+        # Try to find a matching existing provider: by BIC first, then by name
+        matching_id = index.find_by_bic(bic_code) if bic_code else None
+        score = None
+        if not matching_id:
+            countries = institution.get("countries", [])
+            matching_id, score = plan.match(name, bank_id, countries[0] if countries else None,
+                                            find_matching_provider)
         
         if matching_id:
             # Add GoCardless to existing provider's aggregators and optionally BIC
-            provider_path = ACCOUNT_PROVIDERS_PATH / f"{matching_id}.json"
-            aggregator_modified, bic_modified = add_gocardless_to_existing_provider(provider_path, bic_code)
-            
-            if aggregator_modified or bic_modified:
-                updates = []
-                if aggregator_modified:
-                    updates.append("gocardless")
-                    updated_aggregator_count += 1
-                if bic_modified:
-                    updates.append(f"bic={bic_code}")
-                    updated_bic_count += 1
-                
-                if matching_id != bank_id:
-                    print(f"  Updated: {name} -> {matching_id}.json (added {', '.join(updates)})")
-                else:
-                    print(f"  Updated: {name} (added {', '.join(updates)})")
-            else:
-                skipped_count += 1
+            plan.update(name, bank_id, matching_id, bic=bic_code, score=score)
         else:
             # Create new provider
-            provider_path = ACCOUNT_PROVIDERS_PATH / f"{bank_id}.json"
-            provider = create_account_provider(institution)
-            save_json(provider_path, provider)
-            existing_ids.add(bank_id)
-            new_count += 1
-            bic_info = f", bic={bic_code}" if bic_code else ""
-            print(f"  Created: {name} ({bank_id}.json{bic_info})")
+            plan.create(name, create_account_provider(institution), bic=bic_code or None)
+    
+    if dry_run:
+        plan.print_plan()
+        plan.discard()
+        return
+    
+    stats = plan.execute()
+    index.save()
     
     print(f"\nSummary:")
-    print(f"  {new_count} new providers created")
-    print(f"  {updated_aggregator_count} updated with gocardless aggregator")
-    print(f"  {updated_bic_count} updated with BIC code")
-    print(f"  {skipped_count} already had gocardless (no changes needed)")
+    print(f"  {stats['created']} new providers created")
+    print(f"  {stats['updated']} updated with gocardless aggregator")
+    print(f"  {stats['bics']} updated with BIC code")
+    print(f"  {stats['unchanged']} already had gocardless (no changes needed)")
+    print(f"  {stats['conflicts']} conflicting names merged into new providers")
+    print(f"  {stats['fuzzy']} fuzzy matches not applied (use --apply-fuzzy)")
 
 
 def save_scraped_data(all_institutions: dict[str, list[dict]]) -> None:
@@ -638,6 +529,11 @@ Data Source:
         action="store_true",
         help="Show what would be done without making changes"
     )
+    parser.add_argument(
+        "--apply-fuzzy",
+        action="store_true",
+        help="Add the aggregator to providers found only by fuzzy name matching (default: report them)"
+    )
     
     args = parser.parse_args()
     
@@ -679,10 +575,7 @@ Data Source:
     
     # Update bank providers (unless skipped)
     if not args.skip_providers and not args.coverage_only:
-        if not args.dry_run:
-            update_bank_providers(all_institutions)
-        else:
-            print(f"[DRY RUN] Would process bank providers")
+        update_bank_providers(all_institutions, dry_run=args.dry_run, apply_fuzzy=args.apply_fuzzy)
     else:
         print("\nSkipping provider updates.")
     
@@ -0,0 +1,382 @@
+#!/usr/bin/env python3
+"""
+On-Disk HTTP Response Cache
+
+Keeps the responses of scraper requests (the Flinks status page, the Yapily
+/institutions payload, the YAXI /search payload, Plaid API pages) under
+scraped-data/.http-cache, so re-running a scraper while working on its parser
+does not fetch everything again:
+- entries are keyed on a hash of method + URL + request headers (such as
+  Authorization or an API version) + request body hash and point to the
+  response body, which is stored content-addressed (by its SHA-256), so
+  identical bodies are stored once
+- without options, a cached response is used while its Cache-Control max-age
+  (or Expires) says it is fresh; a stale one is revalidated with its
+  ETag/Last-Modified, and a 304 reuses the stored body
+- --cache-ttl uses cached responses younger than the given age without any
+  request, and --offline uses whatever is cached and never touches the network
+
+Only complete 200 responses are stored (not those marked no-store), decoded.
+Without options, a response is only stored if a later run can use it: fresh
+by its Cache-Control/Expires, or a GET with an ETag/Last-Modified to
+revalidate (most API POST responses, such as Plaid's pages, are neither).
+--cache-ttl stores every 200, for reuse by later --cache-ttl and --offline
+runs. `--prune AGE` deletes entries stored longer ago than AGE and the bodies
+no entry points to. Streamed downloads (HTTPClient.stream()) bypass the cache;
+a caller that streams a response it wants cached looks it up with cached()
+first and stores the body with store_response() once it was read.
+
+Usage:
+    from http_cache import add_cache_arguments, cache_from_args
+
+    add_cache_arguments(parser)
+    args = parser.parse_args()
+    HTTP_CLIENT.cache = cache_from_args(args)
+
+    # Show what is cached, prune old entries, or clear it
+    python scrapers/http_cache.py [--prune AGE | --clear]
+"""
+
+import argparse
+import email.utils
+import hashlib
+import http.client
+import json
+import re
+import shutil
+import sys
+import time
+from pathlib import Path
+from typing import Callable, Optional
+
+from http_client import RequestTiming, Response
+from json_writer import dump_json, write_atomic
+
+BASE_PATH = Path(__file__).parent.parent
+CACHE_PATH = BASE_PATH / "scraped-data" / ".http-cache"
+
+# Headers that describe the transferred (not the stored, decoded) body
+TRANSFER_HEADERS = frozenset({"content-encoding", "content-length", "transfer-encoding", "connection"})
+
+# Request headers left out of the cache key: conditional and transfer headers
+# the client sets itself (bodies are stored decoded)
+UNKEYED_HEADERS = frozenset({"if-none-match", "if-modified-since", "accept-encoding", "connection",
+                             "content-length", "user-agent"})
+
+# Headers a 304 response updates on the stored entry
+REVALIDATION_HEADERS = ("Cache-Control", "Date", "ETag", "Expires", "Last-Modified")
+
+DURATION_UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+DURATION_PATTERN = re.compile(r"^(\d+(?:\.\d+)?)([smhd]?)$")
+
+
+class CacheMiss(OSError):
+    """Raised in offline mode for a request that has no cached response."""
+
+
+def cache_key(method: str, url: str, body: Optional[bytes], headers: Optional[dict] = None) -> str:
+    """Key of a request: hash of its method, URL, headers (but UNKEYED_HEADERS) and body hash."""
+    body_hash = hashlib.sha256(body or b"").hexdigest()
+    keyed = sorted((name.lower(), str(value)) for name, value in (headers or {}).items()
+                   if name.lower() not in UNKEYED_HEADERS)
+    header_lines = "".join(f"{name}: {value}\n" for name, value in keyed)
+    return hashlib.sha256(f"{method.upper()}\n{url}\n{header_lines}{body_hash}".encode("utf-8")).hexdigest()
+
+
+def parse_duration(value: str) -> float:
+    """
+    Parse a duration such as "90", "30m", "12h" or "7d" into seconds.
+
+    Raises:
+        argparse.ArgumentTypeError for anything else
+    """
+    match = DURATION_PATTERN.match(value.strip().lower())
+    if not match:
+        raise argparse.ArgumentTypeError(f"invalid duration: {value!r} (e.g. 3600, 30m, 12h, 7d)")
+    return float(match.group(1)) * DURATION_UNITS[match.group(2) or "s"]
+
+
+def _cache_control(headers: dict) -> dict[str, Optional[str]]:
+    """Parse a Cache-Control header into {directive: value}."""
+    directives = {}
+    for part in (headers.get("cache-control") or "").split(","):
+        name, _, value = part.strip().partition("=")
+        if name:
+            directives[name.lower()] = value.strip('"') or None
+    return directives
+
+
+def _write_atomic(path: Path, content: bytes) -> None:
+    """Write a cache file atomically, creating its directory if needed."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    write_atomic(path, content)
+
+
+class ResponseCache:
+    """
+    Content-addressed on-disk cache for HTTPClient.request().
+
+    Args:
+        path: Cache directory
+        ttl: Use cached responses younger than this many seconds without
+            revalidating (default: follow the server's Cache-Control/Expires)
+        offline: Serve only from the cache; uncached requests raise CacheMiss
+    """
+
+    def __init__(self, path: Path = CACHE_PATH, ttl: Optional[float] = None, offline: bool = False):
+        self.path = Path(path)
+        self.ttl = ttl
+        self.offline = offline
+
+    def _entry_file(self, key: str) -> Path:
+        return self.path / "entries" / key[:2] / f"{key}.json"
+
+    def _body_file(self, digest: str) -> Path:
+        return self.path / "bodies" / digest[:2] / digest
+
+    def load(self, key: str) -> Optional[dict]:
+        """Load a cache entry whose body is present, or None."""
+        try:
+            with open(self._entry_file(key), "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if not isinstance(entry, dict) or not self._body_file(entry.get("body", "")).exists():
+            return None
+        return entry
+
+    def is_fresh(self, entry: dict, now: Optional[float] = None) -> bool:
+        """Whether an entry may be used without contacting the server."""
+        age = (now if now is not None else time.time()) - entry["stored_at"]
+        if self.ttl is not None:
+            return age < self.ttl
+        headers = {name.lower(): value for name, value in entry["headers"]}
+        directives = _cache_control(headers)
+        if "no-cache" in directives:
+            return False
+        try:
+            if directives.get("max-age"):
+                lifetime = int(directives["max-age"])
+            elif headers.get("expires") and headers.get("date"):
+                lifetime = (email.utils.parsedate_to_datetime(headers["expires"])
+                            - email.utils.parsedate_to_datetime(headers["date"])).total_seconds()
+            else:
+                return False
+            age += int(headers.get("age") or 0)
+        except (TypeError, ValueError):
+            return False
+        return age < lifetime
+
+    def validators(self, entry: dict) -> dict:
+        """Conditional request headers for revalidating an entry."""
+        headers = {name.lower(): value for name, value in entry["headers"]}
+        conditional = {}
+        if headers.get("etag"):
+            conditional["If-None-Match"] = headers["etag"]
+        if headers.get("last-modified"):
+            conditional["If-Modified-Since"] = headers["last-modified"]
+        return conditional
+
+    def response(self, entry: dict, timing: Optional[RequestTiming] = None) -> Response:
+        """Build a Response from a cache entry."""
+        headers = http.client.HTTPMessage()
+        for name, value in entry["headers"]:
+            headers[name] = value
+        content = self._body_file(entry["body"]).read_bytes()
+        if timing is None:
+            timing = RequestTiming(entry["method"], entry["url"])
+            timing.status = entry["status"]
+            timing.protocol = "cache"
+            timing.reused = True
+            timing.received = len(content)
+        return Response(entry["status"], headers, content, entry["url"], timing)
+
+    def store(self, key: str, method: str, response: Response) -> None:
+        """
+        Store a response if it is cacheable.
+
+        That is a 200 not marked no-store which, without --cache-ttl, a later
+        run can use: fresh, or a GET that can be revalidated.
+        """
+        if response.status != 200:
+            return
+        if "no-store" in _cache_control({"cache-control": response.headers.get("Cache-Control")}):
+            return
+        headers = [(name, value) for name, value in response.headers.items()
+                   if name.lower() not in TRANSFER_HEADERS]
+        entry = {
+            "method": method.upper(),
+            "url": response.url,
+            "status": response.status,
+            "headers": headers,
+            "stored_at": time.time(),
+        }
+        if self.ttl is None and not self.is_fresh(entry):
+            if entry["method"] != "GET" or not self.validators(entry):
+                return
+        digest = hashlib.sha256(response.content).hexdigest()
+        body_file = self._body_file(digest)
+        if not body_file.exists():
+            _write_atomic(body_file, response.content)
+        entry["body"] = digest
+        self._save(key, entry)
+
+    def revalidated(self, key: str, entry: dict, not_modified: Response) -> Response:
+        """Refresh an entry after a 304 and return its stored response."""
+        updated = {name.lower(): not_modified.headers[name]
+                   for name in REVALIDATION_HEADERS if not_modified.headers.get(name)}
+        entry["headers"] = [(name, value) for name, value in entry["headers"]
+                            if name.lower() not in updated]
+        entry["headers"].extend((name, updated[name.lower()]) for name in REVALIDATION_HEADERS
+                                if name.lower() in updated)
+        entry["stored_at"] = time.time()
+        self._save(key, entry)
+        return self.response(entry, not_modified.timing)
+
+    def store_response(self, method: str, url: str, body: Optional[bytes], headers: Optional[dict],
+                       response: Response) -> None:
+        """Store the response to a request sent without the cache (e.g. a streamed one), if cacheable."""
+        self.store(cache_key(method, url, body, headers), method, response)
+
+    def _save(self, key: str, entry: dict) -> None:
+        _write_atomic(self._entry_file(key), dump_json(entry))
+
+    def cached(self, method: str, url: str, body: Optional[bytes],
+               headers: Optional[dict]) -> Optional[Response]:
+        """
+        The cached response to a request, if it may be used without contacting the server.
+
+        That is in offline mode, or while the entry is fresh (see is_fresh()).
+
+        Raises:
+            CacheMiss in offline mode when the request is not cached
+        """
+        entry = self.load(cache_key(method, url, body, headers))
+        if entry and (self.offline or self.is_fresh(entry)):
+            return self.response(entry)
+        if self.offline:
+            raise CacheMiss(f"Not cached (offline): {method} {url}")
+        return None
+
+    def request(self, send: Callable[..., Response], method: str, url: str,
+                body: Optional[bytes], headers: Optional[dict]) -> Response:
+        """
+        Answer a request from the cache, revalidating or fetching through send().
+
+        Args:
+            send: Function (method, url, body, headers) performing the request
+            method: HTTP method
+            url: Request URL (including the query)
+            body: Request body
+            headers: Extra request headers
+
+        Raises:
+            CacheMiss in offline mode when the request is not cached
+        """
+        cached = self.cached(method, url, body, headers)
+        if cached is not None:
+            return cached
+
+        key = cache_key(method, url, body, headers)
+        entry = self.load(key)
+        conditional = self.validators(entry) if entry else {}
+        response = send(method, url, body, {**(headers or {}), **conditional})
+        if response.status == 304 and entry:
+            return self.revalidated(key, entry, response)
+        self.store(key, method, response)
+        return response
+
+    def stats(self) -> dict:
+        """Count cached entries and stored bodies."""
+        entries = list((self.path / "entries").glob("*/*.json"))
+        bodies = list((self.path / "bodies").glob("*/*"))
+        return {
+            "entries": len(entries),
+            "bodies": len(bodies),
+            "size": sum(f.stat().st_size for f in entries + bodies),
+        }
+
+    def prune(self, max_age: float) -> dict:
+        """
+        Delete entries stored more than max_age seconds ago, and bodies no entry points to.
+
+        Returns:
+            Counts of the deleted entries and bodies, and the bytes freed
+        """
+        now = time.time()
+        referenced = set()
+        pruned = {"entries": 0, "bodies": 0, "size": 0}
+        for entry_file in (self.path / "entries").glob("*/*.json"):
+            try:
+                with open(entry_file, "r", encoding="utf-8") as f:
+                    entry = json.load(f)
+                expired = now - entry["stored_at"] > max_age
+            except (OSError, ValueError, KeyError, TypeError):
+                entry, expired = {}, True
+            if expired:
+                pruned["entries"] += 1
+                pruned["size"] += entry_file.stat().st_size
+                entry_file.unlink()
+            else:
+                referenced.add(entry.get("body"))
+        for body_file in (self.path / "bodies").glob("*/*"):
+            if body_file.name not in referenced:
+                pruned["bodies"] += 1
+                pruned["size"] += body_file.stat().st_size
+                body_file.unlink()
+        return pruned
+
+    def clear(self) -> None:
+        """Delete everything in the cache."""
+        shutil.rmtree(self.path, ignore_errors=True)
+
+
+def add_cache_arguments(parser: argparse.ArgumentParser) -> None:
+    """Add the --cache-ttl and --offline options to a scraper's parser."""
+    parser.add_argument(
+        "--cache-ttl",
+        type=parse_duration,
+        metavar="AGE",
+        help="Reuse cached HTTP responses younger than AGE (seconds, or e.g. 30m, 12h, 7d) without any request"
+    )
+    parser.add_argument(
+        "--offline",
+        action="store_true",
+        help="Only use cached HTTP responses; never touch the network"
+    )
+
+
+def cache_from_args(args: argparse.Namespace) -> ResponseCache:
+    """Create the response cache configured by add_cache_arguments() options."""
+    if args.offline:
+        print(f"Offline: serving HTTP responses from {CACHE_PATH}")
+    return ResponseCache(CACHE_PATH, ttl=args.cache_ttl, offline=args.offline)
+
+
+def main():
+    """Main entry point with argument parsing."""
+    parser = argparse.ArgumentParser(description="Show or clear the scrapers' HTTP response cache")
+    parser.add_argument("--clear", action="store_true", help="Delete all cached responses")
+    parser.add_argument("--prune", type=parse_duration, metavar="AGE",
+                        help="Delete responses stored longer ago than AGE (e.g. 7d), and unused bodies")
+    args = parser.parse_args()
+
+    cache = ResponseCache(CACHE_PATH)
+    if args.clear:
+        cache.clear()
+        print(f"Cleared {CACHE_PATH}")
+        return 0
+    if args.prune is not None:
+        pruned = cache.prune(args.prune)
+        print(f"Pruned {pruned['entries']} responses and {pruned['bodies']} bodies "
+              f"({pruned['size'] / (1024 * 1024):.1f} MB)")
+
+    stats = cache.stats()
+    print(f"HTTP cache: {CACHE_PATH}")
+    print(f"  {stats['entries']} responses, {stats['bodies']} distinct bodies, "
+          f"{stats['size'] / (1024 * 1024):.1f} MB")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,681 @@
+#!/usr/bin/env python3
+"""
+Shared HTTP Client
+
+The in-process HTTP client used by all scrapers (instead of spawning curl):
+- keep-alive connections are pooled per host and reused across requests and
+  threads, so repeated API calls skip the TCP/TLS handshake
+- a connection that the server closed while idle is replaced: idle
+  connections are checked before reuse, and a request that still fails on
+  a reused connection is resent on a fresh one if its method is idempotent
+  (a POST may have reached the server, so its error is raised instead)
+- HTTP/2 (one multiplexed connection per host) when httpx and h2 are
+  installed, HTTP/1.1 over http.client otherwise
+- responses are requested with Accept-Encoding: gzip, deflate and decoded
+  while reading; redirects are followed
+- stream() hands out the body incrementally instead of buffering it
+- every request records where its time went (connect, wait for the response
+  headers, body transfer) in client.timings; print_timings() summarizes them
+- request() can be answered from an on-disk response cache (see http_cache),
+  and response_hooks see every response it returns (used to record fixtures)
+- TokenBucket limits the request rate shared by concurrent workers, and backs
+  off (and recovers) when the server reports rate limiting
+- a budget (a semaphore, which several clients can share) bounds the requests
+  in flight at the same time; run_all.py uses one across all scrapers
+
+Usage:
+    from http_client import HTTPClient, TokenBucket
+
+    with HTTPClient() as client:
+        response = client.post_json("https://production.plaid.com/institutions/get", payload)
+        data = response.json()
+
+        with client.stream("GET", url) as response:
+            for chunk in response.iter_bytes():
+                ...
+
+        client.print_timings()
+
+    limiter = TokenBucket(rate=5)
+    limiter.acquire()   # blocks until a request may be sent
+"""
+
+import http.client
+import json
+import select
+import threading
+import time
+import zlib
+from contextlib import contextmanager
+from typing import Iterator, Optional
+from urllib.parse import urlencode, urljoin, urlsplit
+
+try:
+    import httpx
+    import h2  # noqa: F401 - httpx needs it for HTTP/2
+    HAS_HTTP2 = True
+except ImportError:
+    HAS_HTTP2 = False
+
+# Seconds to wait for a connection or a read
+REQUEST_TIMEOUT = 30
+
+# Idle connections kept per host
+MAX_IDLE_CONNECTIONS = 8
+
+USER_AGENT = "open-banking-tracker-data scraper"
+
+# Bytes read from a streamed body per iteration
+READ_SIZE = 64 * 1024
+
+# Redirects followed per request
+MAX_REDIRECTS = 5
+REDIRECT_STATUSES = (301, 302, 303, 307, 308)
+
+# Content-Encoding -> zlib wbits of the encodings decoded by this module
+DECODERS = {
+    "gzip": 16 + zlib.MAX_WBITS,
+    "x-gzip": 16 + zlib.MAX_WBITS,
+    "deflate": zlib.MAX_WBITS,
+}
+ACCEPT_ENCODING = "gzip, deflate"
+
+# Errors raised when a pooled connection was closed by the server while idle
+STALE_CONNECTION_ERRORS = (
+    http.client.RemoteDisconnected,
+    http.client.BadStatusLine,
+    BrokenPipeError,
+    ConnectionResetError,
+    ConnectionAbortedError,
+)
+
+# Methods that are safe to send again when a reused connection fails
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS", "PUT", "DELETE", "TRACE"})
+
+
+def _with_params(url: str, params: Optional[dict]) -> str:
+    """Append query parameters to a URL."""
+    if not params:
+        return url
+    return f"{url}{'&' if urlsplit(url).query else '?'}{urlencode(params)}"
+
+
+def _is_dropped(connection: http.client.HTTPConnection) -> bool:
+    """
+    Whether an idle connection can no longer be used.
+
+    An idle socket that is readable was closed by the server (or holds data
+    no request asked for).
+    """
+    sock = connection.sock
+    if sock is None:
+        return True
+    try:
+        readable, _, _ = select.select([sock], [], [], 0)
+    except (OSError, ValueError):
+        return True
+    return bool(readable)
+
+
+class HTTPStatusError(OSError):
+    """Raised by raise_for_status() for 4xx/5xx responses."""
+
+    def __init__(self, status: int, url: str):
+        super().__init__(f"HTTP {status} for {url}")
+        self.status = status
+        self.url = url
+
+
+class RequestTiming:
+    """
+    Where the time of one request went, in seconds.
+
+    connect is spent opening the connection (TCP and TLS; 0 when a pooled
+    connection was reused), wait between sending the request and receiving
+    the response headers, and transfer reading the body (for stream(), this
+    includes the time the caller spends between reads). received counts body
+    bytes as transferred, before decoding.
+    """
+
+    def __init__(self, method: str, url: str):
+        self.method = method
+        self.url = url
+        self.status: Optional[int] = None
+        self.protocol = ""
+        self.reused = False
+        self.connect = 0.0
+        self.wait = 0.0
+        self.transfer = 0.0
+        self.received = 0
+
+    @property
+    def total(self) -> float:
+        return self.connect + self.wait + self.transfer
+
+    @property
+    def host(self) -> str:
+        return urlsplit(self.url).netloc
+
+    def __str__(self) -> str:
+        return (f"{self.method} {self.url} -> {self.status} {self.protocol}: "
+                f"connect {self.connect * 1000:.0f} ms, wait {self.wait * 1000:.0f} ms, "
+                f"transfer {self.transfer * 1000:.0f} ms, {self.received} bytes")
+
+
+class _ResponseBase:
+    status: int
+    url: str
+
+    @property
+    def ok(self) -> bool:
+        return 200 <= self.status < 300
+
+    def raise_for_status(self) -> None:
+        """Raise HTTPStatusError for a 4xx/5xx response."""
+        if self.status >= 400:
+            raise HTTPStatusError(self.status, self.url)
+
+
+class Response(_ResponseBase):
+    """A fully read (and decoded) HTTP response."""
+
+    def __init__(self, status: int, headers: http.client.HTTPMessage, content: bytes, url: str,
+                 timing: Optional[RequestTiming] = None):
+        self.status = status
+        self.headers = headers
+        self.content = content
+        self.url = url
+        self.timing = timing
+
+    @property
+    def text(self) -> str:
+        charset = self.headers.get_content_charset() or "utf-8"
+        return self.content.decode(charset, errors="replace")
+
+    def json(self):
+        return json.loads(self.content)
+
+
+class _Decoder:
+    """Incremental gzip/deflate decoder (handles multi-member gzip bodies)."""
+
+    def __init__(self, wbits: int):
+        self._wbits = wbits
+        self._decompressor = zlib.decompressobj(wbits)
+
+    def decompress(self, data: bytes) -> bytes:
+        output = []
+        while data:
+            output.append(self._decompressor.decompress(data))
+            data = self._decompressor.unused_data
+            if data:
+                self._decompressor = zlib.decompressobj(self._wbits)
+        return b"".join(output)
+
+    def flush(self) -> bytes:
+        return self._decompressor.flush()
+
+
+class _HTTP11Exchange:
+    """A response being read from a pooled http.client connection."""
+
+    def __init__(self, client: "HTTPClient", key: tuple[str, str],
+                 connection: http.client.HTTPConnection, response: http.client.HTTPResponse):
+        self._client = client
+        self._key = key
+        self._connection = connection
+        self._response = response
+        self.status = response.status
+        self.headers = response.headers
+        self.protocol = "HTTP/1.0" if response.version == 10 else "HTTP/1.1"
+
+    def read(self, size: int) -> bytes:
+        return self._response.read(size)
+
+    def release(self, complete: bool) -> None:
+        """Return the connection to the pool if the body was read to the end."""
+        if complete and not self._response.will_close:
+            self._client._checkin(self._key, self._connection)
+        else:
+            self._connection.close()
+
+
+class _HTTPXExchange:
+    """A response being read from the httpx (HTTP/2) backend."""
+
+    def __init__(self, response: "httpx.Response"):
+        self._response = response
+        self._chunks = None
+        self.status = response.status_code
+        self.headers = http.client.HTTPMessage()
+        for name, value in response.headers.multi_items():
+            self.headers[name] = value
+        self.protocol = response.http_version
+
+    def read(self, size: int) -> bytes:
+        if self._chunks is None:
+            self._chunks = self._response.iter_raw(size)
+        try:
+            return next(self._chunks, b"")
+        except httpx.TransportError as e:
+            raise ConnectionError(str(e)) from e
+
+    def release(self, complete: bool) -> None:
+        self._response.close()
+
+
+class StreamingResponse(_ResponseBase):
+    """
+    A response whose body is read incrementally.
+
+    Returned by HTTPClient.stream(); read() and iter_bytes() return the body
+    decoded (unless the stream was opened with decode=False) in chunks.
+    """
+
+    def __init__(self, client: "HTTPClient", exchange, timing: RequestTiming, url: str,
+                 decode: bool):
+        self.status = exchange.status
+        self.headers = exchange.headers
+        self.url = url
+        self.timing = timing
+        self._client = client
+        self._exchange = exchange
+        self._decoder = None
+        self._complete = False
+        self._closed = False
+        self._started = time.perf_counter()
+        if decode:
+            encoding = (self.headers.get("Content-Encoding") or "identity").strip().lower()
+            if encoding in DECODERS:
+                self._decoder = _Decoder(DECODERS[encoding])
+            elif encoding != "identity":
+                exchange.release(False)
+                raise OSError(f"Unsupported Content-Encoding: {encoding}")
+
+    def read(self, size: int = READ_SIZE) -> bytes:
+        """Read the next chunk of the body; returns b"" at the end."""
+        while True:
+            raw = self._exchange.read(size)
+            if not raw:
+                self._complete = True
+                return self._decoder.flush() if self._decoder else b""
+            self.timing.received += len(raw)
+            if self._decoder is None:
+                return raw
+            data = self._decoder.decompress(raw)
+            if data:
+                return data
+
+    def iter_bytes(self, size: int = READ_SIZE) -> Iterator[bytes]:
+        """Iterate over the body in chunks."""
+        while True:
+            chunk = self.read(size)
+            if not chunk:
+                return
+            yield chunk
+
+    def close(self) -> None:
+        """Release the connection and record the request's timing."""
+        if self._closed:
+            return
+        self._closed = True
+        self.timing.transfer = time.perf_counter() - self._started
+        self._exchange.release(self._complete)
+        self._client._record(self.timing)
+
+
+class HTTPClient:
+    """
+    Thread-safe HTTP client with a per-host keep-alive connection pool.
+
+    Args:
+        timeout: Connect/read timeout in seconds
+        headers: Headers sent with every request
+        max_idle: Idle connections kept per host
+        http2: Use HTTP/2 through httpx (default: when httpx and h2 are installed)
+        cache: http_cache.ResponseCache answering request() (streams bypass it)
+        budget: Semaphore held by every request until its body is read (shared
+            by clients to bound their requests in flight; None for no limit)
+    """
+
+    def __init__(self, timeout: float = REQUEST_TIMEOUT, headers: Optional[dict] = None,
+                 max_idle: int = MAX_IDLE_CONNECTIONS, http2: Optional[bool] = None, cache=None,
+                 budget: Optional[threading.Semaphore] = None):
+        self.timeout = timeout
+        self.headers = {"User-Agent": USER_AGENT, "Accept-Encoding": ACCEPT_ENCODING, **(headers or {})}
+        self.max_idle = max_idle
+        self.http2 = HAS_HTTP2 if http2 is None else http2
+        if self.http2 and not HAS_HTTP2:
+            raise ValueError("HTTP/2 needs the httpx and h2 packages")
+        self.cache = cache
+        self.budget = budget
+        # Functions (method, url, body, response) called for every request() response
+        self.response_hooks: list = []
+        self.timings: list[RequestTiming] = []
+        self._idle: dict[tuple[str, str], list[http.client.HTTPConnection]] = {}
+        self._httpx = None
+        self._lock = threading.Lock()
+
+    def __enter__(self) -> "HTTPClient":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def _connect(self, scheme: str, netloc: str) -> http.client.HTTPConnection:
+        """Open a new connection to a host."""
+        if scheme == "https":
+            return http.client.HTTPSConnection(netloc, timeout=self.timeout)
+        if scheme == "http":
+            return http.client.HTTPConnection(netloc, timeout=self.timeout)
+        raise ValueError(f"Unsupported URL scheme: {scheme}")
+
+    def _checkout(self, key: tuple[str, str]) -> tuple[http.client.HTTPConnection, bool]:
+        """
+        Take an idle connection for a host, or open one; returns (connection, reused).
+
+        Idle connections the server already closed are dropped.
+        """
+        while True:
+            with self._lock:
+                idle = self._idle.get(key)
+                connection = idle.pop() if idle else None
+            if connection is None:
+                return self._connect(*key), False
+            if not _is_dropped(connection):
+                return connection, True
+            connection.close()
+
+    def _checkin(self, key: tuple[str, str], connection: http.client.HTTPConnection) -> None:
+        """Return a connection to the pool (or close it if the pool is full)."""
+        with self._lock:
+            idle = self._idle.setdefault(key, [])
+            if len(idle) < self.max_idle:
+                idle.append(connection)
+                return
+        connection.close()
+
+    def _record(self, timing: RequestTiming) -> None:
+        with self._lock:
+            self.timings.append(timing)
+
+    def _send_http11(self, method: str, url: str, body: Optional[bytes], headers: dict,
+                     timing: RequestTiming) -> _HTTP11Exchange:
+        """Send a request over a pooled http.client connection."""
+        parts = urlsplit(url)
+        key = (parts.scheme, parts.netloc)
+        path = parts.path or "/"
+        if parts.query:
+            path = f"{path}?{parts.query}"
+
+        while True:
+            connection, reused = self._checkout(key)
+            try:
+                start = time.perf_counter()
+                if not reused:
+                    connection.connect()
+                    timing.connect = time.perf_counter() - start
+                    start = time.perf_counter()
+                connection.request(method, path, body=body, headers=headers)
+                response = connection.getresponse()
+            except STALE_CONNECTION_ERRORS:
+                connection.close()
+                if reused and method.upper() in IDEMPOTENT_METHODS:
+                    # The server dropped the idle connection; retry on a fresh one
+                    continue
+                raise
+            except (OSError, http.client.HTTPException):
+                connection.close()
+                raise
+            timing.wait = time.perf_counter() - start
+            timing.reused = reused
+            return _HTTP11Exchange(self, key, connection, response)
+
+    def _send_httpx(self, method: str, url: str, body: Optional[bytes], headers: dict,
+                    timing: RequestTiming) -> _HTTPXExchange:
+        """Send a request through httpx, which multiplexes HTTP/2 streams per host."""
+        with self._lock:
+            if self._httpx is None:
+                self._httpx = httpx.Client(
+                    http2=True, timeout=self.timeout,
+                    limits=httpx.Limits(max_keepalive_connections=self.max_idle))
+            client = self._httpx
+
+        marks = {}
+
+        def trace(event: str, info: dict) -> None:
+            marks[event] = time.perf_counter()
+
+        start = time.perf_counter()
+        request = client.build_request(method, url, content=body, headers=headers,
+                                       extensions={"trace": trace})
+        try:
+            response = client.send(request, stream=True)
+        except httpx.TransportError as e:
+            raise ConnectionError(str(e)) from e
+        connected = marks.get("connection.start_tls.complete",
+                              marks.get("connection.connect_tcp.complete"))
+        timing.reused = connected is None
+        timing.connect = connected - start if connected else 0.0
+        timing.wait = time.perf_counter() - (connected or start)
+        return _HTTPXExchange(response)
+
+    def _open(self, method: str, url: str, body: Optional[bytes], headers: Optional[dict],
+              decode: bool) -> StreamingResponse:
+        """Send a request, following redirects, and return the final response unread."""
+        request_headers = {**self.headers, **(headers or {})}
+        for _ in range(MAX_REDIRECTS + 1):
+            timing = RequestTiming(method, url)
+            send = self._send_httpx if self.http2 else self._send_http11
+            exchange = send(method, url, body, request_headers, timing)
+            timing.status = exchange.status
+            timing.protocol = exchange.protocol
+
+            location = exchange.headers.get("Location")
+            if exchange.status not in REDIRECT_STATUSES or not location:
+                return StreamingResponse(self, exchange, timing, url, decode)
+
+            # Drain the (small) redirect body so the connection can be reused
+            redirect = StreamingResponse(self, exchange, timing, url, decode=False)
+            for _ in redirect.iter_bytes():
+                pass
+            redirect.close()
+            next_url = urljoin(url, location)
+            if urlsplit(next_url).netloc != urlsplit(url).netloc:
+                request_headers.pop("Authorization", None)
+            if exchange.status == 303 or (exchange.status in (301, 302) and method == "POST"):
+                method, body = "GET", None
+                request_headers.pop("Content-Type", None)
+            url = next_url
+        raise http.client.HTTPException(f"Too many redirects: {url}")
+
+    @contextmanager
+    def stream(self, method: str, url: str, body: Optional[bytes] = None,
+               headers: Optional[dict] = None, params: Optional[dict] = None,
+               decode: bool = True) -> Iterator[StreamingResponse]:
+        """
+        Send a request and hand out the response body incrementally.
+
+        The connection goes back to the pool when the body was read to the
+        end, and is closed otherwise.
+
+        Args:
+            method: HTTP method
+            url: Request URL
+            body: Request body
+            headers: Extra request headers
+            params: Query parameters appended to the URL
+            decode: Decode gzip/deflate Content-Encoding (False returns the
+                body as transferred)
+
+        Raises:
+            OSError or http.client.HTTPException on connection failures
+        """
+        budget = self.budget
+        if budget is not None:
+            budget.acquire()
+        try:
+            response = self._open(method, _with_params(url, params), body, headers, decode)
+            try:
+                yield response
+            finally:
+                response.close()
+        finally:
+            if budget is not None:
+                budget.release()
+
+    def request(self, method: str, url: str, body: Optional[bytes] = None,
+                headers: Optional[dict] = None, params: Optional[dict] = None) -> Response:
+        """
+        Send a request and read the whole response.
+
+        Responses with any status are returned (APIs such as Plaid put error
+        details in 4xx bodies); connection failures raise. With a cache set,
+        the response may come from (and is stored in) the cache.
+
+        Raises:
+            OSError or http.client.HTTPException on connection failures
+            (http_cache.CacheMiss for uncached requests in offline mode)
+        """
+        url = _with_params(url, params)
+        if self.cache is not None:
+            response = self.cache.request(self._fetch, method, url, body, headers)
+        else:
+            response = self._fetch(method, url, body, headers)
+        for hook in self.response_hooks:
+            hook(method, url, body, response)
+        return response
+
+    def _fetch(self, method: str, url: str, body: Optional[bytes],
+               headers: Optional[dict]) -> Response:
+        """Send a request and read the whole response, bypassing the cache."""
+        with self.stream(method, url, body=body, headers=headers) as response:
+            content = b"".join(response.iter_bytes())
+        return Response(response.status, response.headers, content, response.url, response.timing)
+
+    def get(self, url: str, headers: Optional[dict] = None, params: Optional[dict] = None) -> Response:
+        """Send a GET request."""
+        return self.request("GET", url, headers=headers, params=params)
+
+    def post_json(self, url: str, payload, headers: Optional[dict] = None) -> Response:
+        """Send a POST request with a JSON body."""
+        body = json.dumps(payload).encode("utf-8")
+        return self.request("POST", url, body=body,
+                            headers={"Content-Type": "application/json", **(headers or {})})
+
+    def timing_summary(self) -> dict[str, dict]:
+        """
+        Aggregate the recorded timings per host.
+
+        Returns:
+            Dict mapping host to requests, connections (newly opened),
+            connect/wait/transfer seconds and received bytes
+        """
+        with self._lock:
+            timings = list(self.timings)
+        summary: dict[str, dict] = {}
+        for timing in timings:
+            host = summary.setdefault(timing.host, {
+                "requests": 0, "connections": 0,
+                "connect": 0.0, "wait": 0.0, "transfer": 0.0, "received": 0,
+            })
+            host["requests"] += 1
+            host["connections"] += not timing.reused
+            host["connect"] += timing.connect
+            host["wait"] += timing.wait
+            host["transfer"] += timing.transfer
+            host["received"] += timing.received
+        return summary
+
+    def print_timings(self, slowest: int = 3) -> None:
+        """Print per-host request timings and the slowest requests."""
+        summary = self.timing_summary()
+        if not summary:
+            return
+        print("\nHTTP timings:")
+        for host, stats in sorted(summary.items()):
+            print(f"  {host}: {stats['requests']} requests over {stats['connections']} connections, "
+                  f"connect {stats['connect']:.2f}s, wait {stats['wait']:.2f}s, "
+                  f"transfer {stats['transfer']:.2f}s, {stats['received'] / 1024:.0f} KB received")
+        with self._lock:
+            timings = sorted(self.timings, key=lambda timing: timing.total, reverse=True)
+        for timing in timings[:slowest]:
+            print(f"  slowest: {timing}")
+
+    def close(self) -> None:
+        """Close all pooled connections."""
+        with self._lock:
+            idle, self._idle = self._idle, {}
+            client, self._httpx = self._httpx, None
+        for connections in idle.values():
+            for connection in connections:
+                connection.close()
+        if client is not None:
+            client.close()
+
+
+class TokenBucket:
+    """
+    Token-bucket rate limiter shared between threads, with adaptive backoff.
+
+    slow_down() halves the rate (down to min_rate) when the server reports
+    rate limiting, and speed_up() adds back a tenth of the configured rate
+    after a successful request. Each adjustment happens at most once per
+    second, so several workers hitting the same limit count once and the rate
+    recovers gradually.
+
+    Args:
+        rate: Requests per second
+        burst: Requests that may be sent back-to-back (default: 1, i.e. evenly paced)
+        min_rate: Lowest rate slow_down() goes to
+    """
+
+    def __init__(self, rate: float, burst: Optional[float] = None, min_rate: Optional[float] = None):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.max_rate = rate
+        self.rate = rate
+        self.min_rate = min_rate if min_rate is not None else rate / 16
+        self.burst = burst if burst is not None else 1.0
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._slowed_at = float("-inf")
+        self._adjusted_at = float("-inf")
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self) -> None:
+        """Block until a request may be sent."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+    def slow_down(self) -> None:
+        """Halve the rate and drop the accumulated burst."""
+        with self._lock:
+            now = time.monotonic()
+            if now - self._slowed_at < 1.0:
+                return
+            self._slowed_at = self._adjusted_at = now
+            self._refill(now)
+            self.rate = max(self.min_rate, self.rate / 2)
+            self._tokens = min(self._tokens, 0.0)
+
+    def speed_up(self) -> None:
+        """Recover towards the configured rate after a successful request."""
+        with self._lock:
+            now = time.monotonic()
+            if self.rate < self.max_rate and now - self._adjusted_at >= 1.0:
+                self._adjusted_at = now
+                self._refill(now)
+                self.rate = min(self.max_rate, self.rate + self.max_rate / 10)
+
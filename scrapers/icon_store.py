@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+Content-Addressed Icon Store
+
+Plaid's /institutions/get returns every institution's logo as a base64
+string. Keeping those strings on the institution dicts until the run ends
+held hundreds of MB for a logo that create_account_provider() never uses.
+The scraper now decodes each logo as soon as its page arrives and hands it to
+an IconStore, which keeps it on disk under the SHA-256 of its bytes:
+
+- identical logos (shared by the branches of one bank, or unchanged since the
+  last run) are stored once; a known hash is not written again
+- the institution keeps only the hash, which names the file
+- files are written through a temporary file, so concurrent workers storing
+  the same logo never leave a partial file
+- a dry-run store only hashes the icons, and writes nothing
+
+Layout:
+    scraped-data/.icons/<first 2 hex digits>/<sha256>.<png|jpg|gif|svg|webp|bin>
+
+Usage:
+    from icon_store import IconStore
+
+    icons = IconStore()
+    digest = icons.put_base64(institution.get("logo"))   # None without a logo
+    path = icons.path_for(digest)
+"""
+
+import base64
+import binascii
+import hashlib
+import threading
+from pathlib import Path
+from typing import Optional
+
+from json_writer import write_atomic
+
+BASE_PATH = Path(__file__).parent.parent
+ICON_STORE_PATH = BASE_PATH / "scraped-data" / ".icons"
+
+# File extension by leading bytes; anything else is stored as .bin
+IMAGE_SIGNATURES = (
+    (b"\x89PNG\r\n\x1a\n", "png"),
+    (b"\xff\xd8\xff", "jpg"),
+    (b"GIF8", "gif"),
+    (b"<svg", "svg"),
+    (b"<?xml", "svg"),
+)
+
+
+def image_extension(data: bytes) -> str:
+    """File extension for an image, from its leading bytes."""
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return "webp"
+    head = data[:16].lstrip()
+    for signature, extension in IMAGE_SIGNATURES:
+        if head.startswith(signature):
+            return extension
+    return "bin"
+
+
+class IconStore:
+    """
+    Icons on disk, named by the SHA-256 of their bytes.
+
+    Safe to use from several threads.
+
+    Args:
+        path: Store directory (created on the first write)
+        dry_run: Only hash the icons and count the ones that would be
+            stored, without writing them
+    """
+
+    def __init__(self, path: Path = ICON_STORE_PATH, dry_run: bool = False):
+        self.path = Path(path)
+        self.dry_run = dry_run
+        self.stored = 0
+        self.deduplicated = 0
+        self.invalid = 0
+        self.bytes_written = 0
+        # Hash -> file name of every icon stored or found in this process
+        self._known: dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def _directory(self, digest: str) -> Path:
+        return self.path / digest[:2]
+
+    def path_for(self, digest: str) -> Optional[Path]:
+        """Path of a stored icon (None if no icon with this hash is stored)."""
+        name = self._known.get(digest)
+        if name is not None:
+            return self._directory(digest) / name
+        directory = self._directory(digest)
+        if directory.is_dir():
+            for path in directory.glob(f"{digest}.*"):
+                return path
+        return None
+
+    def put(self, data: bytes) -> str:
+        """
+        Store an icon, unless an identical one is stored already.
+
+        Returns:
+            The icon's SHA-256 hex digest
+        """
+        digest = hashlib.sha256(data).hexdigest()
+        with self._lock:
+            if digest in self._known:
+                self.deduplicated += 1
+                return digest
+        name = f"{digest}.{image_extension(data)}"
+        path = self._directory(digest) / name
+        written = False
+        if not path.exists():
+            if not self.dry_run:
+                path.parent.mkdir(parents=True, exist_ok=True)
+                write_atomic(path, data)
+            written = True
+        with self._lock:
+            self._known[digest] = name
+            if written:
+                self.stored += 1
+                self.bytes_written += len(data)
+            else:
+                self.deduplicated += 1
+        return digest
+
+    def put_base64(self, encoded: Optional[str]) -> Optional[str]:
+        """
+        Decode and store a base64 icon.
+
+        Returns:
+            The icon's SHA-256 hex digest, or None for a missing or
+            undecodable icon
+        """
+        if not encoded:
+            return None
+        try:
+            data = base64.b64decode(encoded, validate=True)
+        except (binascii.Error, ValueError):
+            with self._lock:
+                self.invalid += 1
+            return None
+        return self.put(data)
+
+    def summary(self) -> str:
+        """One-line summary of the icons handled in this process."""
+        invalid = f", {self.invalid} undecodable" if self.invalid else ""
+        stored = "would be stored" if self.dry_run else "stored"
+        return (f"{self.stored} new icons {stored} ({self.bytes_written / 1024:.0f} KB), "
+                f"{self.deduplicated} already stored{invalid} in {self.path}")
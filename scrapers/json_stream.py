@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Incremental JSON Array Parsing
+
+API responses that hold one large array (Yapily's /institutions "data") had
+to be downloaded completely and parsed into one list before the first item
+could be used. iter_array_items() instead parses the array items of a
+streamed response as its chunks arrive, so a consumer can start on the
+first items while the rest is still downloading, and only the items not yet
+consumed are held in memory.
+
+Each item is decoded with json.JSONDecoder.raw_decode() (the C scanner), so
+no per-character Python loop is involved; an item split across chunks is
+decoded again once the next chunk arrived.
+
+Usage:
+    from json_stream import iter_array_items
+
+    with HTTP_CLIENT.stream("GET", url) as response:
+        fields = {}
+        for institution in iter_array_items(response.iter_bytes(), "data", fields):
+            ...
+        meta = fields.get("meta")   # the other top-level values, once exhausted
+"""
+
+import codecs
+import json
+import re
+from typing import Any, Iterable, Iterator, Optional
+
+WHITESPACE = re.compile(r"[ \t\n\r]*")
+
+# Characters a number can continue with: a number decoded from the end of the
+# text ("3." or "3.25e" parse as 3 and 3.25) may continue in the next chunk
+NUMBER_TAIL = re.compile(r"[0-9.eE+-]*")
+
+_DECODER = json.JSONDecoder()
+
+
+class _Reader:
+    """Text of a chunked UTF-8 stream, read on demand."""
+
+    def __init__(self, chunks: Iterable[bytes]):
+        self._chunks = iter(chunks)
+        self._utf8 = codecs.getincrementaldecoder("utf-8")()
+        self.text = ""
+        self.pos = 0
+        self.eof = False
+
+    def fill(self) -> bool:
+        """Append the next chunk (dropping the consumed text); False at the end of the stream."""
+        if self.eof:
+            return False
+        for chunk in self._chunks:
+            text = self._utf8.decode(chunk)
+            if text:
+                self.text = self.text[self.pos:] + text
+                self.pos = 0
+                return True
+        self.text = self.text[self.pos:] + self._utf8.decode(b"", final=True)
+        self.pos = 0
+        self.eof = True
+        return False
+
+    def peek(self) -> str:
+        """Skip whitespace and return the next character ("" at the end of the stream)."""
+        while True:
+            self.pos = WHITESPACE.match(self.text, self.pos).end()
+            if self.pos < len(self.text):
+                return self.text[self.pos]
+            if not self.fill():
+                return ""
+
+    def expect(self, characters: str) -> str:
+        """Consume the next character, which must be one of characters."""
+        character = self.peek()
+        if not character or character not in characters:
+            raise ValueError(f"Expected one of {characters!r} at offset {self.pos}, got {character!r}")
+        self.pos += 1
+        return character
+
+    def value(self) -> Any:
+        """Decode the next JSON value, reading more chunks until it is complete."""
+        self.peek()
+        while True:
+            try:
+                value, end = _DECODER.raw_decode(self.text, self.pos)
+            except json.JSONDecodeError:
+                if self.fill():
+                    continue
+                raise
+            if (isinstance(value, (int, float)) and not isinstance(value, bool)
+                    and NUMBER_TAIL.fullmatch(self.text, end) and self.fill()):
+                continue
+            self.pos = end
+            return value
+
+
+def iter_array_items(chunks: Iterable[bytes], key: str, fields: Optional[dict] = None) -> Iterator[Any]:
+    """
+    Yield the items of the array at a top-level key of a streamed JSON object.
+
+    Args:
+        chunks: The response body, as UTF-8 chunks
+        key: Top-level key of the array (nothing is yielded if it is
+            missing or null)
+        fields: Receives the object's other top-level values (complete once
+            the iterator is exhausted)
+
+    Raises:
+        ValueError: If the body is not a JSON object, or the key holds
+            something other than an array
+    """
+    reader = _Reader(chunks)
+    reader.expect("{")
+    if reader.peek() == "}":
+        return
+    while True:
+        name = reader.value()
+        reader.expect(":")
+        if name != key:
+            value = reader.value()
+            if fields is not None:
+                fields[name] = value
+        elif reader.peek() != "[":
+            if reader.value() is not None:
+                raise ValueError(f"{key!r} is not an array")
+        else:
+            reader.expect("[")
+            if reader.peek() == "]":
+                reader.pos += 1
+            else:
+                while True:
+                    yield reader.value()
+                    if reader.expect(",]") == "]":
+                        break
+        if reader.expect(",}") == "}":
+            return
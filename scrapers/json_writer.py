@@ -0,0 +1,327 @@
+#!/usr/bin/env python3
+"""
+Atomic JSON File Writer
+
+Shared by the scrapers for provider files, aggregator files and ID mappings.
+Opening a file with "w" truncates it in place, so a crash mid-write left a
+half-written file, and every run rewrote every file even when nothing changed.
+save_json() instead:
+
+- serializes to the canonical format (see dump_json()) and compares the bytes
+  with the current content (size first, then bytes), returning early when the
+  file would not change, so runs where most providers are unchanged do little
+  write I/O and no git churn
+- writes changed content to a temporary file next to the target and renames
+  it into place with os.replace(), so readers see the old or the new file,
+  never a partial one
+- optionally records written files on a SyncBatch, which fsyncs them and
+  their directories once at the end of a run instead of after every write
+
+The canonical format is what json.dumps(data, indent=2, ensure_ascii=False)
+produces plus a trailing newline: keys in the order of the data (never
+sorted), non-ASCII characters written as UTF-8, and only quotes, backslashes
+and control characters escaped. That is how almost all provider files are
+already formatted (and how the Node.js scripts write them). When orjson is
+installed it serializes with OPT_INDENT_2, which produces the same bytes
+about 7x faster on the provider corpus; the few values where the two differ (floats with an
+exponent, integers beyond 64 bits, non-string keys) go through json instead.
+
+Usage:
+    from json_writer import SyncBatch, save_json
+
+    changed = save_json(path, data)
+
+    with SyncBatch() as batch:
+        for path, data in files:
+            save_json(path, data, batch=batch)
+    # every written file and its directory are now fsynced
+
+    # Rewrite all provider files in the canonical format (or just list the
+    # files that are not, with --check)
+    python scrapers/json_writer.py [--check] [PATH ...]
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Optional
+
+from provider_paths import ProviderLayout
+
+HAS_ORJSON = False
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    pass
+
+BASE_PATH = Path(__file__).parent.parent
+ACCOUNT_PROVIDERS_PATH = BASE_PATH / "data" / "account-providers"
+
+if HAS_ORJSON:
+    ORJSON_OPTIONS = orjson.OPT_INDENT_2 | orjson.OPT_APPEND_NEWLINE
+
+# orjson writes floats with an exponent as 1e16 and 1e-7 where json writes
+# 1e+16 and 1e-07. Any digit followed by "e" in the output sends it through
+# json; mapping the digits to "0" first makes that check a substring search
+# (it also matches text such as "Bank 1e", which only costs a json fallback).
+DIGITS_TO_ZERO = bytes.maketrans(b"123456789", b"000000000")
+
+
+def _read_umask() -> int:
+    # Setting the umask is the only portable way to read it; done once at
+    # import, as writes run on worker threads
+    umask = os.umask(0o022)
+    os.umask(umask)
+    return umask
+
+
+# Mode of new files, as open() would create them (mkstemp creates them 0600)
+NEW_FILE_MODE = 0o666 & ~_read_umask()
+
+
+def dump_json_stdlib(data) -> bytes:
+    """Serialize data to the canonical format with the json module."""
+    return (json.dumps(data, indent=2, ensure_ascii=False) + "\n").encode("utf-8")
+
+
+def dump_json(data) -> bytes:
+    """
+    Serialize data to the canonical format (2-space indent, UTF-8, trailing newline).
+
+    Uses orjson when it is installed, with the same output as dump_json_stdlib().
+    """
+    if HAS_ORJSON:
+        try:
+            content = orjson.dumps(data, option=ORJSON_OPTIONS)
+        except TypeError:
+            # Integers beyond 64 bits, non-string keys, other types
+            return dump_json_stdlib(data)
+        if b"0e" not in content.translate(DIGITS_TO_ZERO):
+            return content
+    return dump_json_stdlib(data)
+
+
+def write_atomic(path: Path, content: bytes) -> None:
+    """
+    Write a file through a temporary file and rename it into place.
+
+    A crash mid-write leaves the previous file intact instead of a truncated one.
+    The file keeps the permissions of the one it replaces; a new file gets the
+    default permissions (0666 minus the umask).
+    """
+    try:
+        mode = os.stat(path).st_mode & 0o7777
+    except FileNotFoundError:
+        mode = NEW_FILE_MODE
+    fd, tmp_name = tempfile.mkstemp(prefix=f".{path.name}.", suffix=".tmp", dir=path.parent)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(content)
+        os.chmod(tmp_name, mode)
+        os.replace(tmp_name, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_name)
+        except OSError:
+            pass
+        raise
+
+
+def is_unchanged(path: Path, content: bytes) -> bool:
+    """Whether a file already holds exactly content (compares the size before reading)."""
+    try:
+        if os.stat(path).st_size != len(content):
+            return False
+        with open(path, "rb") as f:
+            return f.read() == content
+    except OSError:
+        return False
+
+
+class SyncBatch:
+    """
+    Files written during a run, fsynced together at the end.
+
+    Renaming a temporary file into place is atomic, but not durable until the
+    file data and the directory entry reach the disk. Syncing each write would
+    serialize the run on the disk; a batch syncs every file (on a thread pool)
+    and then each affected directory once.
+
+    Args:
+        max_workers: Thread pool size for the file fsyncs (None for the executor default)
+    """
+
+    def __init__(self, max_workers: Optional[int] = None):
+        self.max_workers = max_workers
+        self.files: list[Path] = []
+        self.directories: set[Path] = set()
+
+    def __len__(self) -> int:
+        return len(self.files)
+
+    def __enter__(self) -> "SyncBatch":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.sync()
+
+    def add(self, path: Path) -> None:
+        """Record a written file."""
+        self.files.append(path)
+        self.directories.add(path.parent)
+
+    def sync(self) -> int:
+        """
+        Fsync all recorded files, then their directories.
+
+        Returns:
+            Number of files synced
+        """
+        files, directories = self.files, self.directories
+        self.files, self.directories = [], set()
+        if files:
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                list(executor.map(_fsync_path, files))
+        for directory in sorted(directories):
+            _fsync_path(directory)
+        return len(files)
+
+
+def _fsync_path(path: Path) -> None:
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def write_if_changed(path: Path, content: bytes, batch: Optional[SyncBatch] = None) -> bool:
+    """
+    Atomically replace a file with content, unless it already holds it.
+
+    Args:
+        path: Target file
+        content: New file content
+        batch: Records the file for a batched fsync if it was written
+
+    Returns:
+        True if the file was written
+    """
+    if is_unchanged(path, content):
+        return False
+    write_atomic(path, content)
+    if batch is not None:
+        batch.add(path)
+    return True
+
+
+def save_json(path: Path, data, batch: Optional[SyncBatch] = None) -> bool:
+    """
+    Save data as a JSON file in the canonical format, if it changed.
+
+    Args:
+        path: Target file
+        data: JSON-serializable data
+        batch: Records the file for a batched fsync if it was written
+
+    Returns:
+        True if the file was written, False if it already held this content
+    """
+    return write_if_changed(path, dump_json(data), batch)
+
+
+def load_json_bytes(content: bytes):
+    """Parse JSON file content (with orjson when installed)."""
+    if HAS_ORJSON:
+        return orjson.loads(content)
+    return json.loads(content)
+
+
+def reformat_file(path: Path, check: bool = False, batch: Optional[SyncBatch] = None) -> bool:
+    """
+    Rewrite a JSON file in the canonical format.
+
+    Args:
+        path: JSON file
+        check: Only report whether the file needs reformatting
+        batch: Records the file for a batched fsync if it was written
+
+    Returns:
+        True if the file was (or, with check, would be) rewritten
+
+    Raises:
+        ValueError: If the file is not valid JSON
+    """
+    with open(path, "rb") as f:
+        content = f.read()
+    canonical = dump_json(load_json_bytes(content))
+    if canonical == content:
+        return False
+    if not check:
+        write_atomic(path, canonical)
+        if batch is not None:
+            batch.add(path)
+    return True
+
+
+def collect_json_files(paths: list[Path]) -> list[Path]:
+    """The JSON files among paths, with directories expanded (shards included)."""
+    files = []
+    for path in paths:
+        if path.is_dir():
+            files.extend(sorted(Path(entry.path) for entry in ProviderLayout(path).iter_files()))
+        else:
+            files.append(path)
+    return files
+
+
+def main():
+    """Main entry point with argument parsing."""
+    parser = argparse.ArgumentParser(description="Rewrite JSON data files in the canonical format")
+    parser.add_argument("paths", nargs="*", type=Path, default=[ACCOUNT_PROVIDERS_PATH],
+                        help="Files or directories (default: data/account-providers)")
+    parser.add_argument("--check", action="store_true",
+                        help="Only list files that are not in the canonical format; exit 1 if any")
+    parser.add_argument("--workers", type=int, help="Thread pool size (default: executor default)")
+    args = parser.parse_args()
+
+    files = collect_json_files(args.paths)
+    encoder = "orjson" if HAS_ORJSON else "json"
+    print(f"{'Checking' if args.check else 'Reformatting'} {len(files)} files ({encoder})")
+
+    start = time.perf_counter()
+    changed, errors = [], []
+
+    def reformat(path: Path) -> Optional[bool]:
+        try:
+            return reformat_file(path, check=args.check, batch=batch)
+        except ValueError as e:
+            errors.append((path, e))
+            return None
+
+    with SyncBatch(args.workers) as batch:
+        with ThreadPoolExecutor(max_workers=args.workers) as executor:
+            for path, rewritten in zip(files, executor.map(reformat, files)):
+                if rewritten:
+                    changed.append(path)
+
+    for path in changed:
+        print(f"  {'Not canonical' if args.check else 'Reformatted'}: {path.name}")
+    for path, error in errors:
+        print(f"  Invalid JSON: {path.name} ({error})")
+    verb = "need reformatting" if args.check else "reformatted"
+    print(f"\n{len(changed)} of {len(files)} files {verb}, {len(errors)} invalid "
+          f"({time.perf_counter() - start:.1f}s)")
+    if errors or (args.check and changed):
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
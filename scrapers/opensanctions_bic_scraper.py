@@ -9,7 +9,8 @@ Source: https://www.opensanctions.org/datasets/iso9362_bic/
 License: CC BY-NC 4.0 (non-commercial use)
 
 Usage:
-    python opensanctions_bic_scraper.py [--dry-run] [--limit N] [--banks-only]
+    python opensanctions_bic_scraper.py [--dry-run] [--limit N] [--banks-only] [--workers N] [--full]
+                                        [--uncompressed]
 
 Options:
     --dry-run     Show what would be done without making changes
@@ -17,16 +18,48 @@ Options:
     --update      Only update existing providers with missing BICs (don't create new)
     --banks-only  Only include entities that appear to be banks (recommended)
     --all         Include all entities with BIC codes (corporations, asset managers, etc.)
+    --workers N   Number of processes used to parse the data file (default: CPU count, 1 = serial)
+    --full        Re-download and reprocess every entity, ignoring the ledger of previous runs
+                  (provider files are also checked for edits made in place)
+    --uncompressed  Store the downloaded data file uncompressed (default: gzip, or zstd if served)
+
+The data file is streamed into a compressed cache file and read back from the
+compressed stream; an interrupted download resumes with an HTTP Range request.
+The download is conditional on the ETag/Last-Modified of the previous one, and
+entities whose content is unchanged since a previous run are skipped (see
+LEDGER_FILE), so runs against unchanged upstream data finish in seconds.
 """
 
+import hashlib
 import json
 import os
 import re
-import subprocess
 import sys
 import tempfile
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from typing import Optional
+from typing import Any, Iterator, Optional
+
+from provider_index import load_provider_index, normalize_bic
+from provider_matcher import ProviderMatcher
+from provider_writeback import WriteBackSession
+from resumable_download import download, is_compressed, load_meta, open_cached
+from slugs import slugify_truncated
+
+# Optional faster JSON decoders (msgspec, then orjson, then the stdlib)
+try:
+    import msgspec
+    HAS_MSGSPEC = True
+except ImportError:
+    HAS_MSGSPEC = False
+
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
 
 # Paths
 BASE_PATH = Path(__file__).parent.parent
@@ -37,6 +70,17 @@ SCRAPED_DATA_PATH = BASE_PATH / "scraped-data"
 # Note: Date in URL changes, but this redirects to latest
 OPENSANCTIONS_URL = "https://data.opensanctions.org/datasets/latest/iso9362_bic/entities.ftm.json"
 
+# Cache path of the downloaded data (stored as .json.gz/.json.zst when
+# compressed, with its HTTP validators in opensanctions_bic_data.meta.json)
+# and the processed-entity ledger
+DATA_FILE = SCRAPED_DATA_PATH / "opensanctions_bic_data.json"
+LEDGER_FILE = SCRAPED_DATA_PATH / "opensanctions_bic_ledger.bin"
+LEDGER_VERSION = 1
+DIGEST_SIZE = 16
+
+# Size of the byte ranges handed to each parser process
+CHUNK_SIZE = 8 * 1024 * 1024
+
 # BIC validation pattern
 BIC_PATTERN = re.compile(r'^[A-Z]{6}[A-Z0-9]{2}([A-Z0-9]{3})?$')
 
@@ -61,38 +105,34 @@ EXCLUDE_PATTERNS = [
 ]
 EXCLUDE_REGEX = re.compile('|'.join(EXCLUDE_PATTERNS), re.IGNORECASE)
 
-# Transliteration map for special characters
-TRANSLITERATIONS = {
-    'ä': 'ae', 'ö': 'oe', 'ü': 'ue', 'ß': 'ss',
-    'Ä': 'ae', 'Ö': 'oe', 'Ü': 'ue',
-    'á': 'a', 'à': 'a', 'â': 'a', 'ã': 'a', 'å': 'a', 'ą': 'a',
-    'é': 'e', 'è': 'e', 'ê': 'e', 'ë': 'e', 'ę': 'e', 'ě': 'e',
-    'í': 'i', 'ì': 'i', 'î': 'i', 'ï': 'i',
-    'ó': 'o', 'ò': 'o', 'ô': 'o', 'õ': 'o', 'ø': 'o', 'ő': 'o',
-    'ú': 'u', 'ù': 'u', 'û': 'u', 'ű': 'u',
-    'ý': 'y', 'ÿ': 'y',
-    'ñ': 'n', 'ń': 'n',
-    'ç': 'c', 'ć': 'c', 'č': 'c',
-    'ş': 's', 'ś': 's', 'š': 's',
-    'ž': 'z', 'ź': 'z', 'ż': 'z',
-    'ł': 'l', 'đ': 'd', 'ř': 'r',
-    'ţ': 't', 'ť': 't',
-    'æ': 'ae', 'œ': 'oe',
-    'ă': 'a', 'ș': 's', 'ț': 't',
-}
-
-
-def slugify(name: str) -> str:
-    """Convert a name to a slug for use as provider ID."""
-    slug = name
-    for char, replacement in TRANSLITERATIONS.items():
-        slug = slug.replace(char, replacement)
-        slug = slug.replace(char.upper(), replacement)
-    slug = slug.lower()
-    slug = re.sub(r'[^a-z0-9\s-]', '', slug)
-    slug = re.sub(r'\s+', '-', slug)
-    slug = re.sub(r'-+', '-', slug)
-    return slug.strip('-')[:80]  # Limit length
+# Plain substrings covering every BANK_NAME_PATTERNS alternative. An ASCII name
+# that contains none of them (case-insensitively) cannot match BANK_NAME_REGEX,
+# which lets names be rejected without running the full regex, and raw lines
+# be rejected before decoding them. Keep in sync when adding bank patterns.
+BANK_NAME_KEYWORDS = [
+    'bank', 'banc', 'banque', 'sparkasse', 'raiffeisen', 'credit union',
+    'caisse', 'caja', 'savings', 'building society', 'coop', 'mutuel',
+    'agricole', 'bcc',
+]
+BANK_KEYWORD_REGEX = re.compile('|'.join(re.escape(keyword) for keyword in BANK_NAME_KEYWORDS))
+BANK_KEYWORD_BYTES_REGEX = re.compile(
+    b'|'.join(re.escape(keyword.encode('ascii')) for keyword in BANK_NAME_KEYWORDS)
+)
+
+# Byte patterns used to read the fields parse_entity() checks straight from a
+# raw line, so lines without bank keywords are counted as "not a bank" (rather
+# than "no BIC") exactly as a full decode would count them
+RAW_PROPERTIES_REGEX = re.compile(rb'"properties"\s*:\s*\{')
+RAW_SWIFT_BIC_REGEX = re.compile(rb'"swiftBic"\s*:\s*\[\s*("[^"]*"(?:\s*,\s*"[^"]*")*)\s*\]')
+RAW_STRING_REGEX = re.compile(rb'"([^"]*)"')
+RAW_BIC_PATTERN = re.compile(rb'^[A-Z]{6}[A-Z0-9]{2}([A-Z0-9]{3})?$')
+RAW_COUNTRY_REGEX = re.compile(rb'"country"\s*:\s*\[\s*[\]"]')
+RAW_NAME_REGEX = re.compile(rb'"name"\s*:\s*\[\s*(?:\]|"([^"]*)")')
+RAW_CAPTION_REGEX = re.compile(rb'"caption"\s*:\s*"([^"]*)"')
+
+# Outcomes of prefilter_line()
+REJECT_NO_BIC = 'no_bic'
+REJECT_NOT_BANK = 'not_bank'
 
 
 def is_valid_bic(bic: str) -> bool:
@@ -102,74 +142,172 @@ def is_valid_bic(bic: str) -> bool:
 
 def is_likely_bank(name: str) -> bool:
     """Check if the entity name suggests it's a bank."""
+    if name.isascii() and not BANK_KEYWORD_REGEX.search(name.lower()):
+        return False
     if EXCLUDE_REGEX.search(name):
         return False
     return bool(BANK_NAME_REGEX.search(name))
 
 
-def download_data() -> Optional[str]:
-    """Download the OpenSanctions BIC data file."""
+def load_download_meta() -> dict:
+    """Load the metadata (file, ETag/Last-Modified) of the cached data file."""
+    return load_meta(DATA_FILE, OPENSANCTIONS_URL)
+
+
+def download_data(conditional: bool = True, compress: bool = True) -> tuple[Optional[str], bool]:
+    """
+    Download the OpenSanctions BIC data file.
+
+    The file is streamed into a compressed cache file and an interrupted
+    download resumes from where it stopped (see resumable_download). If a
+    previous download is cached, the request is conditional on its
+    ETag/Last-Modified and a 304 response keeps the cached file.
+
+    Args:
+        conditional: Revalidate the cached file (False forces a full download)
+        compress: Store the cached file compressed
+
+    Returns:
+        Tuple of (path to the data file, or None on failure; whether upstream
+        reported the data as not modified)
+    """
     print(f"Downloading data from OpenSanctions...")
     print(f"  URL: {OPENSANCTIONS_URL}")
 
-    # Create temp file
-    temp_file = SCRAPED_DATA_PATH / "opensanctions_bic_data.json"
-    SCRAPED_DATA_PATH.mkdir(exist_ok=True)
-
+    start = time.perf_counter()
     try:
-        result = subprocess.run(
-            ["curl", "-s", "-L", "-o", str(temp_file), OPENSANCTIONS_URL],
-            capture_output=True,
-            text=True,
-            timeout=300  # 5 min timeout for large file
-        )
-
-        if result.returncode != 0:
-            print(f"  Error downloading: {result.stderr}")
-            return None
+        result = download(OPENSANCTIONS_URL, DATA_FILE, compress=compress, conditional=conditional)
+    except Exception as e:
+        print(f"  Error downloading: {e}")
+        return None, False
 
-        file_size = temp_file.stat().st_size / (1024 * 1024)
-        print(f"  Downloaded {file_size:.1f} MB")
-        return str(temp_file)
+    path = result['path']
+    if result['not_modified']:
+        print(f"  Not modified since the last download (HTTP 304), using {path.name}")
+        return str(path), True
 
-    except Exception as e:
-        print(f"  Error: {e}")
-        return None
+    elapsed = time.perf_counter() - start
+    received = result['received'] / (1024 * 1024)
+    stored = path.stat().st_size / (1024 * 1024)
+    resumed = " (resumed)" if result['resumed'] else ""
+    print(f"  Downloaded {received:.1f} MB in {elapsed:.1f}s{resumed}, stored {stored:.1f} MB as {path.name}")
+    timing = result['timing']
+    print(f"  {timing.protocol}: connect {timing.connect * 1000:.0f} ms, "
+          f"first byte after {timing.wait * 1000:.0f} ms, transfer {timing.transfer:.1f}s")
+    return str(path), False
 
 
-def load_existing_providers() -> tuple[dict, dict]:
-    """
-    Load existing providers and build lookup indexes.
-    Returns (providers_by_id, providers_by_bic)
+def data_version(meta: dict) -> Optional[str]:
+    """Identify the downloaded data by its ETag, else its Last-Modified date."""
+    return meta.get('etag') or meta.get('last_modified')
+
+
+def entity_digest(line: bytes) -> bytes:
+    """Content hash of a raw entity line, as recorded in the ledger."""
+    return hashlib.blake2b(line.strip(), digest_size=DIGEST_SIZE).digest()
+
+
+def load_ledger(mode: dict) -> tuple[set[bytes], dict]:
     """
-    providers_by_id = {}
-    providers_by_bic = {}
+    Load the digests of the entities handled by previous runs.
 
-    for json_file in ACCOUNT_PROVIDERS_PATH.glob("*.json"):
-        try:
-            with open(json_file, 'r', encoding='utf-8') as f:
-                provider = json.load(f)
-                provider_id = json_file.stem
-                providers_by_id[provider_id] = provider
+    The ledger is only used when it was written with the same filter mode
+    (--all/--update change which entities get handled).
 
-                # Index by BIC if present
-                bic = provider.get('bic')
-                if bic and is_valid_bic(bic):
-                    providers_by_bic[bic] = provider_id
-        except Exception as e:
-            print(f"  Warning: Failed to load {json_file}: {e}")
+    Returns:
+        Tuple of (set of entity digests, ledger header)
+    """
+    try:
+        with open(LEDGER_FILE, 'rb') as f:
+            header = json.loads(f.readline())
+            data = f.read()
+    except (OSError, ValueError):
+        return set(), {}
+    if (not isinstance(header, dict) or header.get('version') != LEDGER_VERSION
+            or header.get('mode') != mode or len(data) % DIGEST_SIZE):
+        return set(), {}
+    digests = {data[i:i + DIGEST_SIZE] for i in range(0, len(data), DIGEST_SIZE)}
+    return digests, header
+
+
+def save_ledger(digests: set[bytes], mode: dict, version: Optional[str], complete: bool) -> None:
+    """
+    Write the ledger atomically: a JSON header line followed by raw digests.
 
-    return providers_by_id, providers_by_bic
+    Args:
+        digests: Digests of the entities handled so far
+        mode: Filter mode the entities were handled with
+        version: Data version (ETag/Last-Modified) the digests were read from
+        complete: Whether the whole data file was processed
+    """
+    header = {
+        'version': LEDGER_VERSION,
+        'mode': mode,
+        'data_version': version,
+        'complete': complete,
+        'count': len(digests),
+    }
+    tmp_file = LEDGER_FILE.with_name(f".{LEDGER_FILE.name}.{os.getpid()}.tmp")
+    with open(tmp_file, 'wb') as f:
+        f.write(json.dumps(header, separators=(',', ':')).encode('utf-8') + b'\n')
+        f.write(b''.join(sorted(digests)))
+    os.replace(tmp_file, LEDGER_FILE)
+
+
+if HAS_MSGSPEC:
+    class _EntityProperties(msgspec.Struct):
+        """The entity properties read by the scraper; everything else is skipped."""
+        swiftBic: Any = []
+        country: Any = []
+        name: Any = []
+        address: Any = []
+
+    class _Entity(msgspec.Struct):
+        """An entity line, declaring only the fields read by the scraper."""
+        caption: Any = ''
+        properties: _EntityProperties = msgspec.field(default_factory=_EntityProperties)
+
+    _ENTITY_DECODER = msgspec.json.Decoder(_Entity)
+    JSON_BACKEND = 'msgspec'
+elif HAS_ORJSON:
+    JSON_BACKEND = 'orjson'
+else:
+    JSON_BACKEND = 'json'
+
+
+def decode_entity_fields(line) -> tuple:
+    """
+    Decode an entity line into the fields the scraper reads.
 
+    Returns:
+        Tuple of (caption, swiftBic, country, name, address) values
+    """
+    if JSON_BACKEND == 'msgspec':
+        entity = _ENTITY_DECODER.decode(line)
+        props = entity.properties
+        return entity.caption, props.swiftBic, props.country, props.name, props.address
 
-def parse_entity(line: str) -> Optional[dict]:
-    """Parse a single entity line from the data file."""
+    if JSON_BACKEND == 'orjson':
+        entity = orjson.loads(line)
+    else:
+        # json.loads() is much slower on bytes than on str
+        entity = json.loads(line.decode('utf-8') if isinstance(line, bytes) else line)
+    props = entity.get('properties', {})
+    return (
+        entity.get('caption', ''),
+        props.get('swiftBic', []),
+        props.get('country', []),
+        props.get('name', []),
+        props.get('address', []),
+    )
+
+
+def parse_entity(line) -> Optional[dict]:
+    """Parse a single entity line (str or bytes) from the data file."""
     try:
-        entity = json.loads(line.strip())
-        props = entity.get('properties', {})
+        caption, bics, countries, names, address = decode_entity_fields(line.strip())
 
         # Extract BIC codes
-        bics = props.get('swiftBic', [])
         if not bics:
             return None
 
@@ -179,12 +317,10 @@ def parse_entity(line: str) -> Optional[dict]:
             return None
 
         # Extract country (use first one, uppercase)
-        countries = props.get('country', [])
         country = countries[0].upper() if countries else None
 
         # Get name
-        names = props.get('name', [])
-        name = names[0] if names else entity.get('caption', '')
+        name = names[0] if names else caption
 
         if not name:
             return None
@@ -193,19 +329,231 @@ def parse_entity(line: str) -> Optional[dict]:
             'name': name,
             'bics': valid_bics,
             'country': country,
-            'address': props.get('address', []),
+            'address': address,
         }
     except Exception:
         return None
 
 
+def prefilter_line(line: bytes, banks_only: bool) -> Optional[str]:
+    """
+    Cheaply reject a raw entity line before decoding it.
+
+    A line without a "swiftBic" key can never yield an entity. With banks_only,
+    a plain ASCII name (the first "name" value, else the caption) containing
+    none of BANK_NAME_KEYWORDS cannot pass is_likely_bank(). Such a line is
+    only rejected as "not a bank" once its raw shape proves parse_entity()
+    would have returned an entity (a properties object, a string-only swiftBic
+    array with a valid BIC, string countries), so the skip statistics stay the
+    same as with a full decode. Anything unusual is left to the decoder.
+
+    Returns:
+        REJECT_NO_BIC, REJECT_NOT_BANK, or None if the line must be decoded
+    """
+    if b'"swiftBic"' not in line:
+        return REJECT_NO_BIC
+    if not banks_only:
+        return None
+
+    # Name as parse_entity() picks it
+    match = RAW_NAME_REGEX.search(line)
+    if match is None:
+        if b'"name"' in line:
+            return None
+        name = None
+    else:
+        name = match.group(1)  # None for an empty list
+    if name is None:
+        match = RAW_CAPTION_REGEX.search(line)
+        if match is None:
+            return None
+        name = match.group(1)
+    if not name or not name.isascii() or b'\\' in name:
+        return None
+    if BANK_KEYWORD_BYTES_REGEX.search(name.lower()):
+        return None
+
+    # Not a bank; make sure the line would have parsed at all
+    if b'\\"' in line or line.count(b'{') != line.count(b'}'):
+        return None  # Escaped quotes (string bounds unknown) or a truncated line
+    if RAW_PROPERTIES_REGEX.search(line) is None:
+        return None
+    match = RAW_SWIFT_BIC_REGEX.search(line)
+    if match is None:
+        return None
+    if not any(RAW_BIC_PATTERN.match(bic) for bic in RAW_STRING_REGEX.findall(match.group(1))):
+        return None
+    if b'"country"' in line and RAW_COUNTRY_REGEX.search(line) is None:
+        return None
+    return REJECT_NOT_BANK
+
+
+def scan_lines(lines, banks_only: bool) -> tuple[list[tuple[int, int, Optional[dict]]], int]:
+    """
+    Run parse_entity and the bank filter over a sequence of lines.
+
+    Returns a list of (skipped_no_bic, skipped_not_bank, entity) items, where
+    the skip counts are the lines dropped since the previous entity and each
+    entity carries the 'digest' of its line (see entity_digest()). A final
+    item with entity None carries the skips after the last entity. Keeping the
+    skips positional lets the caller stop at --limit with the same statistics
+    as a line-by-line loop.
+
+    Args:
+        lines: Iterable of raw entity lines (bytes)
+        banks_only: Drop entities whose name does not look like a bank
+
+    Returns:
+        Tuple of (items, number of lines scanned)
+    """
+    items = []
+    skipped_no_bic = 0
+    skipped_not_bank = 0
+    line_count = 0
+
+    for line in lines:
+        line_count += 1
+        rejected = prefilter_line(line, banks_only)
+        if rejected == REJECT_NO_BIC:
+            skipped_no_bic += 1
+            continue
+        if rejected == REJECT_NOT_BANK:
+            skipped_not_bank += 1
+            continue
+        entity = parse_entity(line)
+        if not entity:
+            skipped_no_bic += 1
+            continue
+        if banks_only and not is_likely_bank(entity['name']):
+            skipped_not_bank += 1
+            continue
+        entity['digest'] = entity_digest(line)
+        items.append((skipped_no_bic, skipped_not_bank, entity))
+        skipped_no_bic = 0
+        skipped_not_bank = 0
+
+    if skipped_no_bic or skipped_not_bank:
+        items.append((skipped_no_bic, skipped_not_bank, None))
+
+    return items, line_count
+
+
+def find_chunk_boundaries(path: str, chunk_size: Optional[int] = None) -> list[tuple[int, int]]:
+    """Split a file into (start, end) byte ranges that end on a newline."""
+    chunk_size = chunk_size or CHUNK_SIZE
+    size = os.path.getsize(path)
+    boundaries = []
+    start = 0
+
+    with open(path, 'rb') as f:
+        while start < size:
+            end = min(start + chunk_size, size)
+            if end < size:
+                f.seek(end)
+                f.readline()
+                end = f.tell()
+            boundaries.append((start, end))
+            start = end
+
+    return boundaries
+
+
+def read_blocks(path: str, block_size: Optional[int] = None) -> Iterator[bytes]:
+    """Read a (compressed) data file as decompressed blocks that end on a newline."""
+    block_size = block_size or CHUNK_SIZE
+    pending = b''
+    with open_cached(path) as f:
+        while True:
+            data = f.read(block_size)
+            if not data:
+                break
+            data = pending + data
+            cut = data.rfind(b'\n') + 1
+            pending = data[cut:]
+            if cut:
+                yield data[:cut]
+    if pending:
+        yield pending
+
+
+def scan_block(task: tuple[bytes, bool]) -> tuple[list[tuple[int, int, Optional[dict]]], int]:
+    """Worker: scan a block of whole lines."""
+    data, banks_only = task
+    lines = data.split(b'\n')
+    if lines and not lines[-1]:
+        lines.pop()  # Terminating newline of the block, not an empty line
+    return scan_lines(lines, banks_only)
+
+
+def scan_chunk(task: tuple[str, int, int, bool]) -> tuple[list[tuple[int, int, Optional[dict]]], int]:
+    """Worker: scan one newline-aligned byte range of an uncompressed data file."""
+    path, start, end, banks_only = task
+    with open(path, 'rb') as f:
+        f.seek(start)
+        data = f.read(end - start)
+    return scan_block((data, banks_only))
+
+
+def map_in_order(executor: ProcessPoolExecutor, fn, tasks, window: int) -> Iterator:
+    """Like executor.map(), but only keeps `window` tasks in flight (tasks is consumed lazily)."""
+    pending = deque()
+    for task in tasks:
+        pending.append(executor.submit(fn, task))
+        if len(pending) >= window:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
+def iter_entities(path: str, banks_only: bool, workers: int,
+                  counters: dict) -> Iterator[tuple[int, int, Optional[dict]]]:
+    """
+    Yield scanned entities from the data file in file order.
+
+    With more than one worker the file is split into newline-aligned chunks
+    that are parsed and filtered in a process pool; results are still yielded
+    in file order, so the reconciliation stage sees exactly what the serial
+    path would produce. Workers read their byte range of an uncompressed file
+    themselves; a compressed file is decompressed here, streaming, and handed
+    out as blocks of lines.
+
+    Args:
+        path: Path to entities.ftm.json (optionally .gz/.zst compressed)
+        banks_only: Drop entities whose name does not look like a bank
+        workers: Number of parser processes (1 parses in this process)
+        counters: Updated with the number of 'lines' scanned
+    """
+    if workers <= 1:
+        with open_cached(path) as f:
+            for line in f:
+                items, line_count = scan_lines((line,), banks_only)
+                counters['lines'] += line_count
+                yield from items
+        return
+
+    executor = ProcessPoolExecutor(max_workers=workers)
+    if is_compressed(path):
+        tasks = ((block, banks_only) for block in read_blocks(path))
+        results = map_in_order(executor, scan_block, tasks, window=workers * 2)
+    else:
+        tasks = [(path, start, end, banks_only) for start, end in find_chunk_boundaries(path)]
+        results = executor.map(scan_chunk, tasks)
+    try:
+        for items, line_count in results:
+            counters['lines'] += line_count
+            yield from items
+    finally:
+        # Stops outstanding chunks when the caller breaks early (--limit)
+        executor.shutdown(wait=True, cancel_futures=True)
+
+
 def create_provider(entity: dict, bic: str) -> dict:
     """Create a new provider entry from OpenSanctions entity."""
     name = entity['name']
     country = entity['country'] or 'XX'
 
     # Generate provider ID
-    provider_id = slugify(name)
+    provider_id = slugify_truncated(name)
     if country and country != 'XX':
         # Add country suffix if not already present
         country_lower = country.lower()
@@ -220,7 +568,7 @@ def create_provider(entity: dict, bic: str) -> dict:
         "legalName": name,
         "verified": False,
         "status": "live",
-        "icon": f"https://icons.duckduckgo.com/ip3/www.{slugify(name)}.com.ico",
+        "icon": f"https://icons.duckduckgo.com/ip3/www.{slugify_truncated(name)}.com.ico",
         "websiteUrl": None,
         "countryHQ": country,
         "countries": [country] if country else [],
@@ -238,55 +586,65 @@ def create_provider(entity: dict, bic: str) -> dict:
     }
 
 
-def save_provider(provider: dict) -> None:
-    """Save a provider to disk."""
-    provider_id = provider['id']
-    path = ACCOUNT_PROVIDERS_PATH / f"{provider_id}.json"
-    with open(path, 'w', encoding='utf-8') as f:
-        json.dump(provider, f, indent=2)
-        f.write('\n')
-
-
-def main():
-    """Main entry point."""
-    print("=" * 60)
-    print("OpenSanctions BIC Scraper")
-    print("=" * 60)
-
-    # Parse arguments
-    args = sys.argv[1:]
-    dry_run = '--dry-run' in args
-    update_only = '--update' in args
-    banks_only = '--banks-only' in args or '--all' not in args  # Default to banks-only
-    include_all = '--all' in args
-    limit = None
-    if '--limit' in args:
-        idx = args.index('--limit')
-        if idx + 1 < len(args):
-            limit = int(args[idx + 1])
-
-    if dry_run:
-        print("\n*** DRY RUN - No files will be modified ***\n")
-
-    if banks_only and not include_all:
-        print("Filter: Banks only (use --all to include all entities)\n")
-    else:
-        print("Filter: All entities with BIC codes\n")
-
-    # Download data
-    data_file = download_data()
-    if not data_file:
-        print("Failed to download data. Exiting.")
-        return 1
+def process_entities(data_file: str, not_modified: bool, session: Optional[WriteBackSession] = None,
+                     banks_only: bool = True, update_only: bool = False, limit: Optional[int] = None,
+                     full: bool = False, workers: int = 1) -> Optional[dict]:
+    """
+    Match the entities of the data file against the providers and queue the changes.
+
+    Nothing is written: the changes are queued on the session, and the ledger
+    of the run must only be saved (save_run_ledger()) after it was flushed.
+
+    Args:
+        data_file: Path returned by download_data()
+        not_modified: Whether upstream reported the data as not modified
+        session: Session to queue the changes on, whose index is matched
+            against (default: a new session on the provider index)
+        banks_only: Only include entities that appear to be banks
+        update_only: Only set missing BICs, don't create providers
+        limit: Process only the first N entities
+        full: Reprocess every entity, ignoring the ledger of previous runs, and
+            check every provider file for edits made in place
+        workers: Processes used to parse the data file
+
+    Returns:
+        The run: session, stats, lines (entities scanned), scan_elapsed,
+        fuzzy_candidates (entities only matched by name similarity, which are
+        reported but not applied) and the ledger to save; None if the data is
+        unchanged since the last complete run
+    """
+    # Entities handled by previous runs (same filter mode) are skipped
+    mode = {'banks_only': banks_only, 'update_only': update_only}
+    version = data_version(load_download_meta())
+    ledger, ledger_header = (set(), {}) if full else load_ledger(mode)
+    if ledger:
+        print(f"  Ledger: {len(ledger)} entities handled by previous runs")
+    if (not_modified and ledger_header.get('complete') and version
+            and ledger_header.get('data_version') == version):
+        print("\nUpstream data unchanged since the last complete run; nothing to do.")
+        print("Use --full to reprocess all entities.")
+        return None
 
     # Load existing providers
     print("\nLoading existing providers...")
-    providers_by_id, providers_by_bic = load_existing_providers()
-    print(f"  Found {len(providers_by_id)} existing providers")
-    print(f"  Found {len(providers_by_bic)} providers with BIC codes")
+    if session is None:
+        # Queue all changes and write each provider file once at the end
+        session = WriteBackSession(load_provider_index(ACCOUNT_PROVIDERS_PATH, verify=full))
+    index = session.index
+    existing_ids = set(index.ids)  # Providers created by this run are not matched by name
+    print(f"  Found {len(existing_ids)} existing providers")
+    print(f"  Found {len(index.by_bic)} providers with BIC codes")
+
+    # Fuzzy name matches are only reported as candidates for a missing BIC,
+    # so only providers without one are indexed for them
+    without_bic = ProviderMatcher(
+        (provider_id, index.get_name(provider_id), index.get_countries(provider_id))
+        for provider_id in sorted(existing_ids) if not index.get_bic(provider_id)
+    )
 
     # Process entities
-    print("\nProcessing OpenSanctions entities...")
+    print(f"\nProcessing OpenSanctions entities ({workers} worker{'s' if workers != 1 else ''})...")
+    print(f"  JSON decoder: {JSON_BACKEND}")
 
     stats = {
         'total': 0,
@@ -296,107 +654,246 @@ def main():
         'updated_bic': 0,
         'created': 0,
         'skipped_duplicate_id': 0,
+        'unchanged': 0,
+        'fuzzy': 0,
     }
 
-    new_provider_ids = set()  # Track newly created IDs to avoid duplicates
-
-    with open(data_file, 'r', encoding='utf-8') as f:
-        for line_num, line in enumerate(f, 1):
-            if limit and stats['total'] >= limit:
+    counters = {'lines': 0}
+    scan_start = time.perf_counter()
+    # Filter to banks only if requested (default)
+    entities = iter_entities(data_file, banks_only, workers, counters)
+
+    seen = set()  # Digests of the entities handled in this run
+    completed = True
+    # BICs set on existing providers in this run (normalized BIC -> provider
+    # ID); the index only records them once the files were written
+    queued_bics: dict[str, str] = {}
+    queued_providers: set[str] = set()
+    # Entity digest -> ID of the provider its change was queued on; entities
+    # whose provider file fails to write are left out of the ledger
+    queued: dict[bytes, str] = {}
+    # (entity name, BIC, provider ID, score) of the fuzzy name matches
+    fuzzy_candidates = []
+
+    for skipped_no_bic, skipped_not_bank, entity in entities:
+        if limit and stats['total'] >= limit:
+            completed = False
+            break
+
+        stats['skipped_no_bic'] += skipped_no_bic
+        stats['skipped_not_bank'] += skipped_not_bank
+        if entity is None:
+            continue
+
+        stats['total'] += 1
+
+        # Skip entities whose exact content was already handled
+        digest = entity['digest']
+        seen.add(digest)
+        if digest in ledger:
+            stats['unchanged'] += 1
+            continue
+
+        # Use primary BIC (first valid one)
+        primary_bic = entity['bics'][0]
+
+        # Check if BIC already exists (in its 8- or 11-character form). A
+        # branch BIC is an entity of its own, even if its head office is known
+        if index.find_by_bic(primary_bic, branches=False) or normalize_bic(primary_bic) in queued_bics:
+            stats['already_exists'] += 1
+            continue
+
+        # Check if we can update an existing provider by name match
+        provider_id = slugify_truncated(entity['name'])
+        country = entity['country']
+        if country:
+            provider_id_with_country = f"{provider_id}-{country.lower()}"
+        else:
+            provider_id_with_country = provider_id
+
+        # Try to find existing provider
+        existing_id = None
+        for try_id in [provider_id, provider_id_with_country]:
+            if try_id in existing_ids:
+                existing_id = try_id
                 break
 
-            entity = parse_entity(line)
-            if not entity:
-                stats['skipped_no_bic'] += 1
+        if not existing_id:
+            similar = without_bic.best_match(entity['name'], country)
+            if similar and similar[0] not in queued_providers:
+                # BICs are only set on exact ID matches; a name that merely
+                # resembles a provider is reported, and neither set nor created.
+                # It stays out of the ledger, so the next run looks at it again.
+                fuzzy_candidates.append((entity['name'], primary_bic, *similar))
+                stats['fuzzy'] += 1
+                seen.discard(digest)
                 continue
 
-            # Filter to banks only if requested (default)
-            if banks_only and not include_all:
-                if not is_likely_bank(entity['name']):
-                    stats['skipped_not_bank'] += 1
+        if existing_id:
+            # Update existing provider with BIC if missing. Decided on the
+            # file's own field: the index only holds valid BICs, and a file
+            # with a malformed one is never overwritten.
+            bic = index.get_bic(existing_id)
+            if not bic and existing_id not in queued_providers:
+                try:
+                    with open(index.path_for(existing_id), 'r', encoding='utf-8') as f:
+                        bic = json.load(f).get('bic')
+                except (OSError, ValueError) as e:
+                    print(f"  Warning: Failed to read {existing_id}: {e}")
+                    seen.discard(digest)
                     continue
+                if bic:
+                    print(f"  Kept: {existing_id} has an invalid BIC {bic!r}, not {primary_bic}")
+            if not bic and existing_id not in queued_providers:
+                session.set_bic(existing_id, primary_bic)
+                queued_bics[normalize_bic(primary_bic)] = existing_id
+                queued_providers.add(existing_id)
+                queued[digest] = existing_id
+                print(f"  Updated: {existing_id} <- BIC: {primary_bic}")
+                stats['updated_bic'] += 1
+            else:
+                stats['already_exists'] += 1
+            continue
 
-            stats['total'] += 1
+        # Skip if update-only mode
+        if update_only:
+            continue
 
-            # Use primary BIC (first valid one)
-            primary_bic = entity['bics'][0]
+        # Create new provider
+        new_provider = create_provider(entity, primary_bic)
+        new_id = new_provider['id']
 
-            # Check if BIC already exists
-            if primary_bic in providers_by_bic:
-                stats['already_exists'] += 1
-                continue
+        # Ensure unique ID (the index includes providers created by this run)
+        if new_id in index:
+            # Add BIC suffix to make unique
+            new_id = f"{new_id}-{primary_bic.lower()}"
+            new_provider['id'] = new_id
 
-            # Check if we can update an existing provider by name match
-            provider_id = slugify(entity['name'])
-            country = entity['country']
-            if country:
-                provider_id_with_country = f"{provider_id}-{country.lower()}"
-            else:
-                provider_id_with_country = provider_id
-
-            # Try to find existing provider
-            existing_id = None
-            for try_id in [provider_id, provider_id_with_country]:
-                if try_id in providers_by_id:
-                    existing_id = try_id
-                    break
-
-            if existing_id:
-                # Update existing provider with BIC if missing
-                provider = providers_by_id[existing_id]
-                if not provider.get('bic'):
-                    if not dry_run:
-                        provider['bic'] = primary_bic
-                        save_provider(provider)
-                    print(f"  Updated: {existing_id} <- BIC: {primary_bic}")
-                    stats['updated_bic'] += 1
-                    providers_by_bic[primary_bic] = existing_id
-                else:
-                    stats['already_exists'] += 1
+            if new_id in index:
+                stats['skipped_duplicate_id'] += 1
                 continue
 
-            # Skip if update-only mode
-            if update_only:
-                continue
-
-            # Create new provider
-            new_provider = create_provider(entity, primary_bic)
-            new_id = new_provider['id']
-
-            # Ensure unique ID
-            if new_id in providers_by_id or new_id in new_provider_ids:
-                # Add BIC suffix to make unique
-                new_id = f"{new_id}-{primary_bic.lower()}"
-                new_provider['id'] = new_id
+        session.create(new_provider)
+        queued[digest] = new_id
+        print(f"  Created: {new_id} ({entity['name'][:40]}...) BIC: {primary_bic}")
+        stats['created'] += 1
+
+        # Progress indicator
+        if stats['total'] % 5000 == 0:
+            print(f"  ... processed {stats['total']} entities ...")
+
+    entities.close()
+    scan_elapsed = time.perf_counter() - scan_start
+
+    run = {
+        'session': session,
+        'stats': stats,
+        'banks_only': banks_only,
+        'lines': counters['lines'],
+        'scan_elapsed': scan_elapsed,
+        'mode': mode,
+        'fuzzy_candidates': fuzzy_candidates,
+        'queued': queued,
+    }
+    if completed:
+        # Entities removed upstream drop out of the ledger
+        run.update(ledger=seen, ledger_version=version, complete=True)
+    else:
+        run.update(ledger=ledger | seen, ledger_version=ledger_header.get('data_version'), complete=False)
+    return run
 
-                if new_id in providers_by_id or new_id in new_provider_ids:
-                    stats['skipped_duplicate_id'] += 1
-                    continue
 
-            if not dry_run:
-                save_provider(new_provider)
+def save_run_ledger(run: dict) -> None:
+    """
+    Save the ledger of a run returned by process_entities(), once its session was flushed.
 
-            new_provider_ids.add(new_id)
-            providers_by_bic[primary_bic] = new_id
-            print(f"  Created: {new_id} ({entity['name'][:40]}...) BIC: {primary_bic}")
-            stats['created'] += 1
+    Entities whose provider file could not be written (the session's errors)
+    are left out, so the next run handles them again.
+    """
+    errors = run['session'].errors
+    failed = {digest for digest, provider_id in run['queued'].items() if provider_id in errors}
+    if failed:
+        print(f"  {len(failed)} entities left out of the ledger (provider file not written)")
+    save_ledger(run['ledger'] - failed, run['mode'], run['ledger_version'], complete=run['complete'])
 
-            # Progress indicator
-            if stats['total'] % 5000 == 0:
-                print(f"  ... processed {stats['total']} entities ...")
 
-    # Summary
+def print_summary(run: dict) -> None:
+    """Print the stats of a run returned by process_entities()."""
+    stats = run['stats']
     print("\n" + "=" * 60)
     print("Summary")
     print("=" * 60)
     print(f"  Total entities processed: {stats['total']}")
+    print(f"  Unchanged since last run: {stats['unchanged']}")
     print(f"  Skipped (no valid BIC):   {stats['skipped_no_bic']}")
-    if banks_only and not include_all:
+    if run['banks_only']:
         print(f"  Skipped (not a bank):     {stats['skipped_not_bank']}")
     print(f"  Already exists:           {stats['already_exists']}")
     print(f"  Updated with BIC:         {stats['updated_bic']}")
     print(f"  Created new:              {stats['created']}")
     print(f"  Skipped (duplicate ID):   {stats['skipped_duplicate_id']}")
+    print(f"  Fuzzy matches (not applied): {stats['fuzzy']}")
+    for name, bic, provider_id, score in run['fuzzy_candidates']:
+        print(f"    {name[:40]} (BIC {bic}) ~ {provider_id} (score {score:.2f})")
+    scan_elapsed = run['scan_elapsed']
+    rate = run['lines'] / scan_elapsed if scan_elapsed > 0 else 0
+    print(f"  Scanned {run['lines']} entities in {scan_elapsed:.1f}s ({rate:,.0f} entities/sec)")
+
+
+def main():
+    """Main entry point."""
+    print("=" * 60)
+    print("OpenSanctions BIC Scraper")
+    print("=" * 60)
+
+    # Parse arguments
+    args = sys.argv[1:]
+    dry_run = '--dry-run' in args
+    update_only = '--update' in args
+    banks_only = '--banks-only' in args or '--all' not in args  # Default to banks-only
+    include_all = '--all' in args
+    limit = None
+    if '--limit' in args:
+        idx = args.index('--limit')
+        if idx + 1 < len(args):
+            limit = int(args[idx + 1])
+    full = '--full' in args
+    compress = '--uncompressed' not in args
+    workers = os.cpu_count() or 1
+    if '--workers' in args:
+        idx = args.index('--workers')
+        if idx + 1 < len(args):
+            workers = max(1, int(args[idx + 1]))
+
+    if dry_run:
+        print("\n*** DRY RUN - No files will be modified ***\n")
+
+    if banks_only and not include_all:
+        print("Filter: Banks only (use --all to include all entities)\n")
+    else:
+        print("Filter: All entities with BIC codes\n")
+
+    # Download data
+    data_file, not_modified = download_data(conditional=not full, compress=compress)
+    if not data_file:
+        print("Failed to download data. Exiting.")
+        return 1
+
+    run = process_entities(data_file, not_modified, banks_only=banks_only and not include_all,
+                           update_only=update_only, limit=limit, full=full, workers=workers)
+    if run is None:
+        return 0
+
+    if not dry_run:
+        session = run['session']
+        if len(session):
+            print(f"\nWriting {len(session)} provider files...")
+        session.flush()
+        session.print_schema_summary()
+        session.index.save()
+        save_run_ledger(run)
+
+    print_summary(run)
 
     if dry_run:
         print("\n*** DRY RUN - No files were modified ***")
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Bounded Queue Between Fetching and Reconciliation
+
+The Plaid and Yapily scrapers used to collect every fetched page into one
+list before matching the first institution, so a run took fetch + reconcile
+time and held the whole institution list in memory. With --stream, the fetch
+runs on producer threads that put each page on a PageQueue, and the scraper
+plans the institutions of each page while later pages are still downloading:
+
+- the queue holds at most `depth` pages; producers block while it is full,
+  so memory is bounded by the queue depth (plus the page each producer and
+  the consumer is working on), not by the size of the institution list
+- pages are consumed in the order they arrive, not in request order
+- an exception in a producer is raised in the consumer once the pages put
+  before it are consumed; when the consumer stops early (leaving the `with`
+  block), blocked producers are released and stop with PipelineCancelled
+
+Usage:
+    from page_queue import PageQueue
+
+    def produce(pages):
+        for page in fetch_pages():
+            pages.put(page)
+
+    with PageQueue(depth=4).start(produce) as pages:
+        for institution in pages.items():
+            ...
+    print(f"{pages.items_consumed} institutions, at most {pages.peak} pages buffered")
+"""
+
+import queue
+import threading
+from typing import Callable, Iterator, Optional
+
+# Pages buffered between the producers and the consumer
+DEFAULT_QUEUE_DEPTH = 4
+
+# Seconds a blocked producer waits before checking for cancellation again
+PUT_POLL_INTERVAL = 0.1
+
+# Put by the producer thread after its last page
+_DONE = object()
+
+
+class PipelineCancelled(Exception):
+    """Raised in producers blocked on put() when the consumer stopped."""
+
+
+class PageQueue:
+    """
+    Bounded hand-off of fetched pages from producer threads to one consumer.
+
+    Args:
+        depth: Pages buffered before put() blocks
+    """
+
+    def __init__(self, depth: int = DEFAULT_QUEUE_DEPTH):
+        self.depth = max(1, depth)
+        self.pages_consumed = 0
+        self.items_consumed = 0
+        # Most pages buffered at once
+        self.peak = 0
+        self._queue: queue.Queue = queue.Queue(maxsize=self.depth)
+        self._cancelled = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._error: Optional[BaseException] = None
+
+    def __enter__(self) -> "PageQueue":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.cancel()
+
+    def _put(self, item) -> bool:
+        while not self._cancelled.is_set():
+            try:
+                self._queue.put(item, timeout=PUT_POLL_INTERVAL)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def put(self, page: list) -> None:
+        """
+        Hand a page to the consumer, blocking while the queue is full.
+
+        Safe to call from several producer threads.
+
+        Raises:
+            PipelineCancelled: If the consumer stopped
+        """
+        if not self._put(page):
+            raise PipelineCancelled()
+        self.peak = max(self.peak, self._queue.qsize())
+
+    def start(self, produce: Callable[["PageQueue"], None]) -> "PageQueue":
+        """Run produce(self) on a background thread; the queue ends when it returns."""
+        def run() -> None:
+            try:
+                produce(self)
+            except PipelineCancelled:
+                pass
+            except BaseException as e:
+                self._error = e
+            finally:
+                self._put(_DONE)
+
+        self._thread = threading.Thread(target=run, name="page-producer", daemon=True)
+        self._thread.start()
+        return self
+
+    def __iter__(self) -> Iterator[list]:
+        """Yield the pages in the order they were put, until the producer returned."""
+        while True:
+            page = self._queue.get()
+            if page is _DONE:
+                break
+            self.pages_consumed += 1
+            self.items_consumed += len(page)
+            yield page
+        self._thread.join()
+        if self._error is not None:
+            raise self._error
+
+    def items(self) -> Iterator:
+        """Yield the items of every page."""
+        for page in self:
+            yield from page
+
+    def cancel(self) -> None:
+        """Stop the producers (if still running) and wait for the producer thread."""
+        self._cancelled.set()
+        # Unblock producers waiting on a full queue
+        while True:
+            try:
+                self._queue.get_nowait()
+            except queue.Empty:
+                break
+        if self._thread is not None:
+            self._thread.join()
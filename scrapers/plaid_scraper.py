@@ -18,15 +18,24 @@ Sources:
 - https://support.plaid.com/hc/en-us/articles/27895826947735
 """
 
+import argparse
+import http.client
 import json
 import os
-import re
-import subprocess
 import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Optional
-
-from bs4 import BeautifulSoup
+from typing import Callable, Iterable, Iterator, Optional
+
+from aggregator_snapshot import AggregatorSnapshot
+from http_cache import add_cache_arguments, cache_from_args
+from http_client import HTTPClient, TokenBucket
+from icon_store import ICON_STORE_PATH, IconStore
+from json_writer import save_json
+from page_queue import DEFAULT_QUEUE_DEPTH, PageQueue
+from provider_index import ProviderIndex, load_provider_index
+from provider_reconcile import FUZZY, ReconcilePlan, reverse_id_mappings
+from slugs import slugify
 
 # Load .env file if it exists
 ENV_FILE = Path(__file__).parent / ".env"
@@ -49,10 +58,29 @@ BASE_PATH = Path(__file__).parent.parent
 PLAID_JSON_PATH = BASE_PATH / "data" / "api-aggregators" / "plaid.json"
 ACCOUNT_PROVIDERS_PATH = BASE_PATH / "data" / "account-providers"
 PLAID_INSTITUTION_IDS_PATH = Path(__file__).parent / "plaid_institution_ids.json"
+# Institution ID -> hash of its logo in the icon store
+PLAID_LOGOS_PATH = ICON_STORE_PATH / "plaid_institution_logos.json"
+# Institutions of the last run, to reconcile only the changes (see aggregator_snapshot.py)
+SNAPSHOT_PATH = BASE_PATH / "scraped-data" / "plaid"
+SNAPSHOT_FIELDS = ("name", "url", "country_codes", "logo_hash")
 
 # Request settings
 REQUEST_TIMEOUT = 30
 
+# /institutions/get paging: countries fetched concurrently, all workers sharing
+# one rate limit (requests per second) that is halved on RATE_LIMIT_EXCEEDED
+INSTITUTIONS_PAGE_SIZE = 500  # Max per request
+DEFAULT_WORKERS = 4
+DEFAULT_RATE_LIMIT = 5.0
+RATE_LIMIT_ERROR = "RATE_LIMIT_EXCEEDED"
+MAX_RATE_LIMIT_RETRIES = 8
+
+# Keep-alive connections shared by all API requests
+HTTP_CLIENT = HTTPClient(timeout=REQUEST_TIMEOUT)
+
+# Institution logos, decoded from the API's base64 as each page arrives
+ICON_STORE = IconStore()
+
 # Plaid sandbox test institutions to skip (not real banks)
 # See: https://plaid.com/docs/sandbox/institutions/
 PLAID_TEST_INSTITUTION_IDS = {
@@ -115,54 +143,15 @@ PLAID_COUNTRIES = {
     "SE": "Sweden",
 }
 
-# Transliteration map for special characters
-TRANSLITERATIONS = {
-    'ä': 'ae', 'ö': 'oe', 'ü': 'ue', 'ß': 'ss',
-    'Ä': 'ae', 'Ö': 'oe', 'Ü': 'ue',
-    'á': 'a', 'à': 'a', 'â': 'a', 'ã': 'a', 'å': 'a', 'ą': 'a',
-    'é': 'e', 'è': 'e', 'ê': 'e', 'ë': 'e', 'ę': 'e', 'ě': 'e',
-    'í': 'i', 'ì': 'i', 'î': 'i', 'ï': 'i',
-    'ó': 'o', 'ò': 'o', 'ô': 'o', 'õ': 'o', 'ø': 'o', 'ő': 'o',
-    'ú': 'u', 'ù': 'u', 'û': 'u', 'ű': 'u',
-    'ý': 'y', 'ÿ': 'y',
-    'ñ': 'n', 'ń': 'n',
-    'ç': 'c', 'ć': 'c', 'č': 'c',
-    'ş': 's', 'ś': 's', 'š': 's',
-    'ž': 'z', 'ź': 'z', 'ż': 'z',
-    'ł': 'l', 'đ': 'd', 'ř': 'r',
-    'ţ': 't', 'ť': 't',
-    'æ': 'ae', 'œ': 'oe',
-    'ă': 'a', 'ș': 's', 'ț': 't',
-}
-
-
-def slugify(name: str) -> str:
-    """Convert a name to a slug."""
-    slug = name
-    for char, replacement in TRANSLITERATIONS.items():
-        slug = slug.replace(char, replacement)
-        slug = slug.replace(char.upper(), replacement)
-    slug = slug.lower()
-    slug = re.sub(r'[^a-z0-9\s-]', '', slug)
-    slug = re.sub(r'\s+', '-', slug)
-    slug = re.sub(r'-+', '-', slug)
-    return slug.strip('-')
-
 
 def fetch_url(url: str) -> Optional[str]:
-    """Fetch content from a URL using curl."""
+    """Fetch content from a URL."""
     print(f"Fetching {url}...")
     try:
-        result = subprocess.run(
-            ["curl", "-s", "-L", "--connect-timeout", str(REQUEST_TIMEOUT), url],
-            capture_output=True,
-            text=True,
-            timeout=REQUEST_TIMEOUT + 10
-        )
-        if result.returncode == 0 and result.stdout:
-            return result.stdout
-        return None
-    except Exception as e:
+        response = HTTP_CLIENT.get(url)
+        response.raise_for_status()
+        return response.text or None
+    except (OSError, http.client.HTTPException) as e:
         print(f"  Warning: Failed to fetch {url}: {e}")
         return None
 
@@ -187,34 +176,206 @@ def plaid_api_request(endpoint: str, data: dict) -> Optional[dict]:
     
     print(f"  API request to {endpoint}...")
     try:
-        result = subprocess.run(
-            [
-                "curl", "-s", "-X", "POST", url,
-                "-H", "Content-Type: application/json",
-                "-d", json.dumps(payload)
-            ],
-            capture_output=True,
-            text=True,
-            timeout=REQUEST_TIMEOUT
-        )
-        if result.returncode == 0 and result.stdout:
-            return json.loads(result.stdout)
+        response = HTTP_CLIENT.post_json(url, payload)
+        if response.content:
+            # Error responses (4xx) carry the error_type/error_code body
+            return response.json()
         return None
-    except Exception as e:
+    except (OSError, http.client.HTTPException, ValueError) as e:
         print(f"  Warning: API request failed: {e}")
         return None
 
 
-def get_plaid_institutions() -> list[dict]:
+def institution_record(institution: dict, icons: IconStore) -> dict:
+    """
+    Reduce an institution from the API to the fields the scraper uses.
+
+    The base64 logo is decoded and written to the icon store; the record keeps
+    only its hash.
+
+    Returns:
+        Dict with institution_id, name, url, country_codes and logo_hash
+        (None without a logo)
+    """
+    return {
+        "institution_id": institution.get("institution_id", ""),
+        "name": institution.get("name", ""),
+        "url": institution.get("url"),
+        "country_codes": institution.get("country_codes", ["US"]),
+        "logo_hash": icons.put_base64(institution.get("logo")),
+    }
+
+
+def iter_country_pages(country_code: str, limiter: TokenBucket, icons: IconStore,
+                       stats: dict) -> Iterator[list[dict]]:
+    """
+    Yield the institutions of one country page by page, as institution_record()s.
+
+    Each API response is reduced to records (its logos written to the icon
+    store) and dropped before the next page is requested, so at most one
+    page with logos per country is in memory.
+
+    Args:
+        country_code: Country to fetch
+        limiter: Rate limiter shared by all countries
+        icons: Store for the decoded logos
+        stats: Receives pages and retries (rate-limited requests)
+    """
+    consecutive_retries = 0
+    offset = 0
+
+    while True:
+        limiter.acquire()
+        response = plaid_api_request("/institutions/get", {
+            "count": INSTITUTIONS_PAGE_SIZE,
+            "offset": offset,
+            "country_codes": [country_code],
+            "options": {
+                "include_optional_metadata": True
+            }
+        })
+
+        if response and response.get("error_type") == RATE_LIMIT_ERROR:
+            stats["retries"] += 1
+            consecutive_retries += 1
+            if consecutive_retries > MAX_RATE_LIMIT_RETRIES:
+                print(f"  Error for {country_code}: still rate limited after {MAX_RATE_LIMIT_RETRIES} retries")
+                return
+            # Slow every worker down, and wait before retrying this page
+            limiter.slow_down()
+            delay = min(2 ** consecutive_retries, 30)
+            print(f"  {country_code}: Rate limited, retrying in {delay}s "
+                  f"(now {limiter.rate:.1f} requests/sec)")
+            time.sleep(delay)
+            continue
+
+        if not response or "institutions" not in response:
+            if response and "error_code" in response:
+                print(f"  Error for {country_code}: {response.get('error_message', 'Unknown error')}")
+            return
+
+        consecutive_retries = 0
+        limiter.speed_up()
+        total = response.get("total", 0)
+        page = [institution_record(institution, icons) for institution in response["institutions"]]
+        del response
+        if not page:
+            return
+
+        stats["pages"] += 1
+        yield page
+
+        # Check if there are more
+        offset += len(page)
+        if offset >= total:
+            return
+
+
+def fetch_country_institutions(country_code: str, limiter: TokenBucket,
+                               on_page: Optional[Callable[[list[dict]], None]] = None,
+                               icons: Optional[IconStore] = None) -> dict:
+    """
+    Fetch all pages of institutions for one country.
+
+    Args:
+        country_code: Country to fetch
+        limiter: Rate limiter shared by all countries
+        on_page: Called with each page of institutions as it arrives (the
+            pages are then not collected)
+        icons: Store for the decoded logos (default: ICON_STORE)
+
+    Returns:
+        Dict with institutions (institution_record()s, empty with on_page),
+        logos (institution ID -> logo hash), count, pages, retries
+        (rate-limited requests) and elapsed seconds
+    """
+    start = time.perf_counter()
+    stats = {"pages": 0, "retries": 0}
+    institutions = []
+    logos = {}
+    count = 0
+
+    for page in iter_country_pages(country_code, limiter, icons or ICON_STORE, stats):
+        count += len(page)
+        for record in page:
+            if record["logo_hash"] and record["institution_id"]:
+                logos[record["institution_id"]] = record["logo_hash"]
+        if on_page is not None:
+            on_page(page)
+        else:
+            institutions.extend(page)
+        print(f"  {country_code}: Fetched {len(page)} institutions (total: {count})")
+
+    return {
+        "institutions": institutions,
+        "logos": logos,
+        "count": count,
+        "elapsed": time.perf_counter() - start,
+        **stats,
+    }
+
+
+def fetch_all_countries(workers: int, rate_limit: float,
+                        on_page: Optional[Callable[[list[dict]], None]] = None,
+                        dry_run: bool = False) -> dict[str, dict]:
+    """
+    Fetch the institutions of every country concurrently and print per-country timings.
+
+    Args:
+        workers: Countries fetched at the same time
+        rate_limit: Requests per second across all workers
+        on_page: Passed to fetch_country_institutions()
+        dry_run: Only hash the logos, without writing them to the icon store
+            or PLAID_LOGOS_PATH
+
+    Returns:
+        Country code -> fetch_country_institutions() result, in country order
+    """
+    start = time.perf_counter()
+    limiter = TokenBucket(rate_limit)
+    icons = IconStore(ICON_STORE.path, dry_run=True) if dry_run else ICON_STORE
+    country_codes = list(PLAID_COUNTRIES.keys())
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        results = list(executor.map(lambda code: fetch_country_institutions(code, limiter, on_page, icons),
+                                    country_codes))
+    elapsed = time.perf_counter() - start
+
+    print("\n  Per-country timings:")
+    for country_code, result in zip(country_codes, results):
+        retries = f", {result['retries']} rate-limited" if result["retries"] else ""
+        print(f"    {country_code}: {result['count']} institutions, "
+              f"{result['pages']} pages in {result['elapsed']:.1f}s{retries}")
+    print(f"  Fetched {sum(result['count'] for result in results)} institutions in {elapsed:.1f}s")
+
+    if not dry_run:
+        logos = load_plaid_logos()
+        for result in results:
+            logos.update(result["logos"])
+        PLAID_LOGOS_PATH.parent.mkdir(parents=True, exist_ok=True)
+        save_json(PLAID_LOGOS_PATH, logos)
+    print(f"  Logos: {icons.summary()}")
+    return dict(zip(country_codes, results))
+
+
+def get_plaid_institutions(workers: int = DEFAULT_WORKERS, rate_limit: float = DEFAULT_RATE_LIMIT,
+                           dry_run: bool = False) -> list[dict]:
     """
     Fetch all institutions from Plaid API.
+
+    Countries are fetched concurrently over pooled keep-alive connections,
+    all under one shared rate limit.
+
+    Args:
+        workers: Countries fetched at the same time
+        rate_limit: Requests per second across all workers
+        dry_run: Do not write the logos (see fetch_all_countries())
     
-    Returns a list of institution dictionaries with:
+    Returns a list of institution dictionaries (in country order) with:
     - institution_id
     - name
     - country_codes
     - url (website)
-    - logo (base64)
+    - logo_hash (the logo itself is in ICON_STORE)
     """
     institutions = []
     
@@ -224,65 +385,43 @@ def get_plaid_institutions() -> list[dict]:
         print("  Set PLAID_CLIENT_ID and PLAID_SECRET to fetch bank data.")
         return institutions
     
-    print("Fetching institutions from Plaid API...")
-    
-    # Fetch institutions for each country
-    for country_code in PLAID_COUNTRIES.keys():
-        offset = 0
-        count = 500  # Max per request
-        
-        while True:
-            response = plaid_api_request("/institutions/get", {
-                "count": count,
-                "offset": offset,
-                "country_codes": [country_code],
-                "options": {
-                    "include_optional_metadata": True
-                }
-            })
-            
-            if not response or "institutions" not in response:
-                if response and "error_code" in response:
-                    print(f"  Error for {country_code}: {response.get('error_message', 'Unknown error')}")
-                break
-            
-            batch = response["institutions"]
-            if not batch:
-                break
-            
-            institutions.extend(batch)
-            print(f"  {country_code}: Fetched {len(batch)} institutions (total: {len(institutions)})")
-            
-            # Check if there are more
-            total = response.get("total", 0)
-            offset += len(batch)
-            if offset >= total:
-                break
-            
-            time.sleep(0.5)  # Rate limiting
+    print(f"Fetching institutions from Plaid API ({workers} workers, {rate_limit:g} requests/sec)...")
+
+    results = fetch_all_countries(workers, rate_limit, dry_run=dry_run)
+    for result in results.values():
+        institutions.extend(result["institutions"])
     
     return institutions
 
 
-def load_json(path: Path) -> dict:
-    """Load a JSON file."""
-    with open(path, "r", encoding="utf-8") as f:
-        return json.load(f)
+def stream_plaid_institutions(workers: int = DEFAULT_WORKERS, rate_limit: float = DEFAULT_RATE_LIMIT,
+                              queue_depth: int = DEFAULT_QUEUE_DEPTH, dry_run: bool = False) -> PageQueue:
+    """
+    Start fetching all institutions from Plaid API in the background.
 
+    Like get_plaid_institutions(), but each page is put on the returned queue
+    as it arrives (in arrival order, not country order) instead of being
+    collected, so it can be processed while later pages download.
 
-def save_json(path: Path, data: dict) -> None:
-    """Save data to a JSON file."""
-    with open(path, "w", encoding="utf-8") as f:
-        json.dump(data, f, indent=2, ensure_ascii=False)
-        f.write("\n")
+    Args:
+        workers: Countries fetched at the same time
+        rate_limit: Requests per second across all workers
+        queue_depth: Pages buffered before the fetch waits for the consumer
+        dry_run: Do not write the logos (see fetch_all_countries())
 
+    Returns:
+        The page queue; consume it in a `with` block
+    """
+    print(f"Fetching institutions from Plaid API ({workers} workers, {rate_limit:g} requests/sec, "
+          f"streaming through a queue of {queue_depth} pages)...")
+    return PageQueue(queue_depth).start(
+        lambda pages: fetch_all_countries(workers, rate_limit, pages.put, dry_run))
 
-def get_existing_provider_ids() -> set[str]:
-    """Get the set of existing account provider IDs."""
-    provider_ids = set()
-    for json_file in ACCOUNT_PROVIDERS_PATH.glob("*.json"):
-        provider_ids.add(json_file.stem)
-    return provider_ids
+
+def load_json(path: Path) -> dict:
+    """Load a JSON file."""
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
 
 
 def find_matching_provider(bank_id: str, existing_ids: set[str]) -> Optional[str]:
@@ -318,9 +457,30 @@ def load_plaid_institution_ids() -> dict:
 
 def save_plaid_institution_ids(mappings: dict) -> None:
     """Save the Plaid institution ID mappings."""
-    with open(PLAID_INSTITUTION_IDS_PATH, "w", encoding="utf-8") as f:
-        json.dump(mappings, f, indent=2)
-        f.write("\n")
+    save_json(PLAID_INSTITUTION_IDS_PATH, mappings)
+
+
+def load_plaid_logos() -> dict:
+    """Load the institution ID -> logo hash mappings of earlier runs."""
+    if PLAID_LOGOS_PATH.exists():
+        with open(PLAID_LOGOS_PATH, "r", encoding="utf-8") as f:
+            return json.load(f)
+    return {}
+
+
+def institution_snapshot(full: bool = False) -> AggregatorSnapshot:
+    """
+    The institutions of the last run, to reconcile only the ones that changed.
+
+    Args:
+        full: Reconcile every institution, not only the changed ones
+    """
+    return AggregatorSnapshot(
+        "plaid", SNAPSHOT_PATH,
+        key=lambda institution: institution["institution_id"],
+        normalize=lambda institution: {field: institution[field] for field in SNAPSHOT_FIELDS},
+        full=full,
+    )
 
 
 def create_account_provider(institution: dict) -> dict:
@@ -357,24 +517,6 @@ def create_account_provider(institution: dict) -> dict:
     return provider
 
 
-def add_plaid_to_existing_provider(provider_path: Path) -> bool:
-    """Add 'plaid' to an existing provider's apiAggregators list."""
-    provider = load_json(provider_path)
-    
-    aggregators = provider.get("apiAggregators", [])
-    if aggregators is None:
-        aggregators = []
-    
-    if "plaid" not in aggregators:
-        aggregators.append("plaid")
-        aggregators.sort()
-        provider["apiAggregators"] = aggregators
-        save_json(provider_path, provider)
-        return True
-    
-    return False
-
-
 def update_plaid_coverage() -> None:
     """Update plaid.json with market coverage."""
     print("\n=== Updating Plaid Market Coverage ===\n")
@@ -401,29 +543,28 @@ def update_plaid_coverage() -> None:
         print("  No changes to market coverage.")
 
 
-def update_bank_providers() -> None:
-    """Fetch bank data from Plaid API and create/update account providers."""
-    print("\n=== Updating Bank Providers ===\n")
-    
-    institutions = get_plaid_institutions()
-    
-    if not institutions:
-        print("No institutions fetched. Skipping provider updates.")
-        return
-    
-    print(f"Processing {len(institutions)} institutions...")
-    
-    existing_ids = get_existing_provider_ids()
-    print(f"Found {len(existing_ids)} existing account providers")
-    
+def plan_bank_providers(institutions: Iterable[dict], index: ProviderIndex,
+                        apply_fuzzy: bool = False) -> tuple[ReconcilePlan, dict]:
+    """
+    Match fetched institutions against the providers and plan the changes.
+
+    Args:
+        institutions: Institutions from get_plaid_institutions(), or the items
+            of a stream_plaid_institutions() queue
+        index: The provider index (planned providers are added to it)
+        apply_fuzzy: Update providers found only by fuzzy matching (default:
+            report them)
+
+    Returns:
+        Tuple of (plan, Plaid institution ID mappings including this run's)
+    """
     # Load existing Plaid institution ID mappings
     plaid_id_mappings = load_plaid_institution_ids()
     
-    new_count = 0
-    updated_count = 0
-    skipped_count = 0
+    # Plan all changes in memory; files are written once, when the plan is executed.
+    # Institutions mapped in earlier runs go straight to their provider.
+    plan = ReconcilePlan(index, "plaid", reverse_id_mappings(plaid_id_mappings), apply_fuzzy=apply_fuzzy)
     
-    skipped_test = 0
     for institution in institutions:
         name = institution.get("name", "")
         if not name:
@@ -432,51 +573,158 @@ def update_bank_providers() -> None:
         # Skip test institutions
         inst_id = institution.get("institution_id", "")
         if inst_id in PLAID_TEST_INSTITUTION_IDS:
-            skipped_test += 1
+            plan.skip(name, "test institution")
             continue
         
         # Skip by name pattern
         name_lower = name.lower()
         if any(pattern in name_lower for pattern in PLAID_TEST_NAME_PATTERNS):
-            skipped_test += 1
+            plan.skip(name, "test institution")
+            continue
+        
+        if plan.known(name, inst_id, source=institution):
             continue
         
         bank_id = slugify(name)
-        matching_id = find_matching_provider(bank_id, existing_ids)
+        countries = institution.get("country_codes", ["US"])
+        matching_id, score = plan.match(name, bank_id, countries[0] if countries else None,
+                                        find_matching_provider)
         
         if matching_id:
-            provider_path = ACCOUNT_PROVIDERS_PATH / f"{matching_id}.json"
-            if add_plaid_to_existing_provider(provider_path):
-                updated_count += 1
-                if matching_id != bank_id:
-                    print(f"  Updated: {name} -> {matching_id}.json (added plaid)")
-                else:
-                    print(f"  Updated: {name} (added plaid)")
-            else:
-                skipped_count += 1
-            # Save institution ID mapping
-            if inst_id:
-                plaid_id_mappings[matching_id] = inst_id
+            entry = plan.update(name, bank_id, matching_id, score=score, source=institution)
         else:
-            provider_path = ACCOUNT_PROVIDERS_PATH / f"{bank_id}.json"
-            provider = create_account_provider(institution)
-            save_json(provider_path, provider)
-            existing_ids.add(bank_id)
-            new_count += 1
-            print(f"  Created: {name} ({bank_id}.json)")
-            # Save institution ID mapping
-            if inst_id:
-                plaid_id_mappings[bank_id] = inst_id
-    
-    # Save updated institution ID mappings
+            entry = plan.create(name, create_account_provider(institution), source=institution)
+        # Save institution ID mapping (not for fuzzy matches that are only reported)
+        if inst_id and entry.action != FUZZY:
+            plaid_id_mappings[matching_id or bank_id] = inst_id
+    
+    print(f"{plan.known_count} institutions found by their Plaid institution ID (not matched again)")
+    return plan, plaid_id_mappings
+
+
+def report_bank_providers(stats: dict, plaid_id_mappings: dict) -> None:
+    """Save the institution ID mappings and print the summary of an executed plan."""
     save_plaid_institution_ids(plaid_id_mappings)
     print(f"Saved {len(plaid_id_mappings)} Plaid institution ID mappings")
     
-    print(f"\nSummary: {new_count} new, {updated_count} updated, {skipped_count} already had plaid, {skipped_test} test institutions skipped")
+    print(f"\nSummary: {stats['created']} new, {stats['updated']} updated, "
+          f"{stats['unchanged']} already had plaid, {stats['conflicts']} conflicting names merged, "
+          f"{stats['fuzzy']} fuzzy matches not applied, "
+          f"{stats['skipped']} test institutions skipped")
+
+
+def update_bank_providers(workers: int = DEFAULT_WORKERS, rate_limit: float = DEFAULT_RATE_LIMIT,
+                          dry_run: bool = False, stream: bool = False,
+                          queue_depth: int = DEFAULT_QUEUE_DEPTH, full: bool = False,
+                          apply_fuzzy: bool = False) -> None:
+    """
+    Fetch bank data from Plaid API and create/update account providers.
+
+    Args:
+        workers: Countries fetched at the same time
+        rate_limit: Requests per second across all workers
+        dry_run: Print the planned changes instead of making them
+        stream: Plan each page of institutions while later pages download
+            (see stream_plaid_institutions())
+        queue_depth: Pages buffered between the fetch and the planning when streaming
+        full: Reconcile every institution, not only the ones that changed
+            since the last run's snapshot, and check every provider file
+            for edits made in place
+        apply_fuzzy: Update providers found only by fuzzy matching (default:
+            report them)
+    """
+    print("\n=== Updating Bank Providers ===\n")
+    
+    snapshot = institution_snapshot(full)
+    
+    if stream:
+        if not os.environ.get("PLAID_CLIENT_ID"):
+            print("No PLAID_CLIENT_ID set. Skipping provider updates.")
+            return
+        with stream_plaid_institutions(workers, rate_limit, queue_depth, dry_run) as pages:
+            # Loaded while the first pages download
+            index = load_provider_index(ACCOUNT_PROVIDERS_PATH, verify=full)
+            print(f"Found {len(index.ids)} existing account providers")
+            plan, plaid_id_mappings = plan_bank_providers(snapshot.delta(pages.items()), index, apply_fuzzy)
+        print(f"Processed {pages.items_consumed} institutions from {pages.pages_consumed} pages "
+              f"(at most {pages.peak} of {pages.depth} pages buffered)")
+        if not pages.items_consumed:
+            print("No institutions fetched. Skipping provider updates.")
+            return
+    else:
+        institutions = get_plaid_institutions(workers, rate_limit, dry_run)
+        
+        if not institutions:
+            print("No institutions fetched. Skipping provider updates.")
+            return
+        
+        print(f"Processing {len(institutions)} institutions...")
+        
+        index = load_provider_index(ACCOUNT_PROVIDERS_PATH, verify=full)
+        print(f"Found {len(index.ids)} existing account providers")
+        
+        plan, plaid_id_mappings = plan_bank_providers(snapshot.delta(institutions), index, apply_fuzzy)
+    
+    snapshot.print_report()
+    
+    if dry_run:
+        plan.print_plan()
+        plan.discard()
+        return
+    
+    stats = plan.execute()
+    index.save()
+    report_bank_providers(stats, plaid_id_mappings)
+    snapshot.forget(plan.unapplied())
+    snapshot.save()
 
 
 def main():
-    """Main entry point."""
+    """Main entry point with argument parsing."""
+    parser = argparse.ArgumentParser(description="Update Plaid coverage and bank providers")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=DEFAULT_WORKERS,
+        help=f"Countries fetched concurrently from the Plaid API (default: {DEFAULT_WORKERS})"
+    )
+    parser.add_argument(
+        "--rate-limit",
+        type=float,
+        default=DEFAULT_RATE_LIMIT,
+        help=f"Maximum Plaid API requests per second across all workers (default: {DEFAULT_RATE_LIMIT:g})"
+    )
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="Show the planned provider changes without making any"
+    )
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="Match institutions page by page while later pages are still downloading"
+    )
+    parser.add_argument(
+        "--queue-depth",
+        type=int,
+        default=DEFAULT_QUEUE_DEPTH,
+        help=f"Pages buffered between fetching and matching with --stream (default: {DEFAULT_QUEUE_DEPTH})"
+    )
+    parser.add_argument(
+        "--full",
+        action="store_true",
+        help="Reconcile every institution, not only those changed since the last run's snapshot, "
+             "and check provider files for edits made in place"
+    )
+    parser.add_argument(
+        "--apply-fuzzy",
+        action="store_true",
+        help="Add the aggregator to providers found only by fuzzy name matching (default: report them)"
+    )
+    add_cache_arguments(parser)
+    args = parser.parse_args()
+    HTTP_CLIENT.cache = cache_from_args(args)
+
     print("=" * 60)
     print("Plaid Coverage Scraper")
     print("=" * 60)
@@ -490,11 +738,17 @@ def main():
         print("Set PLAID_CLIENT_ID and PLAID_SECRET to fetch bank data.")
     
     # Update market coverage (always)
-    update_plaid_coverage()
+    if not args.dry_run:
+        update_plaid_coverage()
+    else:
+        print("\n[DRY RUN] Would update market coverage")
     
     # Update bank providers (if credentials available)
     if has_credentials:
-        update_bank_providers()
+        update_bank_providers(args.workers, args.rate_limit, dry_run=args.dry_run,
+                              stream=args.stream, queue_depth=args.queue_depth, full=args.full,
+                              apply_fuzzy=args.apply_fuzzy)
+        HTTP_CLIENT.print_timings()
     
     print("\n" + "=" * 60)
     print("Done!")
@@ -0,0 +1,483 @@
+#!/usr/bin/env python3
+"""
+Shared Account Provider Index
+
+Builds an in-memory index over data/account-providers once per process and
+shares it between scrapers:
+- the set of existing provider IDs
+- provider ID -> file path
+- BIC -> provider ID (8- and 11-character forms normalized, branch BICs
+  falling back to their head office)
+- normalized name -> provider ID
+- a fuzzy matching index (provider_matcher.ProviderMatcher), built on demand
+
+The index is persisted to a compact cache file under scraped-data/.cache/,
+keyed on the provider directory's stamp (see provider_paths.py): the inode
+and mtime of the directory and of every shard, which only takes a few stat
+calls. Adding, removing or renaming a provider file changes the stamp and
+invalidates the cache; the index is then rebuilt from the columnar provider
+snapshot (provider_snapshot.py), which stats every file and only re-reads
+those changed since it was written. A file edited in place leaves the stamp
+as it was, so that per-file check only runs when asked for
+(load_provider_index(verify=True), which the scrapers' --full passes, or
+--verify). Scrapers that create providers themselves record them with
+ProviderIndex.add() and re-stamp the cache with ProviderIndex.save(), so the
+next run still starts warm.
+
+Usage:
+    from provider_index import load_provider_index
+
+    index = load_provider_index(ACCOUNT_PROVIDERS_PATH)
+    if bank_id in index.ids:
+        provider_path = index.path_for(bank_id)
+
+    # Pick up provider files edited in place, or rebuild the cache from scratch
+    python scrapers/provider_index.py --verify
+    python scrapers/provider_index.py --rebuild
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import sys
+import time
+import unicodedata
+from pathlib import Path
+from typing import Optional
+
+from provider_matcher import DEFAULT_MIN_SCORE, ProviderMatcher
+from provider_paths import get_layout
+from provider_snapshot import load_providers
+
+# Paths relative to this script's location
+BASE_PATH = Path(__file__).parent.parent
+ACCOUNT_PROVIDERS_PATH = BASE_PATH / "data" / "account-providers"
+CACHE_PATH = BASE_PATH / "scraped-data" / ".cache"
+
+# Bump when the cache layout changes so old caches are ignored
+CACHE_VERSION = 5
+
+# BIC validation pattern
+BIC_PATTERN = re.compile(r'^[A-Z]{6}[A-Z0-9]{2}([A-Z0-9]{3})?$')
+
+# Indexes already loaded in this process, keyed on the provider directory
+_LOADED_INDEXES: dict[Path, "ProviderIndex"] = {}
+
+
+def normalize_name(name: str) -> str:
+    """
+    Normalize a provider name for loose equality lookups.
+
+    Accents are stripped, case is folded and everything except letters and
+    digits is dropped, so "Crédit Agricole S.A." and "credit agricole sa"
+    normalize to the same key.
+
+    Example:
+        >>> normalize_name("Crédit Agricole S.A.")
+        'creditagricolesa'
+    """
+    decomposed = unicodedata.normalize("NFKD", name)
+    stripped = "".join(c for c in decomposed if not unicodedata.combining(c))
+    return "".join(c for c in stripped.casefold() if c.isalnum())
+
+
+def normalize_bic(bic) -> Optional[str]:
+    """
+    Normalize a BIC for lookups, or return None if it is not a valid BIC.
+
+    Whitespace is removed and case folded, and the head-office branch code
+    "XXX" is dropped, so "deutdeffxxx" and "DEUTDEFF" normalize to the same key.
+
+    Example:
+        >>> normalize_bic("DEUT DE FF XXX")
+        'DEUTDEFF'
+    """
+    if not isinstance(bic, str):
+        return None
+    bic = "".join(bic.split()).upper()
+    if not BIC_PATTERN.match(bic):
+        return None
+    if bic.endswith("XXX"):
+        return bic[:8]
+    return bic
+
+
+def _directory_stamp(providers_path: Path) -> dict:
+    """Return the directory stamp used as the cache key (see ProviderLayout.stamp())."""
+    return get_layout(providers_path).stamp()
+
+
+def _matches_stamp(header: dict, stamp: dict) -> bool:
+    """Whether a cache header was written for this directory stamp."""
+    return all(header.get(field) == value for field, value in stamp.items())
+
+
+def _cache_file_for(providers_path: Path, cache_path: Path) -> Path:
+    """Return the cache file for a provider directory (one per directory)."""
+    digest = hashlib.sha1(str(providers_path.resolve()).encode("utf-8")).hexdigest()[:12]
+    return cache_path / f"provider-index-{digest}.json"
+
+
+class ProviderIndex:
+    """
+    In-memory index over a directory of account provider JSON files.
+
+    Attributes:
+        providers_path: The indexed provider directory
+        ids: Set of existing provider IDs (shared, kept up to date by add()
+            and remove())
+    """
+
+    def __init__(self, providers_path: Path, names: dict[str, str], bics: dict[str, str],
+                 countries: dict[str, list[str]], cache_file: Optional[Path] = None):
+        self.providers_path = providers_path
+        self.layout = get_layout(providers_path)
+        self.cache_file = cache_file
+        self.ids: set[str] = set(names)
+        self._names = names
+        self._bics = bics
+        self._countries = countries
+        self._by_bic: Optional[dict[str, str]] = None
+        self._by_name: Optional[dict[str, str]] = None
+        self._matcher: Optional[ProviderMatcher] = None
+        self._dirty = False
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __contains__(self, provider_id: str) -> bool:
+        return provider_id in self.ids
+
+    @property
+    def by_bic(self) -> dict[str, str]:
+        """Normalized BIC -> provider ID (built on first use)."""
+        if self._by_bic is None:
+            by_bic = {}
+            for provider_id in sorted(self._bics):
+                by_bic.setdefault(self._bics[provider_id], provider_id)
+            self._by_bic = by_bic
+        return self._by_bic
+
+    @property
+    def by_name(self) -> dict[str, str]:
+        """Normalized name -> provider ID (built on first use)."""
+        if self._by_name is None:
+            by_name = {}
+            for provider_id in sorted(self._names):
+                key = normalize_name(self._names[provider_id])
+                if key:
+                    by_name.setdefault(key, provider_id)
+            self._by_name = by_name
+        return self._by_name
+
+    @property
+    def matcher(self) -> ProviderMatcher:
+        """Fuzzy matching index over IDs and names (built on first use)."""
+        if self._matcher is None:
+            self._matcher = ProviderMatcher(
+                (provider_id, self._names[provider_id], self._countries.get(provider_id, ()))
+                for provider_id in sorted(self._names)
+            )
+        return self._matcher
+
+    def path_for(self, provider_id: str) -> Path:
+        """Return the JSON file path for a provider ID (in either layout)."""
+        return self.layout.path_for(provider_id)
+
+    def get_bic(self, provider_id: str) -> Optional[str]:
+        """Return the indexed (normalized) BIC of a provider, if any."""
+        return self._bics.get(provider_id)
+
+    def get_name(self, provider_id: str) -> Optional[str]:
+        """Return the indexed name of a provider, if any."""
+        return self._names.get(provider_id)
+
+    def get_countries(self, provider_id: str) -> list[str]:
+        """Return the indexed countries (including countryHQ) of a provider."""
+        return self._countries.get(provider_id, [])
+
+    def find_by_bic(self, bic: str, branches: bool = True) -> Optional[str]:
+        """
+        Return the provider ID carrying the given BIC, if any.
+
+        An 8-character BIC and its 11-character "XXX" form are equivalent.
+
+        Args:
+            bic: BIC to look up
+            branches: Resolve a branch BIC without a provider of its own to
+                its head office (False: exact BICs only)
+        """
+        bic = normalize_bic(bic)
+        if not bic:
+            return None
+        provider_id = self.by_bic.get(bic)
+        if provider_id is None and branches and len(bic) == 11:
+            provider_id = self.by_bic.get(bic[:8])
+        return provider_id
+
+    def find_by_name(self, name: str) -> Optional[str]:
+        """Return the provider ID whose normalized name matches, if any."""
+        return self.by_name.get(normalize_name(name))
+
+    def find_similar(self, name: str, country: Optional[str] = None,
+                     min_score: float = DEFAULT_MIN_SCORE) -> Optional[tuple[str, float]]:
+        """
+        Return the existing provider that best matches a name, if close enough.
+
+        Args:
+            name: Institution name (or slug)
+            country: Optional country code of the institution
+            min_score: Minimum similarity score (0-1)
+
+        Returns:
+            Tuple of (provider_id, score), or None
+        """
+        return self.matcher.best_match(name, country, min_score)
+
+    def add(self, provider: dict) -> None:
+        """
+        Record a provider that was created (or changed) during this run.
+
+        Args:
+            provider: The provider data as written to disk
+        """
+        provider_id = provider["id"]
+        name, bic, countries = _provider_fields(provider)
+
+        self.ids.add(provider_id)
+        self._names[provider_id] = name
+        if countries:
+            self._countries[provider_id] = countries
+        if bic:
+            self._bics[provider_id] = bic
+            if self._by_bic is not None:
+                self._by_bic.setdefault(bic, provider_id)
+        if self._by_name is not None:
+            key = normalize_name(name)
+            if key:
+                self._by_name.setdefault(key, provider_id)
+        if self._matcher is not None:
+            self._matcher.add(provider_id, name, countries)
+        self._dirty = True
+
+    def remove(self, provider_id: str) -> None:
+        """
+        Forget a provider recorded with add() whose file was never written.
+
+        The BIC, name and fuzzy matching indexes are rebuilt on their next use.
+        """
+        if provider_id not in self.ids:
+            return
+        self.ids.discard(provider_id)
+        self._names.pop(provider_id, None)
+        self._bics.pop(provider_id, None)
+        self._countries.pop(provider_id, None)
+        self._by_bic = None
+        self._by_name = None
+        self._matcher = None
+        self._dirty = True
+
+    def save(self) -> None:
+        """
+        Persist the index, stamped with the current directory stamp.
+
+        Call this after the run's provider writes are done, so files created
+        by this run do not invalidate the cache for the next one.
+        """
+        if self.cache_file is None:
+            return
+
+        stamp = _directory_stamp(self.providers_path)
+        if not self._dirty and self.cache_file.exists():
+            # Nothing recorded; only refresh when the stamp moved on
+            try:
+                with open(self.cache_file, "r", encoding="utf-8") as f:
+                    header = json.loads(f.readline())
+                if _matches_stamp(header, stamp):
+                    return
+            except (OSError, ValueError):
+                pass
+
+        _write_cache(self.cache_file, self.providers_path, stamp,
+                     self._names, self._bics, self._countries)
+        self._dirty = False
+
+
+def _provider_fields(provider: dict) -> tuple[str, Optional[str], list[str]]:
+    """Extract the indexed (name, bic, countries) fields from provider data."""
+    name = provider.get("name")
+    if not isinstance(name, str):
+        name = ""
+    bic = normalize_bic(provider.get("bic"))
+    countries = provider.get("countries")
+    if not isinstance(countries, list):
+        countries = []
+    countries = [country for country in countries if isinstance(country, str)]
+    country_hq = provider.get("countryHQ")
+    if isinstance(country_hq, str) and country_hq and country_hq not in countries:
+        countries.append(country_hq)
+    return name, bic, countries
+
+
+def _scan_providers(providers_path: Path, cache_path: Optional[Path],
+                    rebuild: bool) -> tuple[dict[str, str], dict[str, str], dict[str, list[str]]]:
+    """Read the indexed fields of every provider (the slow, cold path)."""
+    columns = load_providers(providers_path, ("name", "bic", "countries", "countryHQ"),
+                             cache_path, rebuild=rebuild)
+    names = {}
+    bics = {}
+    countries = {}
+    for provider_id, name, bic, provider_countries, country_hq in zip(
+            columns["id"], columns["name"], columns["bic"], columns["countries"], columns["countryHQ"]):
+        name, bic, provider_countries = _provider_fields(
+            {"name": name, "bic": bic, "countries": provider_countries, "countryHQ": country_hq}
+        )
+        names[provider_id] = name
+        if bic:
+            bics[provider_id] = bic
+        if provider_countries:
+            countries[provider_id] = provider_countries
+    return names, bics, countries
+
+
+def _read_cache(cache_file: Path, providers_path: Path,
+                stamp: dict) -> Optional[tuple[dict[str, str], dict[str, str], dict[str, list[str]]]]:
+    """Load cached (names, bics, countries) if the cache matches the directory stamp."""
+    try:
+        with open(cache_file, "r", encoding="utf-8") as f:
+            header = json.loads(f.readline())
+            if (header.get("version") != CACHE_VERSION
+                    or header.get("directory") != str(providers_path.resolve())
+                    or not _matches_stamp(header, stamp)):
+                return None
+            columns = json.loads(f.read())
+    except (OSError, ValueError):
+        return None
+
+    names = dict(zip(columns["ids"], columns["names"]))
+    bics = dict(zip(columns["bic_ids"], columns["bics"]))
+    countries = dict(zip(columns["country_ids"], columns["countries"]))
+    return names, bics, countries
+
+
+def _write_cache(cache_file: Path, providers_path: Path, stamp: dict,
+                 names: dict[str, str], bics: dict[str, str],
+                 countries: dict[str, list[str]]) -> None:
+    """Write the cache atomically: a header line followed by compact columns."""
+    cache_file.parent.mkdir(parents=True, exist_ok=True)
+    header = {
+        "version": CACHE_VERSION,
+        "directory": str(providers_path.resolve()),
+        **stamp,
+    }
+    ids = sorted(names)
+    bic_ids = sorted(bics)
+    country_ids = sorted(countries)
+    columns = {
+        "ids": ids,
+        "names": [names[provider_id] for provider_id in ids],
+        "bic_ids": bic_ids,
+        "bics": [bics[provider_id] for provider_id in bic_ids],
+        "country_ids": country_ids,
+        "countries": [countries[provider_id] for provider_id in country_ids],
+    }
+
+    tmp_file = cache_file.with_name(f".{cache_file.name}.{os.getpid()}.tmp")
+    with open(tmp_file, "w", encoding="utf-8") as f:
+        f.write(json.dumps(header, separators=(",", ":")) + "\n")
+        f.write(json.dumps(columns, separators=(",", ":"), ensure_ascii=False))
+    os.replace(tmp_file, cache_file)
+
+
+def load_provider_index(providers_path: Path = ACCOUNT_PROVIDERS_PATH,
+                        cache_path: Optional[Path] = CACHE_PATH,
+                        rebuild: bool = False, verify: bool = False) -> ProviderIndex:
+    """
+    Load the provider index for a directory, building it if needed.
+
+    The index is memoized per directory, so every caller in the process
+    shares the same instance.
+
+    Args:
+        providers_path: Directory containing provider JSON files
+        cache_path: Directory for the on-disk cache (None disables caching)
+        rebuild: Ignore any existing cache and rescan the directory
+        verify: Ignore the cached index and check every file's mtime and size
+            against the provider snapshot, picking up files edited in place
+            (which the directory stamp misses)
+
+    Returns:
+        The ProviderIndex for the directory
+    """
+    key = providers_path.resolve()
+    if not rebuild and not verify and key in _LOADED_INDEXES:
+        return _LOADED_INDEXES[key]
+
+    cache_file = _cache_file_for(providers_path, cache_path) if cache_path else None
+    stamp = _directory_stamp(providers_path)
+
+    cached = None
+    if cache_file and not rebuild and not verify:
+        cached = _read_cache(cache_file, providers_path, stamp)
+
+    if cached is not None:
+        names, bics, countries = cached
+    else:
+        names, bics, countries = _scan_providers(providers_path, cache_path, rebuild)
+        if cache_file:
+            _write_cache(cache_file, providers_path, stamp, names, bics, countries)
+
+    index = ProviderIndex(providers_path, names, bics, countries, cache_file)
+    _LOADED_INDEXES[key] = index
+    return index
+
+
+def unload_provider_index(providers_path: Path = ACCOUNT_PROVIDERS_PATH) -> None:
+    """
+    Forget the memoized index of a directory, so the next load reads it again.
+
+    Used after a dry run, which records planned providers in the index
+    without writing them.
+    """
+    _LOADED_INDEXES.pop(providers_path.resolve(), None)
+
+
+def main():
+    """Main entry point with argument parsing."""
+    parser = argparse.ArgumentParser(
+        description="Build or inspect the shared account provider index cache"
+    )
+    parser.add_argument(
+        "--rebuild",
+        action="store_true",
+        help="Ignore the existing cache and rescan all provider files"
+    )
+    parser.add_argument(
+        "--verify",
+        action="store_true",
+        help="Check every provider file for changes made in place (re-reads only changed files)"
+    )
+    parser.add_argument(
+        "--providers-path",
+        type=str,
+        default=str(ACCOUNT_PROVIDERS_PATH),
+        help=f"Provider directory to index (default: {ACCOUNT_PROVIDERS_PATH})"
+    )
+
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    index = load_provider_index(Path(args.providers_path), rebuild=args.rebuild, verify=args.verify)
+    elapsed = time.perf_counter() - start
+
+    print(f"Indexed {len(index.ids)} providers in {elapsed * 1000:.0f} ms")
+    print(f"  {len(index.by_bic)} with BIC codes")
+    print(f"  {len(index.by_name)} distinct normalized names")
+    print(f"  Cache: {index.cache_file}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,272 @@
+#!/usr/bin/env python3
+"""
+Fuzzy Provider Matching Index
+
+The scrapers' find_matching_provider() rules (strip or add a few suffixes,
+try a few variations) miss anything slightly different, e.g. "IDBI Bank Ltd"
+vs "idbibank-in", and every miss becomes a duplicate provider that
+scripts/detect-duplicate-providers.js has to merge later. ProviderMatcher is
+a precomputed index over every provider ID and name that answers "best
+existing provider for this name and country" with a score:
+
+- canonical key: the slug with trailing country codes and legal-form
+  suffixes (ltd, plc, gmbh, ...) stripped and hyphens removed; words such as
+  bank, trust or international are kept, since they tell banks apart
+- character trigram postings over the canonical keys for candidate generation;
+  very common trigrams are skipped so a lookup touches a bounded number of
+  postings
+- candidates are scored by the Dice coefficient of their key trigrams, with a
+  bonus when the provider covers the requested country (which never lifts an
+  inexact key to 1.0) and a penalty when it covers only other countries
+- best_match() only accepts a candidate with a clear lead over the runner-up;
+  a tie is no match, rather than the alphabetically first provider
+
+Usage:
+    from provider_index import load_provider_index
+
+    index = load_provider_index(ACCOUNT_PROVIDERS_PATH)
+    match = index.find_similar("IDBI Bank Ltd", "IN")   # ('idbibank-in', 1.0) or None
+
+    # Try it from the command line
+    python scrapers/provider_matcher.py "IDBI Bank Ltd" --country IN
+"""
+
+import argparse
+import sys
+import time
+from collections import Counter
+from typing import Iterable, Optional
+
+from slugs import slugify
+
+# Minimum score for find_similar() to report a match
+DEFAULT_MIN_SCORE = 0.9
+
+# Score adjustments for country overlap
+COUNTRY_BONUS = 0.05
+COUNTRY_PENALTY = 0.15
+
+# Highest score of a provider whose key differs from the name's
+MAX_INEXACT_SCORE = 0.99
+
+# Lead the best match needs over the runner-up to be accepted
+MIN_LEAD = 0.05
+
+# Canonical keys shorter than this are too ambiguous to match fuzzily
+MIN_KEY_LENGTH = 4
+
+# Trigrams shared by more keys than this are skipped during candidate generation
+MAX_POSTING_SIZE = 400
+
+# Candidates (by shared trigram count) that get a full score
+MAX_CANDIDATES = 25
+
+# ISO 3166-1 alpha-2 codes (plus "uk") that appear as ID suffixes
+COUNTRY_CODES = frozenset("""
+    ad ae af ag al am ao ar at au az ba bb bd be bf bg bh bi bj bn bo br bs bt
+    bw by bz ca cd cf cg ch ci cl cm cn co cr cu cv cy cz de dj dk dm do dz ec
+    ee eg er es et fi fj fr ga gb gd ge gh gm gn gq gr gt gw gy hk hn hr ht hu
+    id ie il in iq ir is it jm jo jp ke kg kh ki km kn kp kr kw kz la lb lc li
+    lk lr ls lt lu lv ly ma mc md me mg mk ml mm mn mo mr mt mu mv mw mx my mz
+    na ne ng ni nl no np nr nz om pa pe pg ph pk pl pt pw py qa ro rs ru rw sa
+    sb sc sd se sg si sk sl sm sn so sr ss st sv sy sz td tg th tj tl tm tn to
+    tr tt tv tw tz ua ug uk us uy uz va vc ve vn vu ws ye za zm zw
+""".split())
+
+# Legal-form suffixes that do not distinguish providers (words such as bank,
+# trust, private or international do, and are kept)
+LEGAL_SUFFIXES = frozenset("""
+    ltd limited inc incorporated corp corporation co company plc llc llp lp
+    gmbh ag sa sas sarl spa bv nv pty pvt
+""".split())
+
+# Suffixes also stripped when glued to the name ("bancogmbh"); short ones such
+# as "co" or "ag" would cut into ordinary words, so only these, longest first
+GLUED_SUFFIXES = ("incorporated", "corporation", "limited", "gmbh")
+
+
+def canonical_key(text: str) -> str:
+    """
+    Reduce a provider name or ID to the key used for fuzzy matching.
+
+    Example:
+        >>> canonical_key("IDBI Bank Ltd")
+        'idbibank'
+        >>> canonical_key("idbibank-in")
+        'idbibank'
+    """
+    tokens = [token for token in slugify(text).split('-') if token]
+    while len(tokens) > 1 and (tokens[-1] in COUNTRY_CODES or tokens[-1] in LEGAL_SUFFIXES):
+        tokens.pop()
+    key = ''.join(tokens)
+    if key.endswith(GLUED_SUFFIXES):
+        for suffix in GLUED_SUFFIXES:
+            if key.endswith(suffix) and len(key) >= len(suffix) + MIN_KEY_LENGTH:
+                return key[:-len(suffix)]
+    return key
+
+
+def trigrams(key: str) -> set[str]:
+    """Character trigrams of a key, padded so short keys still have some."""
+    padded = f"^{key}$"
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def dice(a: set[str], b: set[str]) -> float:
+    """Dice coefficient of two trigram sets."""
+    if not a or not b:
+        return 0.0
+    return 2 * len(a & b) / (len(a) + len(b))
+
+
+class ProviderMatcher:
+    """
+    Trigram index over provider canonical keys.
+
+    Each provider is indexed under the canonical keys of both its ID and its
+    name; a provider's countries are used to adjust scores.
+    """
+
+    def __init__(self, providers: Iterable[tuple[str, str, Iterable[str]]] = ()):
+        self._entry_ids: list[str] = []
+        self._entry_keys: list[str] = []
+        self._by_key: dict[str, list[int]] = {}
+        self._postings: dict[str, list[int]] = {}
+        self._countries: dict[str, frozenset[str]] = {}
+        for provider_id, name, countries in providers:
+            self.add(provider_id, name, countries)
+
+    def __len__(self) -> int:
+        return len(self._countries)
+
+    def _add_entry(self, provider_id: str, key: str) -> None:
+        """Index one canonical key for a provider."""
+        entries = self._by_key.setdefault(key, [])
+        if any(self._entry_ids[entry] == provider_id for entry in entries):
+            return
+        entry = len(self._entry_ids)
+        self._entry_ids.append(provider_id)
+        self._entry_keys.append(key)
+        entries.append(entry)
+        for gram in trigrams(key):
+            self._postings.setdefault(gram, []).append(entry)
+
+    def add(self, provider_id: str, name: str, countries: Iterable[str] = ()) -> None:
+        """
+        Index a provider (or extend an indexed one with another name).
+
+        Args:
+            provider_id: The provider ID
+            name: The provider name
+            countries: Country codes the provider covers
+        """
+        self._countries[provider_id] = self._countries.get(provider_id, frozenset()) | {
+            country.upper() for country in countries if country
+        }
+        for text in (provider_id, name):
+            key = canonical_key(text) if text else ''
+            if len(key) >= MIN_KEY_LENGTH:
+                self._add_entry(provider_id, key)
+
+    def _candidates(self, key: str, grams: set[str]) -> list[int]:
+        """Entries worth scoring: exact key matches plus the top trigram overlaps."""
+        counts = Counter()
+        for gram in grams:
+            posting = self._postings.get(gram)
+            if posting and len(posting) <= MAX_POSTING_SIZE:
+                counts.update(posting)
+        candidates = list(self._by_key.get(key, ()))
+        candidates.extend(entry for entry, _ in counts.most_common(MAX_CANDIDATES))
+        return candidates
+
+    def score(self, provider_id: str, similarity: float, country: Optional[str]) -> float:
+        """Adjust a key similarity for the provider's country coverage."""
+        countries = self._countries.get(provider_id)
+        # Placeholders such as GoCardless's "XX" say nothing about the country
+        if country and countries and country.lower() in COUNTRY_CODES:
+            if country.upper() in countries:
+                if similarity >= 1.0:
+                    return 1.0
+                return min(MAX_INEXACT_SCORE, similarity + COUNTRY_BONUS)
+            return similarity - COUNTRY_PENALTY
+        return similarity
+
+    def matches(self, name: str, country: Optional[str] = None,
+                limit: int = 5) -> list[tuple[str, float]]:
+        """
+        Rank existing providers by similarity to a name.
+
+        Args:
+            name: Institution name (or slug) to look up
+            country: Optional country code of the institution
+            limit: Maximum number of results
+
+        Returns:
+            List of (provider_id, score) tuples, best first
+        """
+        key = canonical_key(name)
+        if len(key) < MIN_KEY_LENGTH:
+            return []
+        grams = trigrams(key)
+
+        best: dict[str, float] = {}
+        for entry in self._candidates(key, grams):
+            provider_id = self._entry_ids[entry]
+            entry_key = self._entry_keys[entry]
+            similarity = 1.0 if entry_key == key else dice(grams, trigrams(entry_key))
+            score = self.score(provider_id, similarity, country)
+            if score > best.get(provider_id, -1.0):
+                best[provider_id] = score
+
+        ranked = sorted(best.items(), key=lambda item: (-item[1], item[0]))
+        return ranked[:limit]
+
+    def best_match(self, name: str, country: Optional[str] = None,
+                   min_score: float = DEFAULT_MIN_SCORE) -> Optional[tuple[str, float]]:
+        """
+        Return the best existing provider for a name, if it scores high enough.
+
+        The best provider must also lead the runner-up by MIN_LEAD: when two
+        providers match about equally well, the name is ambiguous and nothing
+        is returned.
+
+        Returns:
+            Tuple of (provider_id, score), or None
+        """
+        ranked = self.matches(name, country, limit=2)
+        if not ranked or ranked[0][1] < min_score:
+            return None
+        if len(ranked) > 1 and ranked[0][1] - ranked[1][1] < MIN_LEAD:
+            return None
+        return ranked[0]
+
+
+def main():
+    """Main entry point with argument parsing."""
+    from provider_index import ACCOUNT_PROVIDERS_PATH, load_provider_index
+
+    parser = argparse.ArgumentParser(description="Look up existing providers by fuzzy name match")
+    parser.add_argument("names", nargs="+", help="Institution names to look up")
+    parser.add_argument("--country", help="Country code of the institutions")
+    parser.add_argument("--limit", type=int, default=5, help="Results per name (default: 5)")
+    args = parser.parse_args()
+
+    index = load_provider_index(ACCOUNT_PROVIDERS_PATH)
+    start = time.perf_counter()
+    matcher = index.matcher
+    print(f"Built matching index over {len(matcher)} providers in "
+          f"{(time.perf_counter() - start) * 1000:.0f} ms")
+
+    for name in args.names:
+        start = time.perf_counter()
+        ranked = matcher.matches(name, args.country, limit=args.limit)
+        elapsed = (time.perf_counter() - start) * 1000
+        print(f"\n{name} (key: {canonical_key(name)!r}, {elapsed:.2f} ms)")
+        for provider_id, score in ranked:
+            marker = "*" if score >= DEFAULT_MIN_SCORE else " "
+            print(f"  {marker} {score:.3f}  {provider_id}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,273 @@
+#!/usr/bin/env python3
+"""
+Account Provider File Layout
+
+data/account-providers is a flat directory of 57k files, and every scandir,
+glob and file creation in it gets slower as OpenSanctions adds more. The
+directory can instead be sharded on the first two characters of the provider
+ID:
+
+    flat:     account-providers/abn-amro.json
+    sharded:  account-providers/ab/abn-amro.json
+
+Scrapers never build provider paths themselves; they go through a
+ProviderLayout (ProviderIndex.path_for() uses one), which:
+- detects the layout once per process: a directory containing shard
+  subdirectories is sharded
+- places new providers in their shard in a sharded directory
+- keeps reading the flat layout in a sharded directory (compatibility mode):
+  files still at the top level, e.g. after an interrupted migration or when a
+  contributor adds one by hand, are found, listed and updated in place
+- lists every provider file of either layout (iter_files()) and stamps the
+  directory for caches (the top-level inode and mtime, and every shard's)
+
+The Node.js validation scripts read the flat layout only, so migrate back
+with --migrate flat before running them on a sharded directory.
+
+Usage:
+    from provider_paths import get_layout
+
+    layout = get_layout(ACCOUNT_PROVIDERS_PATH)
+    path = layout.path_for("abn-amro")
+    for entry in layout.iter_files():
+        ...
+
+    # Show the layout, or migrate between layouts
+    python scrapers/provider_paths.py
+    python scrapers/provider_paths.py --migrate sharded
+    python scrapers/provider_paths.py --migrate flat
+"""
+
+import argparse
+import hashlib
+import os
+import sys
+import time
+from pathlib import Path
+from typing import Iterator, Optional
+
+# Paths relative to this script's location
+BASE_PATH = Path(__file__).parent.parent
+ACCOUNT_PROVIDERS_PATH = BASE_PATH / "data" / "account-providers"
+
+# Layouts
+FLAT = "flat"
+SHARDED = "sharded"
+
+# Characters of the provider ID that name its shard
+SHARD_LENGTH = 2
+
+# Layouts already detected in this process, keyed on the provider directory
+_LAYOUTS: dict[Path, "ProviderLayout"] = {}
+
+
+def shard_for(provider_id: str) -> str:
+    """Return the shard directory name of a provider ID."""
+    return provider_id[:SHARD_LENGTH]
+
+
+def is_shard_name(name: str) -> bool:
+    """Whether a subdirectory name is a shard (not a hidden or other directory)."""
+    return 0 < len(name) <= SHARD_LENGTH and not name.startswith(".")
+
+
+def _is_provider_file(entry: os.DirEntry) -> bool:
+    return entry.name.endswith(".json") and not entry.name.startswith(".") and entry.is_file()
+
+
+class ProviderLayout:
+    """
+    Path resolution for a provider directory in either layout.
+
+    Args:
+        providers_path: Directory containing provider JSON files
+        layout: FLAT or SHARDED (detected from the directory if None)
+    """
+
+    def __init__(self, providers_path: Path, layout: Optional[str] = None):
+        self.providers_path = providers_path
+        # IDs of files at the top level of a sharded directory
+        self._flat_ids: set[str] = set()
+        detected = self._scan_top_level()
+        self.layout = layout or detected
+
+    def _scan_top_level(self) -> str:
+        """Detect the layout and record files left at the top level."""
+        sharded = False
+        flat_ids = set()
+        try:
+            with os.scandir(self.providers_path) as entries:
+                for entry in entries:
+                    if entry.is_dir():
+                        sharded = sharded or is_shard_name(entry.name)
+                    elif _is_provider_file(entry):
+                        flat_ids.add(entry.name[:-5])
+        except FileNotFoundError:
+            pass
+        # A flat directory resolves every ID at the top level anyway
+        self._flat_ids = flat_ids if sharded else set()
+        return SHARDED if sharded else FLAT
+
+    @property
+    def sharded(self) -> bool:
+        return self.layout == SHARDED
+
+    def new_path(self, provider_id: str) -> Path:
+        """Return the path a new provider file is created at."""
+        if self.sharded:
+            return self.providers_path / shard_for(provider_id) / f"{provider_id}.json"
+        return self.providers_path / f"{provider_id}.json"
+
+    def path_for(self, provider_id: str) -> Path:
+        """
+        Return the JSON file path for a provider ID.
+
+        In a sharded directory, a file still at the top level is returned
+        instead of its shard path, so it is read and updated in place.
+        """
+        if provider_id in self._flat_ids:
+            return self.providers_path / f"{provider_id}.json"
+        return self.new_path(provider_id)
+
+    def prepare(self, path: Path) -> None:
+        """Create the shard directory of a path about to be written."""
+        if path.parent != self.providers_path:
+            path.parent.mkdir(exist_ok=True)
+
+    def iter_files(self) -> Iterator[os.DirEntry]:
+        """
+        Yield the directory entry of every provider file, in either layout.
+
+        The provider ID is the entry name without ".json".
+        """
+        with os.scandir(self.providers_path) as entries:
+            shards = []
+            for entry in entries:
+                if _is_provider_file(entry):
+                    yield entry
+                elif self.sharded and is_shard_name(entry.name) and entry.is_dir():
+                    shards.append(entry.path)
+        for shard in shards:
+            with os.scandir(shard) as entries:
+                for entry in entries:
+                    if _is_provider_file(entry):
+                        yield entry
+
+    def stamp(self) -> dict:
+        """
+        Return a cheap stamp that changes whenever a provider file is added,
+        removed or renamed (cache key for the provider index).
+
+        Only directories are stat'ed: the top level's inode and mtime, and in
+        a sharded directory a digest of every shard's name, inode, mtime and
+        size. Files edited in place change none of them; finding those takes
+        a stat of every file, which is left to an explicit check (see
+        load_provider_index(verify=True)).
+        """
+        stat = os.stat(self.providers_path)
+        stamp = {"inode": stat.st_ino, "mtime_ns": stat.st_mtime_ns}
+        if self.sharded:
+            shards = hashlib.blake2b(digest_size=16)
+            with os.scandir(self.providers_path) as entries:
+                for entry in sorted(entries, key=lambda entry: entry.name):
+                    if is_shard_name(entry.name) and entry.is_dir():
+                        shard = entry.stat()
+                        shards.update(f"{entry.name}:{shard.st_ino}:{shard.st_mtime_ns}:{shard.st_size}\n"
+                                      .encode("utf-8"))
+            stamp["shards"] = shards.hexdigest()
+        return stamp
+
+
+def get_layout(providers_path: Path = ACCOUNT_PROVIDERS_PATH) -> ProviderLayout:
+    """Return the (memoized) layout of a provider directory."""
+    key = providers_path.resolve()
+    layout = _LAYOUTS.get(key)
+    if layout is None:
+        layout = _LAYOUTS[key] = ProviderLayout(providers_path)
+    return layout
+
+
+def forget_layout(providers_path: Path = ACCOUNT_PROVIDERS_PATH) -> None:
+    """Drop the memoized layout of a directory (after migrating it)."""
+    _LAYOUTS.pop(providers_path.resolve(), None)
+
+
+def migrate(providers_path: Path, target: str) -> dict[str, int]:
+    """
+    Move every provider file of a directory into the target layout.
+
+    Files are renamed (never copied), so an interrupted migration leaves a
+    mixed directory that both layouts can still read; run it again to finish.
+
+    Args:
+        providers_path: Directory containing provider JSON files
+        target: FLAT or SHARDED
+
+    Returns:
+        Stats: moved, in_place (already in the target layout) and conflicts
+        (the target path exists with another file)
+    """
+    stats = {"moved": 0, "in_place": 0, "conflicts": 0}
+    layout = ProviderLayout(providers_path, SHARDED)
+    target_layout = ProviderLayout(providers_path, target)
+    # Collect first: renaming while scanning the same directory can skip entries
+    sources = [Path(entry.path) for entry in layout.iter_files()]
+    for source in sources:
+        provider_id = source.name[:-5]
+        destination = target_layout.new_path(provider_id)
+        if source == destination:
+            stats["in_place"] += 1
+            continue
+        if destination.exists():
+            print(f"  Conflict: {source.relative_to(providers_path)} "
+                  f"({destination.relative_to(providers_path)} exists)")
+            stats["conflicts"] += 1
+            continue
+        target_layout.prepare(destination)
+        os.rename(source, destination)
+        stats["moved"] += 1
+
+    if target == FLAT:
+        for entry in os.scandir(providers_path):
+            if is_shard_name(entry.name) and entry.is_dir():
+                try:
+                    os.rmdir(entry.path)
+                except OSError:
+                    # Not empty (conflicting files stay in their shard)
+                    pass
+    forget_layout(providers_path)
+    return stats
+
+
+def main():
+    """Main entry point with argument parsing."""
+    parser = argparse.ArgumentParser(description="Show or migrate the account provider directory layout")
+    parser.add_argument("--migrate", choices=[FLAT, SHARDED], help="Move every provider file into this layout")
+    parser.add_argument(
+        "--providers-path",
+        type=str,
+        default=str(ACCOUNT_PROVIDERS_PATH),
+        help=f"Provider directory (default: {ACCOUNT_PROVIDERS_PATH})"
+    )
+    args = parser.parse_args()
+
+    providers_path = Path(args.providers_path)
+    if args.migrate:
+        start = time.perf_counter()
+        stats = migrate(providers_path, args.migrate)
+        print(f"Migrated {providers_path} to the {args.migrate} layout in {time.perf_counter() - start:.1f}s: "
+              f"{stats['moved']} moved, {stats['in_place']} already in place, {stats['conflicts']} conflicts")
+        return 1 if stats["conflicts"] else 0
+
+    layout = get_layout(providers_path)
+    files = list(layout.iter_files())
+    top_level = sum(1 for entry in files if Path(entry.path).parent == providers_path)
+    print(f"{providers_path}: {layout.layout} layout, {len(files)} provider files")
+    if layout.sharded:
+        shards = {Path(entry.path).parent.name for entry in files} - {providers_path.name}
+        print(f"  {len(shards)} shards, {top_level} files still at the top level")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,399 @@
+#!/usr/bin/env python3
+"""
+Provider Reconciliation for Scraper Runs
+
+update_bank_providers in the scrapers used to slugify, match, create and
+report one institution at a time. A ReconcilePlan splits a run into three
+phases:
+
+1. plan - every institution is matched in memory (no provider files are read)
+   and recorded as create, update or skip; an institution that maps to the ID
+   of a provider created earlier in the same plan is recorded as a conflict
+   and merged into that provider; an institution found only by fuzzy name
+   matching is recorded as a fuzzy candidate, which is reported but not
+   written unless the plan was made with apply_fuzzy (the scrapers'
+   --apply-fuzzy)
+2. execute - the planned changes are queued on a WriteBackSession, which reads
+   and writes each affected file once on a bounded thread pool
+3. report - the changes actually made are credited to the institutions that
+   asked for them, in input order, and aggregated into stats
+
+Institutions matched in an earlier run are not matched again: the scrapers'
+ID mapping files (provider ID -> institution ID) are reversed into
+institution ID -> provider ID, and an institution found there is planned as
+an update of its provider directly (known()), skipping slugify and matching.
+Whether the provider already lists the aggregator is then checked by the
+session, which reads each file once. Only institutions with a new ID (or
+whose provider no longer exists) reach the matcher.
+
+A plan can be printed instead of executed, which is what the scrapers'
+--dry-run does. run_all.py queues the plans of several scrapers on one
+session instead (queue()), flushes it once, and reports each plan from the
+shared flush result (report()).
+
+Usage:
+    from provider_reconcile import ReconcilePlan
+
+    plan = ReconcilePlan(index, "plaid", reverse_id_mappings(load_plaid_institution_ids()))
+    for institution in institutions:
+        if plan.known(institution["name"], institution["institution_id"]):
+            continue
+        bank_id = slugify(institution["name"])
+        matching_id, score = plan.match(institution["name"], bank_id, "US", find_matching_provider)
+        if matching_id:
+            plan.update(institution["name"], bank_id, matching_id, score=score)
+        else:
+            plan.create(institution["name"], create_account_provider(institution))
+
+    if dry_run:
+        plan.print_plan()
+        plan.discard()
+    else:
+        stats = plan.execute()   # {"created": 12, "updated": 40, ...}
+"""
+
+from typing import Callable, Optional
+
+from provider_index import ProviderIndex, unload_provider_index
+from provider_writeback import WriteBackSession
+
+# Plan actions
+CREATE = "create"
+UPDATE = "update"
+SKIP = "skip"
+CONFLICT = "conflict"
+FUZZY = "fuzzy"
+
+ACTIONS = (CREATE, UPDATE, CONFLICT, FUZZY, SKIP)
+
+
+def reverse_id_mappings(id_mappings: dict[str, str]) -> dict[str, str]:
+    """
+    Reverse a scraper's ID mapping file into institution ID -> provider ID.
+
+    Args:
+        id_mappings: Provider ID -> institution (or connection) ID, as saved
+            by the Plaid, Yapily and YAXI scrapers
+
+    Returns:
+        Institution ID -> provider ID
+    """
+    return {str(institution_id): provider_id for provider_id, institution_id in id_mappings.items()
+            if institution_id}
+
+
+class PlanEntry:
+    """
+    The planned action for one institution.
+
+    Args:
+        action: CREATE, UPDATE, CONFLICT, FUZZY or SKIP
+        name: Institution name
+        bank_id: Provider ID derived from the name (None for skips)
+        provider_id: Target provider ID (None for skips)
+        provider: Data of the provider to create (CREATE only)
+        bic: BIC to set on the provider if it has none
+        score: Fuzzy match score, if the provider was found by fuzzy matching
+        reason: Why the institution is skipped or conflicts
+        source: The scraped institution (callers leave the institutions of
+            unapplied entries out of their snapshot, see unapplied())
+    """
+
+    __slots__ = ("action", "name", "bank_id", "provider_id", "provider", "bic", "score", "reason", "source")
+
+    def __init__(self, action: str, name: str, bank_id: Optional[str] = None,
+                 provider_id: Optional[str] = None, provider: Optional[dict] = None,
+                 bic: Optional[str] = None, score: Optional[float] = None, reason: Optional[str] = None,
+                 source: Optional[dict] = None):
+        self.action = action
+        self.name = name
+        self.bank_id = bank_id
+        self.provider_id = provider_id
+        self.provider = provider
+        self.bic = bic
+        self.score = score
+        self.reason = reason
+        self.source = source
+
+    def describe(self) -> str:
+        """One-line description of the entry for plans and reports."""
+        if self.action == SKIP:
+            return f"{self.name} ({self.reason})"
+        if self.action == CREATE:
+            bic_info = f", bic={self.bic}" if self.bic else ""
+            return f"{self.name} ({self.provider_id}.json{bic_info})"
+        target = f"{self.name} -> {self.provider_id}.json" if self.provider_id != self.bank_id else self.name
+        details = []
+        if self.score is not None:
+            details.append(f"fuzzy, score {self.score:.2f}")
+        if self.bic:
+            details.append(f"bic={self.bic}")
+        if self.reason:
+            details.append(self.reason)
+        return f"{target} ({', '.join(details)})" if details else target
+
+
+class ReconcilePlan:
+    """
+    Planned provider changes of one aggregator's scraper run.
+
+    Args:
+        index: The shared provider index (providers planned for creation are
+            added to it immediately, so later institutions match them)
+        aggregator: Aggregator ID added to matched providers (e.g. "plaid")
+        known_ids: Institution ID -> provider ID of institutions matched in
+            earlier runs (see reverse_id_mappings())
+        apply_fuzzy: Write fuzzy matches like exact ones, instead of only
+            reporting them as FUZZY candidates
+        max_workers: Thread pool size for the file I/O (None for the executor default)
+    """
+
+    def __init__(self, index: ProviderIndex, aggregator: str, known_ids: Optional[dict[str, str]] = None,
+                 apply_fuzzy: bool = False, max_workers: Optional[int] = None):
+        self.index = index
+        self.aggregator = aggregator
+        self.known_ids = known_ids or {}
+        self.apply_fuzzy = apply_fuzzy
+        self.max_workers = max_workers
+        self.entries: list[PlanEntry] = []
+        # Institutions planned through known()
+        self.known_count = 0
+        # Entries whose provider file could not be updated, set by report()
+        self.failed: list[PlanEntry] = []
+        self._created: dict[str, PlanEntry] = {}
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def known(self, name: str, institution_id, source: Optional[dict] = None) -> Optional[PlanEntry]:
+        """
+        Plan an institution matched in an earlier run, without matching it again.
+
+        Args:
+            name: Institution name
+            institution_id: The aggregator's institution (or connection) ID
+            source: The scraped institution
+
+        Returns:
+            The planned update, or None if the ID is not known or its provider
+            no longer exists (match the institution as usual then)
+        """
+        provider_id = self.known_ids.get(str(institution_id)) if institution_id else None
+        if provider_id is None or provider_id not in self.index:
+            return None
+        self.known_count += 1
+        return self.update(name, provider_id, provider_id, source=source)
+
+    def match(self, name: str, bank_id: str, country: Optional[str],
+              find_exact: Optional[Callable[[str, set[str]], Optional[str]]] = None
+              ) -> tuple[Optional[str], Optional[float]]:
+        """
+        Find the provider an institution belongs to.
+
+        Args:
+            name: Institution name
+            bank_id: Provider ID derived from the name
+            country: Institution country, for fuzzy matching
+            find_exact: The scraper's ID rules, called as find_exact(bank_id,
+                existing_ids) (default: the ID itself)
+
+        Returns:
+            Tuple of (provider ID or None, fuzzy match score or None for an
+            exact match)
+        """
+        existing_ids = self.index.ids
+        if find_exact is not None:
+            matching_id = find_exact(bank_id, existing_ids)
+        else:
+            matching_id = bank_id if bank_id in existing_ids else None
+        if matching_id:
+            return matching_id, None
+        similar = self.index.find_similar(name, country)
+        if similar:
+            print(f"  Fuzzy match: {name} -> {similar[0]}.json (score {similar[1]:.2f})")
+            return similar[0], similar[1]
+        return None, None
+
+    def create(self, name: str, provider: dict, bic: Optional[str] = None,
+               source: Optional[dict] = None) -> PlanEntry:
+        """Plan a new provider (an update instead, if a provider with its ID exists)."""
+        provider_id = provider["id"]
+        if provider_id in self.index:
+            return self.update(name, provider_id, provider_id, bic=bic, source=source)
+        entry = PlanEntry(CREATE, name, provider_id, provider_id, provider=provider, bic=bic, source=source)
+        self.entries.append(entry)
+        self._created[provider_id] = entry
+        self.index.add(provider)
+        return entry
+
+    def update(self, name: str, bank_id: str, provider_id: str, bic: Optional[str] = None,
+               score: Optional[float] = None, source: Optional[dict] = None) -> PlanEntry:
+        """
+        Plan adding the aggregator (and a missing BIC) to an existing provider.
+
+        A provider found by fuzzy matching (score given) is planned as a FUZZY
+        candidate that is not written, unless the plan applies fuzzy matches.
+
+        Args:
+            source: The scraped institution
+        """
+        if score is not None and not self.apply_fuzzy:
+            entry = PlanEntry(FUZZY, name, bank_id, provider_id, bic=bic or None, score=score, source=source)
+            self.entries.append(entry)
+            return entry
+        entry = PlanEntry(UPDATE, name, bank_id, provider_id, bic=bic or None, score=score, source=source)
+        first = self._created.get(provider_id)
+        if first is not None:
+            entry.action = CONFLICT
+            relation = "same ID as" if score is None else "matches"
+            entry.reason = f"{relation} new provider {first.name!r}"
+        self.entries.append(entry)
+        return entry
+
+    def skip(self, name: str, reason: str, source: Optional[dict] = None) -> PlanEntry:
+        """Record an institution that is left out (test institution, no usable name, ...)."""
+        entry = PlanEntry(SKIP, name, reason=reason, source=source)
+        self.entries.append(entry)
+        return entry
+
+    def fuzzy_candidates(self) -> list[PlanEntry]:
+        """The FUZZY entries: fuzzy matches that are reported but not written."""
+        return [entry for entry in self.entries if entry.action == FUZZY]
+
+    def unapplied(self) -> list[dict]:
+        """
+        The scraped institutions whose changes were not written.
+
+        These are the FUZZY candidates and, once the plan was reported, the
+        entries whose provider file could not be updated. Scrapers forget
+        them in their snapshot, so the next run reconciles them again.
+        """
+        return [entry.source for entry in self.fuzzy_candidates() + self.failed if entry.source is not None]
+
+    def counts(self) -> dict[str, int]:
+        """Number of planned entries per action."""
+        counts = dict.fromkeys(ACTIONS, 0)
+        for entry in self.entries:
+            counts[entry.action] += 1
+        return counts
+
+    def print_plan(self) -> None:
+        """
+        Print every planned entry and a summary, without changing any file.
+
+        Call discard() afterwards unless the plan is executed.
+        """
+        print(f"\n[DRY RUN] Plan for {len(self.entries)} institutions ({self.aggregator}):")
+        for entry in self.entries:
+            print(f"  {entry.action:<9}{entry.describe()}")
+        counts = self.counts()
+        if self.known_count:
+            print(f"\n[DRY RUN] {self.known_count} institutions were found by ID without matching")
+        print(f"\n[DRY RUN] Would create {counts[CREATE]} providers, update {counts[UPDATE]}, "
+              f"merge {counts[CONFLICT]} conflicting institutions, skip {counts[SKIP]}")
+        if counts[FUZZY]:
+            print(f"[DRY RUN] {counts[FUZZY]} fuzzy matches would only be reported "
+                  f"(use --apply-fuzzy to write them)")
+        print(f"[DRY RUN] (provider files are not read: updates of providers that already list "
+              f"{self.aggregator} will not change them)")
+
+    def discard(self) -> None:
+        """
+        Drop a plan that will not be executed.
+
+        The memoized provider index (which includes the planned providers) is
+        unloaded, so the next load_provider_index() reads the directory again.
+        """
+        self.entries.clear()
+        self._created.clear()
+        unload_provider_index(self.index.providers_path)
+
+    def queue(self, session: WriteBackSession) -> None:
+        """Queue the planned changes on a write-back session (shared by several plans in run_all.py)."""
+        for entry in self.entries:
+            if entry.action == CREATE:
+                session.create(entry.provider)
+            elif entry.action in (UPDATE, CONFLICT):
+                session.add_aggregator(entry.provider_id, self.aggregator)
+                if entry.bic:
+                    session.set_bic(entry.provider_id, entry.bic)
+
+    def report(self, changes: dict[str, list[str]],
+               schema_errors: Optional[dict[str, list[str]]] = None,
+               errors: Optional[dict[str, str]] = None) -> dict[str, int]:
+        """
+        Report the changes a flush of the queued plan made.
+
+        Args:
+            changes: The session's flush() result
+            schema_errors: The session's schema_errors after the flush
+            errors: The session's errors after the flush
+
+        Returns:
+            Stats: created, updated (aggregator added), bics (BIC set),
+            unchanged (nothing to change), conflicts, fuzzy (fuzzy matches
+            reported, not written), skipped, failed (file could not be
+            updated) and invalid (written with new schema.json violations)
+        """
+        errors = errors or {}
+        self.failed = []
+        # Each change is credited to the first institution that asked for it
+        stats = {"created": 0, "updated": 0, "bics": 0, "unchanged": 0,
+                 "conflicts": 0, "fuzzy": 0, "skipped": 0, "failed": 0}
+        reported = set()
+        for entry in self.entries:
+            if entry.action == SKIP:
+                stats["skipped"] += 1
+                continue
+            if entry.action == FUZZY:
+                stats["fuzzy"] += 1
+                print(f"  Fuzzy match (not applied): {entry.describe()}")
+                continue
+            if entry.provider_id in errors:
+                stats["failed"] += 1
+                self.failed.append(entry)
+                print(f"  Failed: {entry.describe()} ({errors[entry.provider_id]})")
+                continue
+            if entry.action == CREATE:
+                stats["created"] += 1
+                print(f"  Created: {entry.describe()}")
+                continue
+
+            applied = changes.get(entry.provider_id, [])
+            updates = []
+            if self.aggregator in applied and (entry.provider_id, "aggregator") not in reported:
+                reported.add((entry.provider_id, "aggregator"))
+                updates.append(self.aggregator)
+                stats["updated"] += 1
+            if entry.bic and f"bic={entry.bic}" in applied and (entry.provider_id, "bic") not in reported:
+                reported.add((entry.provider_id, "bic"))
+                updates.append(f"bic={entry.bic}")
+                stats["bics"] += 1
+            if entry.action == CONFLICT:
+                stats["conflicts"] += 1
+                added = f" (added {', '.join(updates)})" if updates else ""
+                print(f"  Conflict: {entry.describe()}{added}")
+            elif updates:
+                if entry.provider_id != entry.bank_id:
+                    print(f"  Updated: {entry.name} -> {entry.provider_id}.json (added {', '.join(updates)})")
+                else:
+                    print(f"  Updated: {entry.name} (added {', '.join(updates)})")
+            elif entry.action == UPDATE:
+                stats["unchanged"] += 1
+        planned_ids = {entry.provider_id for entry in self.entries if entry.action not in (SKIP, FUZZY)}
+        stats["invalid"] = len(planned_ids & (schema_errors or {}).keys())
+        return stats
+
+    def execute(self) -> dict[str, int]:
+        """
+        Apply the plan and report the changes made.
+
+        Returns:
+            Stats, see report()
+        """
+        session = WriteBackSession(self.index, max_workers=self.max_workers)
+        self.queue(session)
+        changes = session.flush()
+        stats = self.report(changes, session.schema_errors, session.errors)
+        session.print_schema_summary()
+        return stats
@@ -0,0 +1,572 @@
+#!/usr/bin/env python3
+"""
+Provider Schema Validation
+
+Validates provider data against schema.json in Python, so scrapers catch an
+invalid provider before writing it instead of in CI (where the Node.js
+scripts validate with ajv). The schema is compiled once into a tree of
+closures, one per schema node, with the keyword checks resolved up front:
+type checks become isinstance() calls, string enums become sets, patterns
+are compiled regexes. Validating a provider then does no schema lookups.
+
+The compiled validator follows ajv 6 (draft-06, allErrors, default "fast"
+formats), including its error paths and messages, e.g.
+    .apiReferenceUrl: should match pattern "^(https?|http?)://"
+Unknown keywords (annotations, and misspelled ones such as "anyof") are
+ignored like ajv does; validation keywords the compiler does not implement
+raise an error when the schema is compiled, so the two never silently
+disagree.
+
+The corpus mode validates every provider file on a process pool (each worker
+compiles the schema once) and reports validations per second.
+
+Usage:
+    from provider_schema import load_validator
+
+    validator = load_validator()
+    errors = validator.errors(provider)
+    if errors:
+        print("; ".join(str(error) for error in errors))
+
+    # Validate every provider file
+    python scrapers/provider_schema.py [PATH ...] [--workers N]
+"""
+
+import argparse
+import json
+import math
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Callable, Optional
+
+from provider_paths import ACCOUNT_PROVIDERS_PATH, get_layout
+
+# Paths relative to this script's location
+BASE_PATH = Path(__file__).parent.parent
+SCHEMA_PATH = BASE_PATH / "schema.json"
+
+# ajv's "fast" uri format
+URI_FORMAT = re.compile(r"^(?:[a-z][a-z0-9+\-.]*:)(?:\/?\/)?[^\s]*$", re.IGNORECASE)
+FORMATS = {"uri": URI_FORMAT}
+
+# Draft-06 validation keywords the compiler does not implement
+UNSUPPORTED_KEYWORDS = frozenset({
+    "$ref", "multipleOf", "additionalItems", "contains", "maxProperties", "minProperties",
+    "patternProperties", "dependencies", "propertyNames",
+})
+
+# Property names written as .name in error paths (others as ['name'])
+IDENTIFIER = re.compile(r"^[A-Za-z_$][A-Za-z0-9_$]*$")
+
+# Files per task in the corpus mode
+CHUNK_SIZE = 500
+
+# Compiled schemas already loaded in this process, keyed on the schema file
+_VALIDATORS: dict[Path, "SchemaValidator"] = {}
+
+# A compiled schema node: check(value, path, errors) appends errors, returns validity
+Check = Callable[[object, str, list], bool]
+
+
+class ValidationError:
+    """
+    One schema violation.
+
+    Args:
+        path: Location in the data, in ajv's notation (e.g. ".mobileApps[0].storeUrl")
+        keyword: The schema keyword that failed
+        message: ajv-style message
+    """
+
+    __slots__ = ("path", "keyword", "message")
+
+    def __init__(self, path: str, keyword: str, message: str):
+        self.path = path
+        self.keyword = keyword
+        self.message = message
+
+    def __str__(self) -> str:
+        return f"{self.path or '.'}: {self.message}"
+
+    def __repr__(self) -> str:
+        return f"ValidationError({self.path!r}, {self.keyword!r}, {self.message!r})"
+
+
+def _property_path(path: str, key: str) -> str:
+    if IDENTIFIER.match(key):
+        return f"{path}.{key}"
+    return f"{path}['{key}']"
+
+
+def _json_key(value):
+    """Hashable key under which JSON-equal values are equal (1 == 1.0, but true != 1)."""
+    if isinstance(value, bool) or value is None or isinstance(value, str):
+        return (type(value).__name__, value)
+    if isinstance(value, (int, float)):
+        return ("number", value)
+    if isinstance(value, list):
+        return ("array", tuple(_json_key(item) for item in value))
+    if isinstance(value, dict):
+        return ("object", frozenset((key, _json_key(item)) for key, item in value.items()))
+    return ("other", repr(value))
+
+
+def _is_number(value) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def _type_check(types: list[str]) -> Callable[[object], bool]:
+    """Return a predicate for a type keyword."""
+    python_types = []
+    numbers = integers = False
+    for name in types:
+        if name == "string":
+            python_types.append(str)
+        elif name == "null":
+            python_types.append(type(None))
+        elif name == "boolean":
+            python_types.append(bool)
+        elif name == "object":
+            python_types.append(dict)
+        elif name == "array":
+            python_types.append(list)
+        elif name == "number":
+            numbers = True
+        elif name == "integer":
+            integers = True
+        else:
+            raise ValueError(f"Unknown type in schema: {name}")
+    python_types = tuple(python_types)
+    if not numbers and not integers:
+        return lambda value: isinstance(value, python_types)
+
+    def check(value) -> bool:
+        if isinstance(value, python_types):
+            return True
+        if not _is_number(value):
+            return False
+        return numbers or isinstance(value, int) or (math.isfinite(value) and value == int(value))
+
+    return check
+
+
+def compile_schema(schema: dict, schema_path: str = "#") -> Check:
+    """
+    Compile a schema node (and its subschemas) into a check function.
+
+    Args:
+        schema: Draft-06 schema
+        schema_path: Location of the node in the schema, for compile errors
+
+    Raises:
+        ValueError: If the schema uses a keyword the compiler does not implement
+    """
+    if schema is True or schema == {}:
+        return lambda value, path, errors: True
+    if schema is False:
+        def never(value, path: str, errors: list) -> bool:
+            errors.append(ValidationError(path, "false schema", "boolean schema is false"))
+            return False
+        return never
+    if not isinstance(schema, dict):
+        raise ValueError(f"Invalid schema at {schema_path}")
+
+    unsupported = UNSUPPORTED_KEYWORDS & schema.keys()
+    if unsupported or isinstance(schema.get("items"), list):
+        keyword = sorted(unsupported)[0] if unsupported else "items (array form)"
+        raise ValueError(f"Unsupported schema keyword at {schema_path}: {keyword}")
+
+    checks: list[Check] = []
+
+    if "type" in schema:
+        types = schema["type"] if isinstance(schema["type"], list) else [schema["type"]]
+        type_ok = _type_check(types)
+        type_message = f"should be {','.join(types)}"
+
+        def check_type(value, path: str, errors: list) -> bool:
+            if type_ok(value):
+                return True
+            errors.append(ValidationError(path, "type", type_message))
+            return False
+        checks.append(check_type)
+
+    if "enum" in schema:
+        allowed = schema["enum"]
+        if all(isinstance(item, str) for item in allowed):
+            strings = frozenset(allowed)
+
+            def in_enum(value) -> bool:
+                return isinstance(value, str) and value in strings
+        else:
+            keys = frozenset(_json_key(item) for item in allowed)
+
+            def in_enum(value) -> bool:
+                return _json_key(value) in keys
+
+        def check_enum(value, path: str, errors: list) -> bool:
+            if in_enum(value):
+                return True
+            errors.append(ValidationError(path, "enum", "should be equal to one of the allowed values"))
+            return False
+        checks.append(check_enum)
+
+    if "const" in schema:
+        const_key = _json_key(schema["const"])
+
+        def check_const(value, path: str, errors: list) -> bool:
+            if _json_key(value) == const_key:
+                return True
+            errors.append(ValidationError(path, "const", "should be equal to constant"))
+            return False
+        checks.append(check_const)
+
+    checks.extend(_string_checks(schema))
+    checks.extend(_number_checks(schema))
+    checks.extend(_array_checks(schema, schema_path))
+    checks.extend(_object_checks(schema, schema_path))
+    checks.extend(_combinator_checks(schema, schema_path))
+
+    if len(checks) == 1:
+        return checks[0]
+
+    def check_all(value, path: str, errors: list) -> bool:
+        valid = True
+        for check in checks:
+            if not check(value, path, errors):
+                valid = False
+        return valid
+    return check_all
+
+
+def _string_checks(schema: dict) -> list[Check]:
+    checks = []
+    if "pattern" in schema:
+        # ECMAScript regexes: unanchored, \d and \w are ASCII-only
+        pattern = re.compile(schema["pattern"], re.ASCII)
+        pattern_message = f'should match pattern "{schema["pattern"]}"'
+
+        def check_pattern(value, path: str, errors: list) -> bool:
+            if not isinstance(value, str) or pattern.search(value):
+                return True
+            errors.append(ValidationError(path, "pattern", pattern_message))
+            return False
+        checks.append(check_pattern)
+
+    if "format" in schema:
+        name = schema["format"]
+        if name not in FORMATS:
+            raise ValueError(f"Unknown format in schema: {name}")
+        format_pattern = FORMATS[name]
+        format_message = f'should match format "{name}"'
+
+        def check_format(value, path: str, errors: list) -> bool:
+            if not isinstance(value, str) or format_pattern.match(value):
+                return True
+            errors.append(ValidationError(path, "format", format_message))
+            return False
+        checks.append(check_format)
+
+    for keyword, fails, message in (
+        ("minLength", lambda length, limit: length < limit, "should NOT be shorter than {} characters"),
+        ("maxLength", lambda length, limit: length > limit, "should NOT be longer than {} characters"),
+    ):
+        if keyword in schema:
+            checks.append(_length_check(keyword, str, schema[keyword], fails, message.format(schema[keyword])))
+    return checks
+
+
+def _length_check(keyword: str, kind: type, limit: int, fails, message: str) -> Check:
+    def check_length(value, path: str, errors: list) -> bool:
+        if not isinstance(value, kind) or not fails(len(value), limit):
+            return True
+        errors.append(ValidationError(path, keyword, message))
+        return False
+    return check_length
+
+
+def _number_checks(schema: dict) -> list[Check]:
+    checks = []
+    bounds = (
+        ("minimum", lambda value, limit: value < limit, ">="),
+        ("maximum", lambda value, limit: value > limit, "<="),
+        ("exclusiveMinimum", lambda value, limit: value <= limit, ">"),
+        ("exclusiveMaximum", lambda value, limit: value >= limit, "<"),
+    )
+    for keyword, fails, comparison in bounds:
+        if keyword not in schema:
+            continue
+        limit = schema[keyword]
+        message = f"should be {comparison} {limit}"
+
+        def check_bound(value, path: str, errors: list, keyword=keyword, limit=limit, fails=fails,
+                        message=message) -> bool:
+            if not _is_number(value) or not fails(value, limit):
+                return True
+            errors.append(ValidationError(path, keyword, message))
+            return False
+        checks.append(check_bound)
+    return checks
+
+
+def _array_checks(schema: dict, schema_path: str) -> list[Check]:
+    checks = []
+    if "items" in schema:
+        check_item = compile_schema(schema["items"], f"{schema_path}/items")
+
+        def check_items(value, path: str, errors: list) -> bool:
+            if not isinstance(value, list):
+                return True
+            valid = True
+            for i, item in enumerate(value):
+                if not check_item(item, f"{path}[{i}]", errors):
+                    valid = False
+            return valid
+        checks.append(check_items)
+
+    if schema.get("uniqueItems") is True:
+        def check_unique(value, path: str, errors: list) -> bool:
+            if not isinstance(value, list) or len(value) < 2:
+                return True
+            seen = {}
+            for i, item in enumerate(value):
+                key = _json_key(item)
+                if key in seen:
+                    errors.append(ValidationError(
+                        path, "uniqueItems",
+                        f"should NOT have duplicate items (items ## {i} and {seen[key]} are identical)"
+                    ))
+                    return False
+                seen[key] = i
+            return True
+        checks.append(check_unique)
+
+    if "minItems" in schema:
+        limit = schema["minItems"]
+        checks.append(_length_check("minItems", list, limit, lambda length, limit: length < limit,
+                                    f"should NOT have fewer than {limit} items"))
+    if "maxItems" in schema:
+        limit = schema["maxItems"]
+        checks.append(_length_check("maxItems", list, limit, lambda length, limit: length > limit,
+                                    f"should NOT have more than {limit} items"))
+    return checks
+
+
+def _object_checks(schema: dict, schema_path: str) -> list[Check]:
+    checks = []
+    if "required" in schema:
+        required = list(schema["required"])
+
+        def check_required(value, path: str, errors: list) -> bool:
+            if not isinstance(value, dict):
+                return True
+            valid = True
+            for key in required:
+                if key not in value:
+                    errors.append(ValidationError(path, "required", f"should have required property '{key}'"))
+                    valid = False
+            return valid
+        checks.append(check_required)
+
+    properties = {
+        key: compile_schema(subschema, f"{schema_path}/properties/{key}")
+        for key, subschema in schema.get("properties", {}).items()
+    }
+    additional = schema.get("additionalProperties", True)
+    check_additional = None if additional is True else compile_schema(
+        additional, f"{schema_path}/additionalProperties")
+
+    if properties or check_additional is not None:
+        def check_properties(value, path: str, errors: list) -> bool:
+            if not isinstance(value, dict):
+                return True
+            valid = True
+            for key, item in value.items():
+                check = properties.get(key)
+                if check is None:
+                    if check_additional is None:
+                        continue
+                    if additional is False:
+                        errors.append(ValidationError(path, "additionalProperties",
+                                                      "should NOT have additional properties"))
+                        valid = False
+                        continue
+                    check = check_additional
+                if not check(item, _property_path(path, key), errors):
+                    valid = False
+            return valid
+        checks.append(check_properties)
+    return checks
+
+
+def _combinator_checks(schema: dict, schema_path: str) -> list[Check]:
+    checks = []
+    if "allOf" in schema:
+        checks.extend(compile_schema(subschema, f"{schema_path}/allOf/{i}")
+                      for i, subschema in enumerate(schema["allOf"]))
+
+    if "anyOf" in schema:
+        branches = [compile_schema(subschema, f"{schema_path}/anyOf/{i}")
+                    for i, subschema in enumerate(schema["anyOf"])]
+
+        def check_any(value, path: str, errors: list) -> bool:
+            branch_errors = []
+            for branch in branches:
+                if branch(value, path, branch_errors):
+                    return True
+            errors.extend(branch_errors)
+            errors.append(ValidationError(path, "anyOf", "should match some schema in anyOf"))
+            return False
+        checks.append(check_any)
+
+    if "oneOf" in schema:
+        one_of = [compile_schema(subschema, f"{schema_path}/oneOf/{i}")
+                  for i, subschema in enumerate(schema["oneOf"])]
+
+        def check_one(value, path: str, errors: list) -> bool:
+            branch_errors = []
+            matches = sum(1 for branch in one_of if branch(value, path, branch_errors))
+            if matches == 1:
+                return True
+            if not matches:
+                errors.extend(branch_errors)
+            errors.append(ValidationError(path, "oneOf", "should match exactly one schema in oneOf"))
+            return False
+        checks.append(check_one)
+
+    if "not" in schema:
+        negated = compile_schema(schema["not"], f"{schema_path}/not")
+
+        def check_not(value, path: str, errors: list) -> bool:
+            if not negated(value, path, []):
+                return True
+            errors.append(ValidationError(path, "not", "should NOT be valid"))
+            return False
+        checks.append(check_not)
+    return checks
+
+
+class SchemaValidator:
+    """
+    A schema compiled for repeated validation.
+
+    Args:
+        schema: Draft-06 schema (e.g. the parsed schema.json)
+    """
+
+    def __init__(self, schema: dict):
+        self.schema = schema
+        self._check = compile_schema(schema)
+
+    def errors(self, data) -> list[ValidationError]:
+        """Return every violation in data (empty if it is valid)."""
+        errors: list[ValidationError] = []
+        self._check(data, "", errors)
+        return errors
+
+    def is_valid(self, data) -> bool:
+        """Whether data is valid."""
+        return self._check(data, "", [])
+
+
+def load_validator(schema_path: Path = SCHEMA_PATH) -> SchemaValidator:
+    """Return the (memoized) compiled validator of a schema file."""
+    key = schema_path.resolve()
+    validator = _VALIDATORS.get(key)
+    if validator is None:
+        with open(schema_path, "r", encoding="utf-8") as f:
+            validator = _VALIDATORS[key] = SchemaValidator(json.load(f))
+    return validator
+
+
+def validate_files(paths: list[str], schema_path: Path = SCHEMA_PATH) -> list[tuple[str, list[str]]]:
+    """
+    Validate provider files.
+
+    Returns:
+        (path, error messages) of every invalid or unreadable file
+    """
+    validator = load_validator(schema_path)
+    invalid = []
+    for path in paths:
+        try:
+            with open(path, "rb") as f:
+                data = json.loads(f.read())
+        except (OSError, ValueError) as e:
+            invalid.append((path, [f"cannot be read: {e}"]))
+            continue
+        errors = validator.errors(data)
+        if errors:
+            invalid.append((path, [str(error) for error in errors]))
+    return invalid
+
+
+def validate_corpus(paths: list[str], schema_path: Path = SCHEMA_PATH,
+                    workers: Optional[int] = None) -> list[tuple[str, list[str]]]:
+    """
+    Validate many provider files on a process pool.
+
+    Args:
+        paths: Provider files
+        schema_path: Schema file (compiled once per worker)
+        workers: Process count (default: CPU count; 1 validates in this process)
+
+    Returns:
+        (path, error messages) of every invalid or unreadable file, in input order
+    """
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(paths) <= CHUNK_SIZE:
+        return validate_files(paths, schema_path)
+    chunks = [paths[i:i + CHUNK_SIZE] for i in range(0, len(paths), CHUNK_SIZE)]
+    invalid = []
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for result in executor.map(validate_files, chunks, [schema_path] * len(chunks)):
+            invalid.extend(result)
+    return invalid
+
+
+def main():
+    """Main entry point with argument parsing."""
+    parser = argparse.ArgumentParser(description="Validate provider files against schema.json")
+    parser.add_argument("paths", nargs="*", type=Path, default=[ACCOUNT_PROVIDERS_PATH],
+                        help="Files or provider directories (default: data/account-providers)")
+    parser.add_argument("--schema", type=Path, default=SCHEMA_PATH, help="Schema file (default: schema.json)")
+    parser.add_argument("--workers", type=int, help="Worker processes (default: CPU count)")
+    parser.add_argument("--max-errors", type=int, default=20,
+                        help="Invalid files to print in full (default: 20)")
+    args = parser.parse_args()
+
+    files = []
+    for path in args.paths:
+        if path.is_dir():
+            files.extend(entry.path for entry in get_layout(path).iter_files())
+        else:
+            files.append(str(path))
+
+    start = time.perf_counter()
+    load_validator(args.schema)
+    compile_ms = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    invalid = validate_corpus(files, args.schema, args.workers)
+    elapsed = time.perf_counter() - start
+
+    for path, errors in invalid[:args.max_errors]:
+        print(f"{path}:")
+        for message in errors:
+            print(f"  {message}")
+    if len(invalid) > args.max_errors:
+        print(f"... and {len(invalid) - args.max_errors} more invalid files")
+
+    workers = 1 if len(files) <= CHUNK_SIZE else args.workers or os.cpu_count() or 1
+    print(f"\nValidated {len(files)} files in {elapsed:.2f}s "
+          f"({len(files) / elapsed if elapsed else 0:,.0f} validations/s, {workers} workers, "
+          f"schema compiled in {compile_ms:.1f} ms): {len(invalid)} invalid")
+    return 1 if invalid else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
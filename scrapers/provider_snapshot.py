@@ -0,0 +1,411 @@
+#!/usr/bin/env python3
+"""
+Columnar Snapshot of Account Providers
+
+Reading every provider means 57k open() + json.load() calls. This module
+compiles data/account-providers into a single columnar snapshot file and
+reads it back through mmap, decoding only the columns a caller asks for:
+
+- string columns (id, name, bic, countryHQ) are stored as one NUL-separated
+  UTF-8 blob each, decoded with a single split
+- list columns (countries, apiAggregators) are interned: the distinct values
+  go in a dictionary in the header, and each row stores a length plus
+  2-byte codes
+- every row records the mtime and size of its JSON file; rows whose file
+  changed since the snapshot was written (and files that are new) are re-read
+  from JSON, and deleted files are dropped, so a snapshot is never stale
+
+No optional dependencies are needed (pyarrow is not used; the format is
+specific to the columns scrapers read).
+
+Usage:
+    from provider_snapshot import load_providers
+
+    columns = load_providers(ACCOUNT_PROVIDERS_PATH, ("name", "bic"))
+    for provider_id, name, bic in zip(columns["id"], columns["name"], columns["bic"]):
+        ...
+
+    # Build or refresh the snapshot and time a load
+    python scrapers/provider_snapshot.py
+"""
+
+import argparse
+import hashlib
+import json
+import mmap
+import os
+import struct
+import sys
+import time
+from array import array
+from pathlib import Path
+from typing import Iterable, Optional
+
+from provider_paths import get_layout
+
+# Paths relative to this script's location
+BASE_PATH = Path(__file__).parent.parent
+ACCOUNT_PROVIDERS_PATH = BASE_PATH / "data" / "account-providers"
+CACHE_PATH = BASE_PATH / "scraped-data" / ".cache"
+
+MAGIC = b"OBTSNAP\x00"
+SNAPSHOT_VERSION = 1
+
+# Columns stored in the snapshot, by kind
+STRING_COLUMNS = ("id", "name", "bic", "countryHQ")
+LIST_COLUMNS = ("countries", "apiAggregators")
+COLUMNS = STRING_COLUMNS + LIST_COLUMNS
+
+# Columns returned by load_providers() unless others are requested
+DEFAULT_COLUMNS = ("name", "bic", "countries", "apiAggregators")
+
+# Column blobs start on multiples of this, so integer arrays can be cast in place
+ALIGNMENT = 8
+
+
+def snapshot_file_for(providers_path: Path, cache_path: Path = CACHE_PATH) -> Path:
+    """Return the snapshot file for a provider directory (one per directory)."""
+    digest = hashlib.sha1(str(providers_path.resolve()).encode("utf-8")).hexdigest()[:12]
+    return cache_path / f"providers-{digest}.snapshot"
+
+
+def _string_value(value) -> Optional[str]:
+    """Snapshot value of a string field (None unless it is a string)."""
+    if not isinstance(value, str):
+        return None
+    # NUL separates values in the blob; provider data never contains it
+    return value.replace("\x00", "")
+
+
+def _list_value(value) -> list[str]:
+    """Snapshot value of a list field (its string items)."""
+    if not isinstance(value, list):
+        return []
+    return [item for item in value if isinstance(item, str)]
+
+
+def read_provider(path: str) -> dict:
+    """
+    Read the snapshot columns of one provider file.
+
+    Returns:
+        Dict with every column except id (unreadable files yield empty values)
+    """
+    try:
+        with open(path, "rb") as f:
+            provider = json.loads(f.read())
+    except (OSError, ValueError) as e:
+        print(f"  Warning: Failed to load {path}: {e}")
+        provider = {}
+    if not isinstance(provider, dict):
+        provider = {}
+    row = {column: _string_value(provider.get(column)) for column in STRING_COLUMNS[1:]}
+    for column in LIST_COLUMNS:
+        row[column] = _list_value(provider.get(column))
+    return row
+
+
+def _encode_strings(values: list[Optional[str]]) -> bytes:
+    """Encode a string column: a validity byte per row, then the NUL-joined blob."""
+    validity = bytes(value is not None for value in values)
+    blob = "\x00".join(value or "" for value in values).encode("utf-8")
+    return struct.pack("<Q", len(validity)) + validity + blob
+
+
+def _decode_strings(data: memoryview, count: int) -> list[Optional[str]]:
+    """Decode a string column."""
+    (validity_length,) = struct.unpack_from("<Q", data)
+    validity = data[8:8 + validity_length]
+    values = bytes(data[8 + validity_length:]).decode("utf-8").split("\x00") if count else []
+    return [value if valid else None for value, valid in zip(values, validity)]
+
+
+def _encode_lists(values: list[list[str]]) -> tuple[bytes, list[str]]:
+    """Encode an interned list column: per-row lengths, then the item codes."""
+    dictionary: dict[str, int] = {}
+    lengths = array("H")
+    codes = array("H")
+    for items in values:
+        lengths.append(len(items))
+        for item in items:
+            code = dictionary.setdefault(item, len(dictionary))
+            codes.append(code)
+    if len(dictionary) > 0xFFFF:
+        raise ValueError("Too many distinct values for a 2-byte dictionary code")
+    lengths_bytes = lengths.tobytes()
+    return struct.pack("<Q", len(lengths_bytes)) + lengths_bytes + codes.tobytes(), list(dictionary)
+
+
+def _decode_lists(data: memoryview, dictionary: list[str]) -> list[list[str]]:
+    """Decode an interned list column."""
+    (lengths_size,) = struct.unpack_from("<Q", data)
+    lengths = data[8:8 + lengths_size].cast("H").tolist()
+    items = [dictionary[code] for code in data[8 + lengths_size:].cast("H").tolist()]
+    values = []
+    position = 0
+    for length in lengths:
+        values.append(items[position:position + length])
+        position += length
+    return values
+
+
+def write_snapshot(snapshot_file: Path, providers_path: Path, columns: dict[str, list]) -> None:
+    """
+    Write a snapshot atomically.
+
+    Args:
+        snapshot_file: Snapshot path
+        providers_path: The provider directory the rows were read from
+        columns: Every column in COLUMNS, plus mtime_ns and size, as aligned lists
+    """
+    snapshot_file.parent.mkdir(parents=True, exist_ok=True)
+    count = len(columns["id"])
+
+    blobs = {}
+    dictionaries = {}
+    for column in STRING_COLUMNS:
+        blobs[column] = _encode_strings(columns[column])
+    for column in LIST_COLUMNS:
+        blobs[column], dictionaries[column] = _encode_lists(columns[column])
+    blobs["mtime_ns"] = array("q", columns["mtime_ns"]).tobytes()
+    blobs["size"] = array("q", columns["size"]).tobytes()
+
+    # Lay the blobs out after the header, each aligned
+    layout = {}
+    position = 0
+    for column, blob in blobs.items():
+        layout[column] = [position, len(blob)]
+        position += len(blob) + (-len(blob)) % ALIGNMENT
+    header = json.dumps({
+        "version": SNAPSHOT_VERSION,
+        "directory": str(providers_path.resolve()),
+        "count": count,
+        "columns": layout,
+        "dictionaries": dictionaries,
+    }, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+    header += b" " * ((-(len(MAGIC) + 8 + len(header))) % ALIGNMENT)
+
+    tmp_file = snapshot_file.with_name(f".{snapshot_file.name}.{os.getpid()}.tmp")
+    with open(tmp_file, "wb") as f:
+        f.write(MAGIC + struct.pack("<Q", len(header)) + header)
+        for blob in blobs.values():
+            f.write(blob)
+            f.write(b"\x00" * ((-len(blob)) % ALIGNMENT))
+    os.replace(tmp_file, snapshot_file)
+
+
+class ProviderSnapshot:
+    """
+    Memory-mapped reader for a snapshot file.
+
+    Columns are decoded on first access and only the bytes of the requested
+    columns are read from the mapping.
+
+    Raises:
+        ValueError: If the file is not a snapshot of the current version
+    """
+
+    def __init__(self, snapshot_file: Path):
+        self.snapshot_file = snapshot_file
+        self._file = open(snapshot_file, "rb")
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # Empty file
+            self._file.close()
+            raise
+        try:
+            if self._map[:len(MAGIC)] != MAGIC:
+                raise ValueError(f"Not a provider snapshot: {snapshot_file}")
+            (header_length,) = struct.unpack_from("<Q", self._map, len(MAGIC))
+            self._data_start = len(MAGIC) + 8 + header_length
+            self.header = json.loads(self._map[len(MAGIC) + 8:self._data_start])
+            if self.header.get("version") != SNAPSHOT_VERSION:
+                raise ValueError(f"Unsupported snapshot version: {self.header.get('version')}")
+        except (ValueError, struct.error):
+            self.close()
+            raise
+        self._view = memoryview(self._map)
+        self._decoded: dict[str, list] = {}
+
+    def __len__(self) -> int:
+        return self.header["count"]
+
+    def __enter__(self) -> "ProviderSnapshot":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    @property
+    def directory(self) -> str:
+        """The provider directory the snapshot was built from."""
+        return self.header["directory"]
+
+    def column(self, name: str) -> list:
+        """
+        Return one column as a list aligned with column("id").
+
+        Args:
+            name: A name from COLUMNS, or mtime_ns / size
+        """
+        if name not in self._decoded:
+            offset, length = self.header["columns"][name]
+            start = self._data_start + offset
+            data = self._view[start:start + length]
+            try:
+                if name in STRING_COLUMNS:
+                    values = _decode_strings(data, len(self))
+                elif name in LIST_COLUMNS:
+                    values = _decode_lists(data, self.header["dictionaries"][name])
+                else:
+                    values = data.cast("q").tolist()
+            finally:
+                data.release()
+            self._decoded[name] = values
+        return self._decoded[name]
+
+    def close(self) -> None:
+        """Release the mapping."""
+        if getattr(self, "_view", None) is not None:
+            self._view.release()
+            self._view = None
+        if not self._map.closed:
+            self._map.close()
+        self._file.close()
+
+
+def _open_snapshot(snapshot_file: Optional[Path], providers_path: Path) -> Optional[ProviderSnapshot]:
+    """Open a snapshot of providers_path, or None if there is no usable one."""
+    if snapshot_file is None or not snapshot_file.exists():
+        return None
+    try:
+        snapshot = ProviderSnapshot(snapshot_file)
+    except (OSError, ValueError) as e:
+        print(f"  Warning: Ignoring provider snapshot {snapshot_file}: {e}")
+        return None
+    if snapshot.directory != str(providers_path.resolve()):
+        snapshot.close()
+        return None
+    return snapshot
+
+
+def load_providers(providers_path: Path = ACCOUNT_PROVIDERS_PATH,
+                   columns: Iterable[str] = DEFAULT_COLUMNS,
+                   cache_path: Optional[Path] = CACHE_PATH,
+                   update: bool = True, rebuild: bool = False) -> dict[str, list]:
+    """
+    Load selected columns for every provider in a directory.
+
+    Rows whose file mtime/size match the snapshot come from the snapshot;
+    new and modified files are read from JSON. When anything had to be read
+    from JSON (or files were deleted), the snapshot is rewritten.
+
+    Args:
+        providers_path: Directory containing provider JSON files
+        columns: Columns to return (from COLUMNS); "id" is always included
+        cache_path: Directory for the snapshot file (None reads every file from JSON)
+        update: Rewrite the snapshot if it was stale or missing
+        rebuild: Ignore the existing snapshot and read every file
+
+    Returns:
+        Dict of column name -> list, all aligned with the "id" list (sorted
+        by provider ID)
+    """
+    columns = ["id"] + [column for column in columns if column != "id"]
+    for column in columns:
+        if column not in COLUMNS:
+            raise ValueError(f"Unknown snapshot column: {column}")
+
+    snapshot_file = snapshot_file_for(providers_path, cache_path) if cache_path else None
+    snapshot = None if rebuild else _open_snapshot(snapshot_file, providers_path)
+    try:
+        known: dict[str, int] = {}
+        if snapshot is not None:
+            mtimes = snapshot.column("mtime_ns")
+            sizes = snapshot.column("size")
+            known = {provider_id: row for row, provider_id in enumerate(snapshot.column("id"))}
+
+        # Stat every file; unchanged ones are served from the snapshot
+        fresh: dict[str, int] = {}
+        stale: dict[str, os.stat_result] = {}
+        paths: dict[str, str] = {}
+        for entry in get_layout(providers_path).iter_files():
+            provider_id = entry.name[:-5]
+            stat = entry.stat()
+            row = known.get(provider_id)
+            if row is not None and mtimes[row] == stat.st_mtime_ns and sizes[row] == stat.st_size:
+                fresh[provider_id] = row
+            else:
+                stale[provider_id] = stat
+                paths[provider_id] = entry.path
+
+        rewrite = (snapshot_file is not None and (update or rebuild)
+                   and (bool(stale) or len(fresh) != len(known) or snapshot is None))
+        # A rewrite needs every column, not just the requested ones
+        value_columns = [column for column in (COLUMNS if rewrite else columns) if column != "id"]
+        from_snapshot = {column: snapshot.column(column) for column in value_columns} if snapshot else {}
+        reread = {provider_id: read_provider(paths[provider_id]) for provider_id in stale}
+
+        result = {column: [] for column in ["id"] + value_columns}
+        stamps = {"mtime_ns": [], "size": []}
+        for provider_id in sorted(fresh.keys() | reread.keys()):
+            result["id"].append(provider_id)
+            row = fresh.get(provider_id)
+            if row is not None:
+                for column in value_columns:
+                    result[column].append(from_snapshot[column][row])
+                mtime_ns, size = mtimes[row], sizes[row]
+            else:
+                data = reread[provider_id]
+                for column in value_columns:
+                    result[column].append(data[column])
+                mtime_ns, size = stale[provider_id].st_mtime_ns, stale[provider_id].st_size
+            if rewrite:
+                stamps["mtime_ns"].append(mtime_ns)
+                stamps["size"].append(size)
+    finally:
+        if snapshot is not None:
+            snapshot.close()
+
+    if rewrite:
+        write_snapshot(snapshot_file, providers_path, {**result, **stamps})
+    return {column: result[column] for column in columns}
+
+
+def main():
+    """Main entry point with argument parsing."""
+    parser = argparse.ArgumentParser(description="Build the account provider snapshot and time loads")
+    parser.add_argument("--rebuild", action="store_true", help="Re-read every provider file")
+    parser.add_argument(
+        "--columns",
+        default=",".join(DEFAULT_COLUMNS),
+        help=f"Comma-separated columns to load (default: {','.join(DEFAULT_COLUMNS)})"
+    )
+    parser.add_argument(
+        "--providers-path",
+        type=str,
+        default=str(ACCOUNT_PROVIDERS_PATH),
+        help=f"Provider directory (default: {ACCOUNT_PROVIDERS_PATH})"
+    )
+    args = parser.parse_args()
+
+    providers_path = Path(args.providers_path)
+    columns = [column.strip() for column in args.columns.split(",") if column.strip()]
+
+    start = time.perf_counter()
+    loaded = load_providers(providers_path, columns, rebuild=args.rebuild)
+    elapsed = time.perf_counter() - start
+    print(f"Loaded {len(loaded['id'])} providers ({', '.join(loaded)}) in {elapsed * 1000:.0f} ms")
+
+    start = time.perf_counter()
+    load_providers(providers_path, columns)
+    elapsed = time.perf_counter() - start
+    snapshot_file = snapshot_file_for(providers_path)
+    print(f"Reloaded from the snapshot in {elapsed * 1000:.0f} ms")
+    print(f"  Snapshot: {snapshot_file} ({snapshot_file.stat().st_size / 1024 / 1024:.1f} MB)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+"""
+Batched Write-Back for Account Provider Updates
+
+Scrapers used to load and rewrite a provider file for every matched bank, one
+after another. A WriteBackSession instead collects the mutations for each
+provider ID (add an aggregator, set a missing BIC, create a new provider),
+merges all mutations that target the same file, and applies them in a single
+flush at the end of the run:
+
+- every provider file is read and written at most once
+- files are read/written concurrently on a thread pool
+- writes go through json_writer.save_json() (temporary file atomically renamed
+  over the target), and the written files are fsynced in one batch at the end
+  of the flush
+- every written provider is validated against schema.json first
+  (provider_schema.py); violations the run introduced (all of them for
+  created providers, only new ones for updated providers) are kept in
+  schema_errors, and print_schema_summary() reports them, so they show up
+  before CI
+- a provider file that cannot be read or written (missing, unreadable,
+  invalid JSON) is skipped with a warning and kept in errors; the flush
+  still returns the changes made to every other file, and a new provider
+  that could not be written is removed from the index again
+
+Usage:
+    from provider_writeback import WriteBackSession
+
+    session = WriteBackSession(index)
+    session.add_aggregator("abn-amro", "plaid")
+    session.set_bic("abn-amro", "ABNANL2A")
+    session.create(new_provider)
+    changes = session.flush()   # {"abn-amro": ["plaid"], ...}
+    session.print_schema_summary()
+"""
+
+import json
+import re
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+from json_writer import SyncBatch, save_json
+from provider_index import ProviderIndex
+from provider_schema import SchemaValidator, load_validator
+
+
+# Mutation kinds
+ADD_AGGREGATOR = "add_aggregator"
+SET_BIC = "set_bic"
+
+# Distinct schema errors listed in the flush summary
+SCHEMA_SUMMARY_LINES = 5
+
+# Array indices in error paths (an inserted aggregator shifts the ones after it)
+ARRAY_INDEX = re.compile(r"\[\d+\]")
+
+
+def _error_key(error: str) -> str:
+    """Schema error without array indices, to tell existing errors from new ones."""
+    return ARRAY_INDEX.sub("[]", error)
+
+
+def apply_mutations(provider: dict, mutations: list[tuple[str, str]]) -> list[str]:
+    """
+    Apply queued mutations to provider data in order.
+
+    Args:
+        provider: Provider data (modified in place)
+        mutations: List of (kind, value) tuples
+
+    Returns:
+        Descriptions of the changes actually made, e.g. ["plaid", "bic=ABNANL2A"]
+    """
+    changes = []
+    for kind, value in mutations:
+        if kind == ADD_AGGREGATOR:
+            aggregators = provider.get("apiAggregators", [])
+            if aggregators is None:
+                aggregators = []
+            if value not in aggregators:
+                aggregators.append(value)
+                aggregators.sort()
+                provider["apiAggregators"] = aggregators
+                changes.append(value)
+        elif kind == SET_BIC:
+            if value and not provider.get("bic"):
+                provider["bic"] = value
+                changes.append(f"bic={value}")
+        else:
+            raise ValueError(f"Unknown mutation: {kind}")
+    return changes
+
+
+class WriteBackSession:
+    """
+    Collects provider mutations during a scraper run and flushes them in one pass.
+
+    Args:
+        index: The shared provider index (used for paths and kept up to date)
+        max_workers: Thread pool size for the flush (None for the executor default)
+        fsync: Fsync the written files and their directory at the end of the flush
+        validate: Validate providers against schema.json before writing them
+    """
+
+    def __init__(self, index: ProviderIndex, max_workers: Optional[int] = None, fsync: bool = True,
+                 validate: bool = True):
+        self.index = index
+        self.max_workers = max_workers
+        self.fsync = fsync
+        self.validator: Optional[SchemaValidator] = load_validator() if validate else None
+        # Provider ID -> schema errors introduced by the last flush
+        self.schema_errors: dict[str, list[str]] = {}
+        # Provider ID -> error that kept the last flush from updating the file
+        self.errors: dict[str, str] = {}
+        self._batch: Optional[SyncBatch] = None
+        self._pending: dict[str, list[tuple[str, str]]] = {}
+        self._created: dict[str, dict] = {}
+
+    def __len__(self) -> int:
+        return len(self._pending.keys() | self._created.keys())
+
+    def create(self, provider: dict) -> None:
+        """
+        Queue a new provider file.
+
+        The ID is registered in the index immediately, so later institutions in
+        the same run match it (and may queue further mutations against it). If
+        the flush cannot write the file, it is removed from the index again.
+        """
+        provider_id = provider["id"]
+        self._created[provider_id] = provider
+        self.index.add(provider)
+
+    def add_aggregator(self, provider_id: str, aggregator: str) -> None:
+        """Queue adding an aggregator to a provider's apiAggregators list."""
+        self._pending.setdefault(provider_id, []).append((ADD_AGGREGATOR, aggregator))
+
+    def set_bic(self, provider_id: str, bic: str) -> None:
+        """
+        Queue setting a provider's BIC if it does not have one yet.
+
+        The index records the BIC once the flush wrote it.
+        """
+        if bic:
+            self._pending.setdefault(provider_id, []).append((SET_BIC, bic))
+
+    def _apply(self, provider_id: str) -> tuple[list[str], Optional[dict]]:
+        """Apply all mutations for one provider and write it if anything changed."""
+        mutations = self._pending.get(provider_id, [])
+        path = self.index.path_for(provider_id)
+
+        created = provider_id in self._created
+        if created:
+            provider = self._created[provider_id]
+            self.index.layout.prepare(path)
+        else:
+            with open(path, "r", encoding="utf-8") as f:
+                provider = json.load(f)
+        existing_errors = Counter(map(_error_key, self._schema_errors(provider))) if not created else Counter()
+
+        changes = apply_mutations(provider, mutations)
+        if created:
+            changes.insert(0, "created")
+        if changes:
+            new_errors = []
+            for error in self._schema_errors(provider):
+                key = _error_key(error)
+                if existing_errors[key]:
+                    existing_errors[key] -= 1
+                else:
+                    new_errors.append(error)
+            if new_errors:
+                self.schema_errors[provider_id] = new_errors
+            save_json(path, provider, batch=self._batch)
+            return changes, provider
+        return changes, None
+
+    def _try_apply(self, provider_id: str) -> tuple[list[str], Optional[dict], Optional[str]]:
+        """_apply(), with the error that kept the file from being updated instead of raising it."""
+        try:
+            return (*self._apply(provider_id), None)
+        except (OSError, ValueError) as e:
+            return [], None, f"{type(e).__name__}: {e}"
+
+    def _schema_errors(self, provider: dict) -> list[str]:
+        if self.validator is None:
+            return []
+        return [str(error) for error in self.validator.errors(provider)]
+
+    def print_schema_summary(self) -> None:
+        """Print how many providers the last flush wrote with new schema errors, and the most common ones."""
+        if not self.schema_errors:
+            return
+        counts: dict[str, int] = {}
+        for errors in self.schema_errors.values():
+            for error in errors:
+                counts[error] = counts.get(error, 0) + 1
+        print(f"  Schema: {len(self.schema_errors)} written providers do not validate against schema.json:")
+        for error, count in sorted(counts.items(), key=lambda item: -item[1])[:SCHEMA_SUMMARY_LINES]:
+            print(f"    {count:>6}x {error}")
+        if len(counts) > SCHEMA_SUMMARY_LINES:
+            print(f"    ... and {len(counts) - SCHEMA_SUMMARY_LINES} more distinct errors")
+
+    def flush(self) -> dict[str, list[str]]:
+        """
+        Apply all queued mutations and write the affected files.
+
+        A file that cannot be read or written is skipped with a warning, and
+        its error kept in errors; a new provider whose file could not be
+        written is removed from the index. The queue is cleared even if the
+        flush fails.
+
+        Returns:
+            Mapping of provider ID -> list of changes made (empty if unchanged),
+            for every provider that was not skipped
+        """
+        provider_ids = list(self._created) + [pid for pid in self._pending if pid not in self._created]
+        results: dict[str, list[str]] = {}
+        self.schema_errors = {}
+        self.errors = {}
+        if not provider_ids:
+            return results
+
+        self._batch = SyncBatch(self.max_workers) if self.fsync else None
+        try:
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                outcomes = executor.map(self._try_apply, provider_ids)
+                for provider_id, (changes, provider, error) in zip(provider_ids, outcomes):
+                    if error is not None:
+                        self.errors[provider_id] = error
+                        print(f"  Warning: Failed to update {provider_id}: {error}")
+                        if provider_id in self._created:
+                            self.index.remove(provider_id)
+                        continue
+                    results[provider_id] = changes
+                    # Set BICs are indexed once written
+                    if provider is not None and any(c.startswith("bic=") for c in changes):
+                        self.index.add(provider)
+            if self._batch is not None:
+                self._batch.sync()
+        finally:
+            self._batch = None
+            self._pending.clear()
+            self._created.clear()
+        if self.errors:
+            print(f"  {len(self.errors)} provider files could not be updated")
+        return results
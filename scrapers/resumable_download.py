@@ -0,0 +1,351 @@
+#!/usr/bin/env python3
+"""
+Resumable, Compressed Streaming Downloads
+
+Streams a large file over HTTP straight into a compressed cache file:
+- the request advertises Accept-Encoding: gzip (and zstd when the zstandard
+  package is installed); an encoded response is stored exactly as received
+- an unencoded response is gzip-compressed locally while streaming, in
+  independent gzip members, so the file never exists uncompressed on disk
+- an interrupted download is resumed with an HTTP Range request (guarded by
+  If-Range) from a .part file and its .part.json progress sidecar, both within
+  a run (retries) and across runs; a response that does not continue the
+  partial file (changed file, other range or encoding) restarts from byte 0
+- a cached file with an ETag/Last-Modified is revalidated with a conditional
+  request, and a 304 keeps it
+
+For a base path such as scraped-data/data.json the cache consists of
+data.json.gz (or .zst, or data.json when stored uncompressed), data.meta.json
+with the validators, and data.json.part/.part.json while downloading.
+
+Usage:
+    from resumable_download import download, open_cached
+
+    result = download(url, SCRAPED_DATA_PATH / "data.json")
+    with open_cached(result["path"]) as f:
+        for line in f:
+            ...
+"""
+
+import gzip
+import http.client
+import io
+import json
+import os
+import time
+from pathlib import Path
+from typing import BinaryIO, Optional
+
+from http_client import HTTPClient, HTTPStatusError
+from json_writer import save_json
+
+try:
+    import zstandard
+    HAS_ZSTD = True
+except ImportError:
+    HAS_ZSTD = False
+
+# Bytes read from the response per iteration
+READ_SIZE = 1024 * 1024
+
+# Uncompressed bytes per locally written gzip member (the unit of resumption)
+GZIP_MEMBER_SIZE = 16 * 1024 * 1024
+GZIP_LEVEL = 6
+
+# Seconds without data before a read is abandoned (and resumed)
+READ_TIMEOUT = 60
+
+# Attempts per download before giving up; later attempts resume the .part file
+MAX_ATTEMPTS = 5
+
+# Responses are read undecoded: the Content-Encoding is stored as received
+HTTP_CLIENT = HTTPClient(timeout=READ_TIMEOUT)
+
+# Storage formats of the cached file
+STORED_AS_IS = "as-is"        # Server-encoded (or identity) bytes, resumable by stored size
+STORED_GZIP_LOCAL = "gzip-local"  # Identity response compressed here, resumable per member
+
+SUFFIXES = {"gzip": ".gz", "zstd": ".zst", "identity": ""}
+
+
+def meta_path_for(base: Path) -> Path:
+    """Return the validator metadata file for a base path."""
+    return base.with_name(f"{base.stem}.meta.json")
+
+
+def _part_paths(base: Path) -> tuple[Path, Path]:
+    """Return the (.part, .part.json) paths for a base path."""
+    return base.with_name(base.name + ".part"), base.with_name(base.name + ".part.json")
+
+
+def _read_json(path: Path) -> dict:
+    """Read a small JSON object, returning {} if it is missing or invalid."""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return data if isinstance(data, dict) else {}
+
+
+def _write_json(path: Path, data: dict) -> None:
+    """Write a small JSON object atomically."""
+    save_json(path, data)
+
+
+def load_meta(base: Path, url: str) -> dict:
+    """
+    Load the metadata of a completed download of url.
+
+    Returns:
+        Dict with url, file, encoding, etag, last_modified and size, or {} if
+        there is no completed download of this URL
+    """
+    meta = _read_json(meta_path_for(base))
+    if meta.get("url") != url or not meta.get("file"):
+        return {}
+    if not (base.parent / meta["file"]).exists():
+        return {}
+    return meta
+
+
+def is_compressed(path) -> bool:
+    """Whether a cached file is stored compressed."""
+    return Path(path).suffix in (".gz", ".zst")
+
+
+def open_cached(path) -> BinaryIO:
+    """
+    Open a cached file for reading decompressed bytes (iterable by line).
+
+    Args:
+        path: A .gz, .zst or uncompressed file
+    """
+    path = Path(path)
+    if path.suffix == ".gz":
+        return gzip.open(path, "rb")
+    if path.suffix == ".zst":
+        if not HAS_ZSTD:
+            raise RuntimeError(f"The zstandard package is required to read {path}")
+        stream = zstandard.ZstdDecompressor().stream_reader(
+            open(path, "rb"), read_across_frames=True, closefd=True
+        )
+        return io.BufferedReader(stream)
+    return open(path, "rb")
+
+
+class _GzipMemberWriter:
+    """
+    Compresses streamed data into independent gzip members.
+
+    After each member is written and flushed, the sidecar records how many
+    uncompressed bytes it covers, so a resumed download can truncate the file
+    to the last complete member and request the rest with a Range header.
+    """
+
+    def __init__(self, f: BinaryIO, progress: dict, progress_file: Path):
+        self.f = f
+        self.progress = progress
+        self.progress_file = progress_file
+        self.buffer = bytearray()
+
+    def write(self, data: bytes) -> None:
+        self.buffer += data
+        if len(self.buffer) >= GZIP_MEMBER_SIZE:
+            self.flush()
+
+    def flush(self) -> None:
+        if not self.buffer:
+            return
+        self.f.write(gzip.compress(bytes(self.buffer), compresslevel=GZIP_LEVEL))
+        self.f.flush()
+        self.progress["raw_offset"] += len(self.buffer)
+        self.progress["stored_offset"] = self.f.tell()
+        self.buffer.clear()
+        _write_json(self.progress_file, self.progress)
+
+
+def _accept_encoding(compress: bool) -> str:
+    """Accept-Encoding header for a fresh download."""
+    if not compress:
+        return "identity"
+    return "zstd, gzip" if HAS_ZSTD else "gzip"
+
+
+def _discard_partial(part_file: Path, progress_file: Path) -> None:
+    """Remove a partial download."""
+    for path in (part_file, progress_file):
+        try:
+            path.unlink()
+        except FileNotFoundError:
+            pass
+
+
+def _if_range(progress: dict) -> Optional[str]:
+    """Validator for If-Range: a strong ETag, else the Last-Modified date."""
+    etag = progress.get("etag")
+    if etag and not etag.startswith("W/"):
+        return etag
+    return progress.get("last_modified")
+
+
+def _range_start(progress: dict, part_file: Path) -> int:
+    """Offset (in the requested representation) to resume a partial download from."""
+    if progress["storage"] == STORED_GZIP_LOCAL:
+        return progress["raw_offset"]
+    return part_file.stat().st_size
+
+
+def _fetch(url: str, base: Path, compress: bool, conditional: bool) -> dict:
+    """Make one download attempt, resuming a partial download if possible."""
+    part_file, progress_file = _part_paths(base)
+    meta = load_meta(base, url)
+
+    progress = _read_json(progress_file)
+    if progress.get("url") != url or not part_file.exists() or not _if_range(progress):
+        # Without a validator a partial file cannot be resumed safely
+        _discard_partial(part_file, progress_file)
+        progress = {}
+
+    headers = {}
+    range_start = 0
+    if progress:
+        range_start = _range_start(progress, part_file)
+        headers["Accept-Encoding"] = progress["accept_encoding"]
+        headers["Range"] = f"bytes={range_start}-"
+        headers["If-Range"] = _if_range(progress)
+    else:
+        headers["Accept-Encoding"] = _accept_encoding(compress)
+        if conditional and meta:
+            if meta.get("etag"):
+                headers["If-None-Match"] = meta["etag"]
+            if meta.get("last_modified"):
+                headers["If-Modified-Since"] = meta["last_modified"]
+
+    with HTTP_CLIENT.stream("GET", url, headers=headers, decode=False) as response:
+        if response.status == 304 and meta:
+            return {"path": base.parent / meta["file"], "not_modified": True,
+                    "received": 0, "resumed": False, "timing": response.timing}
+        if response.status == 416 and progress:
+            # Range no longer satisfiable (file shrank upstream); start over
+            _discard_partial(part_file, progress_file)
+            return _fetch(url, base, compress, conditional=False)
+        response.raise_for_status()
+
+        response_headers = response.headers
+        encoding = (response_headers.get("Content-Encoding") or "identity").strip().lower()
+        if encoding not in SUFFIXES:
+            raise OSError(f"Unsupported Content-Encoding: {encoding}")
+
+        resumed = False
+        if progress and response.status == 206:
+            content_range = response_headers.get("Content-Range", "")
+            resumed = (content_range.startswith(f"bytes {range_start}-")
+                       and encoding == progress["encoding"])
+            if not resumed:
+                # Not the continuation of the partial file (another range or
+                # encoding); retrying the same range would fail again, so start over
+                _discard_partial(part_file, progress_file)
+                return _fetch(url, base, compress, conditional=False)
+
+        if not resumed:
+            # Fresh download (a 200 to an If-Range request means the file changed)
+            storage = STORED_GZIP_LOCAL if (compress and encoding == "identity") else STORED_AS_IS
+            progress = {
+                "url": url,
+                "etag": response_headers.get("ETag"),
+                "last_modified": response_headers.get("Last-Modified"),
+                "accept_encoding": "identity" if storage == STORED_GZIP_LOCAL else headers["Accept-Encoding"],
+                "encoding": encoding,
+                "storage": storage,
+                "raw_offset": 0,
+                "stored_offset": 0,
+            }
+            with open(part_file, "wb"):
+                pass
+            _write_json(progress_file, progress)
+
+        expected = response_headers.get("Content-Length")
+        received = 0
+        with open(part_file, "r+b") as f:
+            if progress["storage"] == STORED_GZIP_LOCAL:
+                f.truncate(progress["stored_offset"])
+                f.seek(progress["stored_offset"])
+                writer = _GzipMemberWriter(f, progress, progress_file)
+            else:
+                f.seek(0, os.SEEK_END)
+                writer = f
+            while True:
+                block = response.read(READ_SIZE)
+                if not block:
+                    break
+                writer.write(block)
+                received += len(block)
+            writer.flush()
+
+        if expected is not None and received != int(expected):
+            raise OSError(f"Connection closed after {received} of {expected} bytes")
+
+    # Complete: move into place and drop copies stored in other formats
+    final_encoding = "gzip" if progress["storage"] == STORED_GZIP_LOCAL else progress["encoding"]
+    final_path = base.with_name(base.name + SUFFIXES[final_encoding])
+    os.replace(part_file, final_path)
+    for suffix in SUFFIXES.values():
+        other = base.with_name(base.name + suffix)
+        if other != final_path and other.exists():
+            other.unlink()
+    _write_json(meta_path_for(base), {
+        "url": url,
+        "file": final_path.name,
+        "encoding": final_encoding,
+        "etag": progress["etag"],
+        "last_modified": progress["last_modified"],
+        "size": final_path.stat().st_size,
+    })
+    progress_file.unlink()
+
+    return {"path": final_path, "not_modified": False, "received": received, "resumed": resumed,
+            "timing": response.timing}
+
+
+def download(url: str, base: Path, compress: bool = True, conditional: bool = True,
+             max_attempts: int = MAX_ATTEMPTS) -> dict:
+    """
+    Download url into a (compressed) cache file, resuming where possible.
+
+    Args:
+        url: URL to download
+        base: Cache path of the uncompressed file; the stored file gets a
+            .gz/.zst suffix when compressed
+        compress: Store the file compressed (otherwise as plain bytes)
+        conditional: Revalidate a cached download with its ETag/Last-Modified
+        max_attempts: Attempts before giving up; each retry resumes
+
+    Returns:
+        Dict with path (the stored file), not_modified, received (bytes
+        transferred by the final attempt), resumed and timing (the final
+        attempt's http_client.RequestTiming)
+
+    Raises:
+        OSError (HTTPStatusError for error responses) or
+        http.client.HTTPException if the download keeps failing
+    """
+    base.parent.mkdir(parents=True, exist_ok=True)
+    attempt = 1
+    while True:
+        try:
+            return _fetch(url, base, compress, conditional)
+        except HTTPStatusError as e:
+            if e.status < 500 or attempt >= max_attempts:
+                raise
+            error = e
+        except (OSError, EOFError, http.client.HTTPException) as e:
+            if attempt >= max_attempts:
+                raise
+            error = e
+        # The .part file survives, so the next attempt resumes it
+        delay = min(2 ** attempt, 30)
+        attempt += 1
+        print(f"  Download interrupted ({error}); resuming in {delay}s "
+              f"(attempt {attempt}/{max_attempts})...")
+        time.sleep(delay)
@@ -0,0 +1,398 @@
+#!/usr/bin/env python3
+"""
+Run All Scrapers
+
+Runs the Plaid, Yapily, YAXI, Flinks and OpenSanctions scrapers in one
+process, instead of one `npm run scrape:*` process each (every one of which
+listed and read data/account-providers and opened its own connections):
+
+1. fetch - the network phase of every scraper (API requests, the Flinks
+   status page, the OpenSanctions download) runs on its own thread, all at the
+   same time; --max-concurrency bounds the HTTP requests in flight across all
+   of them (one semaphore shared by every scraper's HTTPClient)
+2. plan - the provider index is loaded once, while the fetches run; as the
+   fetches complete, each scraper's results are matched against it and its
+   changes queued on one WriteBackSession, in a fixed order (SCRAPERS), so
+   later scrapers match the providers planned by earlier ones and the result
+   does not depend on which fetch finished first
+3. write - the session is flushed once (a provider file changed by several
+   scrapers is still read and written once), then every scraper reports its
+   changes and saves its ID mappings and market coverage, and the index is
+   saved
+
+A scraper whose fetch fails or returns nothing (e.g. without credentials) is
+left out of the later phases; the others still run. The run ends with the
+wall-clock time of every scraper's phases: since the fetches overlap, a run
+takes about as long as its slowest fetch plus the write, not the sum of all
+scrapers.
+
+Usage:
+    python scrapers/run_all.py
+    python scrapers/run_all.py --scrapers plaid,yaxi --max-concurrency 4
+    python scrapers/run_all.py --dry-run
+"""
+
+import argparse
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Optional
+
+import flinks_scraper
+import opensanctions_bic_scraper
+import plaid_scraper
+import resumable_download
+import yapily_scraper
+import yaxi_scraper
+from http_cache import add_cache_arguments, cache_from_args
+from provider_index import load_provider_index, unload_provider_index
+from provider_reconcile import ReconcilePlan
+from provider_writeback import WriteBackSession
+
+BASE_PATH = Path(__file__).parent.parent
+ACCOUNT_PROVIDERS_PATH = BASE_PATH / "data" / "account-providers"
+
+# Scrapers, in the order their changes are planned
+SCRAPERS = ["plaid", "yapily", "yaxi", "flinks", "opensanctions"]
+
+# HTTP requests in flight across all scrapers (Plaid's fetch workers plus one per other scraper)
+DEFAULT_MAX_CONCURRENCY = plaid_scraper.DEFAULT_WORKERS + len(SCRAPERS) - 1
+
+# Module of each scraper, for its HTTP client
+MODULES = {
+    "plaid": plaid_scraper,
+    "yapily": yapily_scraper,
+    "yaxi": yaxi_scraper,
+    "flinks": flinks_scraper,
+    "opensanctions": resumable_download,
+}
+
+
+class ScraperStage:
+    """
+    One scraper's part of a run, and the wall-clock time of its phases.
+
+    Args:
+        name: Scraper name
+        fetch: Network phase, called as fetch(options); returns the fetched
+            data (None or empty if there is nothing to reconcile)
+        plan: Called as plan(data, session, options) after the fetch; queues
+            (or, with options.dry_run, only plans) the scraper's changes and
+            returns (the plan to print on a dry run, or None; the function
+            called with the session's flush result to finish the scraper, or None)
+    """
+
+    def __init__(self, name: str, fetch: Callable, plan: Callable):
+        self.name = name
+        self.fetch = fetch
+        self.plan = plan
+        self.status = "ok"
+        self.fetch_started = 0.0
+        self.fetch_seconds = 0.0
+        self.plan_seconds = 0.0
+        self.finish_seconds = 0.0
+        self.reconcile_plan: Optional[ReconcilePlan] = None
+        self.finish: Optional[Callable] = None
+
+    def run_fetch(self, options) -> object:
+        """Run the fetch phase, recording its time and failure (never raises)."""
+        self.fetch_started = time.perf_counter()
+        try:
+            data = self.fetch(options)
+        except Exception as e:
+            print(f"  {self.name}: fetch failed: {e!r}")
+            self.status = "fetch failed"
+            data = None
+        self.fetch_seconds = time.perf_counter() - self.fetch_started
+        if not data and self.status == "ok":
+            self.status = "nothing fetched"
+        return data
+
+
+def fetch_plaid(options) -> Optional[list[dict]]:
+    return plaid_scraper.get_plaid_institutions(options.plaid_workers, options.plaid_rate_limit,
+                                                options.dry_run)
+
+
+def plan_plaid(institutions: list[dict], session: WriteBackSession, options) -> tuple:
+    snapshot = plaid_scraper.institution_snapshot(options.full)
+    plan, id_mappings = plaid_scraper.plan_bank_providers(snapshot.delta(institutions), session.index,
+                                                          options.apply_fuzzy)
+    snapshot.print_report()
+
+    def finish(changes: dict) -> None:
+        stats = plan.report(changes, session.schema_errors, session.errors)
+        plaid_scraper.report_bank_providers(stats, id_mappings)
+        plaid_scraper.update_plaid_coverage()
+        snapshot.forget(plan.unapplied())
+        snapshot.save()
+
+    return plan, finish
+
+
+def fetch_yapily(options) -> Optional[list[dict]]:
+    if not yapily_scraper.get_auth_header():
+        print("  No YAPILY_APPLICATION_UUID/YAPILY_SECRET set. Skipping Yapily.")
+        return None
+    return yapily_scraper.get_yapily_institutions()
+
+
+def plan_yapily(institutions: list[dict], session: WriteBackSession, options) -> tuple:
+    snapshot = yapily_scraper.institution_snapshot(options.full)
+    plan, id_mappings = yapily_scraper.plan_bank_providers(snapshot.delta(institutions), session.index,
+                                                           options.apply_fuzzy)
+    snapshot.print_report()
+
+    def finish(changes: dict) -> None:
+        stats = plan.report(changes, session.schema_errors, session.errors)
+        yapily_scraper.report_bank_providers(stats, id_mappings)
+        yapily_scraper.update_yapily_coverage(institutions)
+        snapshot.forget(plan.unapplied())
+        snapshot.save()
+
+    return plan, finish
+
+
+def fetch_yaxi(options) -> Optional[list[dict]]:
+    return yaxi_scraper.fetch_connections()
+
+
+def plan_yaxi(connections: list[dict], session: WriteBackSession, options) -> tuple:
+    snapshot = yaxi_scraper.connection_snapshot(options.full)
+    plan, id_mappings = yaxi_scraper.plan_bank_providers(snapshot.delta(connections), session.index,
+                                                         options.apply_fuzzy)
+    snapshot.print_report()
+
+    def finish(changes: dict) -> None:
+        stats = plan.report(changes, session.schema_errors, session.errors)
+        yaxi_scraper.report_bank_providers(stats, id_mappings)
+        snapshot.forget(plan.unapplied())
+        snapshot.save()
+
+    return plan, finish
+
+
+def fetch_flinks(options) -> dict[str, list[dict]]:
+    all_banks = flinks_scraper.scrape_flinks_coverage()
+    # A status page without banks is treated as a failed scrape, as in flinks_scraper.main()
+    return all_banks if any(all_banks.values()) else {}
+
+
+def plan_flinks(all_banks: dict[str, list[dict]], session: WriteBackSession, options) -> tuple:
+    snapshot = flinks_scraper.bank_snapshot(options.full)
+    plan = flinks_scraper.plan_bank_providers(flinks_scraper.bank_delta(all_banks, snapshot), session.index,
+                                              options.apply_fuzzy)
+    snapshot.print_report()
+
+    def finish(changes: dict) -> None:
+        stats = plan.report(changes, session.schema_errors, session.errors)
+        flinks_scraper.report_bank_providers(stats)
+        flinks_scraper.update_flinks_coverage([code for code, banks in all_banks.items() if banks])
+        flinks_scraper.save_scraped_data(all_banks)
+        snapshot.forget(plan.unapplied())
+        snapshot.save()
+
+    return plan, finish
+
+
+def fetch_opensanctions(options) -> Optional[tuple[str, bool]]:
+    data_file, not_modified = opensanctions_bic_scraper.download_data(conditional=not options.full)
+    return (data_file, not_modified) if data_file else None
+
+
+def plan_opensanctions(download: tuple[str, bool], session: WriteBackSession, options) -> tuple:
+    data_file, not_modified = download
+    run = opensanctions_bic_scraper.process_entities(data_file, not_modified, session, full=options.full,
+                                                     workers=options.opensanctions_workers)
+    if run is None:
+        return None, None
+    if options.dry_run:
+        opensanctions_bic_scraper.print_summary(run)
+        return None, None
+
+    def finish(changes: dict) -> None:
+        opensanctions_bic_scraper.save_run_ledger(run)
+        opensanctions_bic_scraper.print_summary(run)
+
+    return None, finish
+
+
+STAGES = {
+    "plaid": (fetch_plaid, plan_plaid),
+    "yapily": (fetch_yapily, plan_yapily),
+    "yaxi": (fetch_yaxi, plan_yaxi),
+    "flinks": (fetch_flinks, plan_flinks),
+    "opensanctions": (fetch_opensanctions, plan_opensanctions),
+}
+
+
+def http_summary(name: str) -> tuple[int, float]:
+    """Requests sent by a scraper's HTTP client, and the seconds they took."""
+    requests = 0
+    seconds = 0.0
+    for stats in MODULES[name].HTTP_CLIENT.timing_summary().values():
+        requests += stats["requests"]
+        seconds += stats["connect"] + stats["wait"] + stats["transfer"]
+    return requests, seconds
+
+
+def run_scrapers(names: list[str], options) -> list[ScraperStage]:
+    """
+    Fetch concurrently, then plan, write and report all scrapers as one run.
+
+    Args:
+        names: Scrapers to run (planned in SCRAPERS order)
+        options: Parsed command-line options
+
+    Returns:
+        The stages, with their status and timings
+    """
+    budget = threading.BoundedSemaphore(options.max_concurrency)
+    for name in names:
+        MODULES[name].HTTP_CLIENT.budget = budget
+
+    stages = [ScraperStage(name, *STAGES[name]) for name in SCRAPERS if name in names]
+    print(f"\n=== Fetching ({len(stages)} scrapers, at most {options.max_concurrency} requests in flight) ===\n")
+    with ThreadPoolExecutor(max_workers=len(stages), thread_name_prefix="fetch") as executor:
+        futures = [executor.submit(stage.run_fetch, options) for stage in stages]
+
+        # Loaded while the fetches run
+        start = time.perf_counter()
+        index = load_provider_index(ACCOUNT_PROVIDERS_PATH, verify=options.full)
+        print(f"Loaded {len(index.ids)} account providers in {time.perf_counter() - start:.1f}s")
+        session = WriteBackSession(index)
+
+        for stage, future in zip(stages, futures):
+            data = future.result()
+            if not data:
+                continue
+            print(f"\n=== Planning {stage.name} ===\n")
+            start = time.perf_counter()
+            stage.reconcile_plan, stage.finish = stage.plan(data, session, options)
+            if stage.reconcile_plan is not None and not options.dry_run:
+                stage.reconcile_plan.queue(session)
+            stage.plan_seconds = time.perf_counter() - start
+
+    if options.dry_run:
+        for stage in stages:
+            if stage.reconcile_plan is not None:
+                stage.reconcile_plan.print_plan()
+        # The index includes the planned providers
+        unload_provider_index(index.providers_path)
+        return stages
+
+    print(f"\n=== Writing {len(session)} provider files ===\n")
+    start = time.perf_counter()
+    changes = session.flush()
+    print(f"Flushed in {time.perf_counter() - start:.1f}s")
+    session.print_schema_summary()
+    index.save()
+
+    for stage in stages:
+        if stage.finish is None:
+            continue
+        print(f"\n=== Reporting {stage.name} ===\n")
+        start = time.perf_counter()
+        stage.finish(changes)
+        stage.finish_seconds = time.perf_counter() - start
+    return stages
+
+
+def print_report(stages: list[ScraperStage], run_start: float, wall_seconds: float) -> None:
+    """Print the wall-clock table of a run."""
+    print(f"\n{'scraper':<15}{'started':>9}{'fetch':>9}{'requests':>10}{'http':>9}"
+          f"{'plan':>9}{'report':>9}  status")
+    for stage in stages:
+        requests, http_seconds = http_summary(stage.name)
+        print(f"{stage.name:<15}{stage.fetch_started - run_start:>8.1f}s{stage.fetch_seconds:>8.1f}s"
+              f"{requests:>10}{http_seconds:>8.1f}s{stage.plan_seconds:>8.1f}s{stage.finish_seconds:>8.1f}s"
+              f"  {stage.status}")
+    fetches = [stage.fetch_seconds for stage in stages]
+    print(f"\nWall clock {wall_seconds:.1f}s: slowest fetch {max(fetches, default=0):.1f}s, "
+          f"all fetches {sum(fetches):.1f}s if run one after another")
+
+
+def main():
+    """Main entry point with argument parsing."""
+    parser = argparse.ArgumentParser(description="Run all scrapers in one process with a shared provider index")
+    parser.add_argument(
+        "--scrapers",
+        default=",".join(SCRAPERS),
+        help=f"Comma-separated scrapers to run (default: {','.join(SCRAPERS)})"
+    )
+    parser.add_argument(
+        "--max-concurrency",
+        type=int,
+        default=DEFAULT_MAX_CONCURRENCY,
+        help=f"HTTP requests in flight across all scrapers (default: {DEFAULT_MAX_CONCURRENCY})"
+    )
+    parser.add_argument(
+        "--plaid-workers",
+        type=int,
+        default=plaid_scraper.DEFAULT_WORKERS,
+        help=f"Countries fetched concurrently from the Plaid API (default: {plaid_scraper.DEFAULT_WORKERS})"
+    )
+    parser.add_argument(
+        "--plaid-rate-limit",
+        type=float,
+        default=plaid_scraper.DEFAULT_RATE_LIMIT,
+        help=f"Maximum Plaid API requests per second (default: {plaid_scraper.DEFAULT_RATE_LIMIT:g})"
+    )
+    parser.add_argument(
+        "--opensanctions-workers",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="Processes used to parse the OpenSanctions data file (default: CPU count)"
+    )
+    parser.add_argument(
+        "--full",
+        action="store_true",
+        help="Reconcile every institution, ignoring the Plaid, Yapily, YAXI and Flinks snapshots, "
+             "and re-download and reprocess every OpenSanctions entity, ignoring the ledger; "
+             "provider files are checked for edits made in place"
+    )
+    parser.add_argument(
+        "--apply-fuzzy",
+        action="store_true",
+        help="Add the aggregator to providers found only by fuzzy name matching (default: report them)"
+    )
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="Show the planned provider changes without making any"
+    )
+    add_cache_arguments(parser)
+    args = parser.parse_args()
+
+    names = [name.strip() for name in args.scrapers.split(",") if name.strip()]
+    unknown = sorted(set(names) - set(SCRAPERS))
+    if unknown:
+        parser.error(f"unknown scrapers: {', '.join(unknown)}")
+    if args.max_concurrency < 1:
+        parser.error("--max-concurrency must be at least 1")
+    cache = cache_from_args(args)
+    for name in names:
+        if name != "opensanctions":
+            MODULES[name].HTTP_CLIENT.cache = cache
+
+    print("=" * 60)
+    print("All Scrapers")
+    print("=" * 60)
+    if args.dry_run:
+        print("\n*** DRY RUN - No files will be modified ***")
+
+    run_start = time.perf_counter()
+    stages = run_scrapers(names, args)
+    print_report(stages, run_start, time.perf_counter() - run_start)
+
+    print("\n" + "=" * 60)
+    print("Done!")
+    print("=" * 60)
+    return 1 if any(stage.status == "fetch failed" for stage in stages) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
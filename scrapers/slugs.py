@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Shared Provider ID Slugs
+
+One slugify() for all scrapers. It produces the same output as the per-scraper
+copies it replaces (transliterate, lowercase, drop special characters, turn
+whitespace/hyphen runs into single hyphens), but in two passes over the name
+instead of ~120:
+
+- str.translate() with a table built once from TRANSLITERATIONS
+- one regex over the runs of characters that are not [a-z0-9]: a run becomes
+  a hyphen if it contains whitespace or a hyphen, and disappears otherwise
+
+Results are memoized, since the same names come up across scrapers and runs.
+
+Usage:
+    from slugs import slugify, slugify_truncated
+
+    slugify("Crédit Agricole S.A.")            # 'credit-agricole-sa'
+    slugify_truncated(long_name)               # OpenSanctions IDs, max 80 chars
+
+Check against the previous implementation and time it with:
+    python scrapers/benchmarks/bench_slugify.py
+"""
+
+import re
+from functools import lru_cache
+
+# Transliteration map for special characters (uppercase variants are derived)
+TRANSLITERATIONS = {
+    'ä': 'ae', 'ö': 'oe', 'ü': 'ue', 'ß': 'ss',
+    'Ä': 'ae', 'Ö': 'oe', 'Ü': 'ue',
+    'á': 'a', 'à': 'a', 'â': 'a', 'ã': 'a', 'å': 'a', 'ą': 'a',
+    'é': 'e', 'è': 'e', 'ê': 'e', 'ë': 'e', 'ę': 'e', 'ě': 'e',
+    'í': 'i', 'ì': 'i', 'î': 'i', 'ï': 'i',
+    'ó': 'o', 'ò': 'o', 'ô': 'o', 'õ': 'o', 'ø': 'o', 'ő': 'o',
+    'ú': 'u', 'ù': 'u', 'û': 'u', 'ű': 'u',
+    'ý': 'y', 'ÿ': 'y',
+    'ñ': 'n', 'ń': 'n',
+    'ç': 'c', 'ć': 'c', 'č': 'c',
+    'ş': 's', 'ś': 's', 'š': 's',
+    'ž': 'z', 'ź': 'z', 'ż': 'z',
+    'ł': 'l', 'đ': 'd', 'ř': 'r',
+    'ţ': 't', 'ť': 't',
+    'æ': 'ae', 'œ': 'oe',
+    'ă': 'a', 'ș': 's', 'ț': 't',
+}
+
+# Maximum length of OpenSanctions provider IDs
+MAX_SLUG_LENGTH = 80
+
+# Cache size for memoized slugs
+SLUG_CACHE_SIZE = 65536
+
+
+def _build_translation_table() -> dict[int, str]:
+    """Build the str.translate() table for TRANSLITERATIONS and their uppercase forms."""
+    table = {}
+    for char, replacement in TRANSLITERATIONS.items():
+        table[ord(char)] = replacement
+        upper = char.upper()
+        # 'ß'.upper() is 'SS', which lowercasing takes care of anyway
+        if len(upper) == 1:
+            table.setdefault(ord(upper), replacement)
+    return table
+
+
+TRANSLATION_TABLE = _build_translation_table()
+
+# Runs of characters that are not kept as-is in a slug
+SEPARATOR_RUN_REGEX = re.compile(r'[^a-z0-9]+')
+SEPARATOR_CHAR_REGEX = re.compile(r'[\s-]')
+
+
+def _replace_run(match: re.Match) -> str:
+    """Replace a run of non-slug characters: '-' if it separated words, else ''."""
+    return '-' if SEPARATOR_CHAR_REGEX.search(match.group()) else ''
+
+
+@lru_cache(maxsize=SLUG_CACHE_SIZE)
+def slugify(name: str) -> str:
+    """
+    Convert a bank name to a slug suitable for use as an ID.
+
+    Args:
+        name: The bank name to convert
+
+    Returns:
+        A lowercase, hyphenated slug
+
+    Example:
+        >>> slugify("Royal Bank of Canada")
+        'royal-bank-of-canada'
+    """
+    slug = name.translate(TRANSLATION_TABLE).lower()
+    return SEPARATOR_RUN_REGEX.sub(_replace_run, slug).strip('-')
+
+
+def slugify_truncated(name: str, max_length: int = MAX_SLUG_LENGTH) -> str:
+    """
+    Slugify a name and cut it to max_length characters (OpenSanctions IDs).
+
+    The cut is applied after stripping hyphens, like the original OpenSanctions
+    implementation, so a truncated slug may end with a hyphen.
+    """
+    return slugify(name)[:max_length]
@@ -21,19 +21,22 @@ Yapily covers banks across Europe and other regions.
 
 import argparse
 import base64
+import http.client
 import json
 import os
-import re
 import time
 from pathlib import Path
-from typing import Optional
+from typing import Iterable, Iterator, Optional
 
-try:
-    import requests
-    HAS_REQUESTS = True
-except ImportError:
-    HAS_REQUESTS = False
-    import subprocess
+from aggregator_snapshot import AggregatorSnapshot
+from http_cache import add_cache_arguments, cache_from_args
+from http_client import HTTPClient, Response
+from json_stream import iter_array_items
+from json_writer import save_json
+from page_queue import DEFAULT_QUEUE_DEPTH, PageQueue
+from provider_index import ProviderIndex, load_provider_index
+from provider_reconcile import FUZZY, ReconcilePlan, reverse_id_mappings
+from slugs import slugify
 
 # Load .env file if it exists
 ENV_FILE = Path(__file__).parent / ".env"
@@ -54,9 +57,18 @@ BASE_PATH = Path(__file__).parent.parent
 YAPILY_JSON_PATH = BASE_PATH / "data" / "api-aggregators" / "yapily.json"
 ACCOUNT_PROVIDERS_PATH = BASE_PATH / "data" / "account-providers"
 YAPILY_INSTITUTION_IDS_PATH = Path(__file__).parent / "yapily_institution_ids.json"
+# Institutions of the last run, to reconcile only the changes (see aggregator_snapshot.py)
+SNAPSHOT_PATH = BASE_PATH / "scraped-data" / "yapily"
 
 # Request settings
 REQUEST_TIMEOUT = 60
+HTTP_CLIENT = HTTPClient(timeout=REQUEST_TIMEOUT)
+
+# Institutions per page handed from the streamed /institutions response to the planning
+STREAM_PAGE_SIZE = 100
+
+# Institution fields kept for the statistics and market coverage when streaming
+SUMMARY_KEYS = ("id", "name", "fullName", "countries")
 
 # Yapily sandbox/test institutions to skip
 YAPILY_TEST_INSTITUTION_IDS = {
@@ -246,39 +258,6 @@ COUNTRY_NAMES = {
     "SK": "Slovakia",
 }
 
-# Transliteration map for special characters
-TRANSLITERATIONS = {
-    'ä': 'ae', 'ö': 'oe', 'ü': 'ue', 'ß': 'ss',
-    'Ä': 'ae', 'Ö': 'oe', 'Ü': 'ue',
-    'á': 'a', 'à': 'a', 'â': 'a', 'ã': 'a', 'å': 'a', 'ą': 'a',
-    'é': 'e', 'è': 'e', 'ê': 'e', 'ë': 'e', 'ę': 'e', 'ě': 'e',
-    'í': 'i', 'ì': 'i', 'î': 'i', 'ï': 'i',
-    'ó': 'o', 'ò': 'o', 'ô': 'o', 'õ': 'o', 'ø': 'o', 'ő': 'o',
-    'ú': 'u', 'ù': 'u', 'û': 'u', 'ű': 'u',
-    'ý': 'y', 'ÿ': 'y',
-    'ñ': 'n', 'ń': 'n',
-    'ç': 'c', 'ć': 'c', 'č': 'c',
-    'ş': 's', 'ś': 's', 'š': 's',
-    'ž': 'z', 'ź': 'z', 'ż': 'z',
-    'ł': 'l', 'đ': 'd', 'ř': 'r',
-    'ţ': 't', 'ť': 't',
-    'æ': 'ae', 'œ': 'oe',
-    'ă': 'a', 'ș': 's', 'ț': 't',
-}
-
-
-def slugify(name: str) -> str:
-    """Convert a name to a slug."""
-    slug = name
-    for char, replacement in TRANSLITERATIONS.items():
-        slug = slug.replace(char, replacement)
-        slug = slug.replace(char.upper(), replacement)
-    slug = slug.lower()
-    slug = re.sub(r'[^a-z0-9\s-]', '', slug)
-    slug = re.sub(r'\s+', '-', slug)
-    slug = re.sub(r'-+', '-', slug)
-    return slug.strip('-')
-
 
 def get_auth_header() -> Optional[str]:
     """Generate the Basic Auth header for Yapily API."""
@@ -294,52 +273,37 @@ def get_auth_header() -> Optional[str]:
     return f"Basic {encoded}"
 
 
-def yapily_api_request(endpoint: str, params: dict = None) -> Optional[dict]:
-    """Make a GET request to Yapily API."""
+def get_api_headers() -> Optional[dict]:
+    """Headers of a Yapily API request (None without credentials)."""
     auth_header = get_auth_header()
     
     if not auth_header:
         return None
     
-    url = f"{YAPILY_API_URL}{endpoint}"
-    
-    headers = {
+    return {
         "Authorization": auth_header,
         "Accept": "application/json",
         "User-Agent": "OpenBankingTracker/1.0"
     }
+
+
+def yapily_api_request(endpoint: str, params: dict = None) -> Optional[dict]:
+    """Make a GET request to Yapily API."""
+    headers = get_api_headers()
+    
+    if not headers:
+        return None
+    
+    url = f"{YAPILY_API_URL}{endpoint}"
     
     print(f"  API request to {endpoint}...")
     try:
-        if HAS_REQUESTS:
-            response = requests.get(url, params=params, headers=headers, timeout=REQUEST_TIMEOUT)
-            if response.status_code == 200:
-                return response.json()
-            print(f"  Request failed: {response.status_code} - {response.text[:200]}")
-            return None
-        else:
-            # Fallback to curl
-            cmd = [
-                "curl", "-s", "-X", "GET", url,
-                "-H", f"Authorization: {auth_header}",
-                "-H", "Accept: application/json",
-                "-H", "User-Agent: OpenBankingTracker/1.0"
-            ]
-            
-            if params:
-                query_string = "&".join(f"{k}={v}" for k, v in params.items())
-                cmd[4] = f"{url}?{query_string}"
-            
-            result = subprocess.run(
-                cmd,
-                capture_output=True,
-                text=True,
-                timeout=REQUEST_TIMEOUT
-            )
-            if result.returncode == 0 and result.stdout:
-                return json.loads(result.stdout)
-            return None
-    except Exception as e:
+        response = HTTP_CLIENT.get(url, headers=headers, params=params)
+        if response.status == 200:
+            return response.json()
+        print(f"  Request failed: {response.status} - {response.text[:200]}")
+        return None
+    except (OSError, http.client.HTTPException, ValueError) as e:
         print(f"  Warning: API request failed: {e}")
         return None
 
@@ -375,25 +339,82 @@ def get_yapily_institutions() -> list[dict]:
     return institutions
 
 
-def load_json(path: Path) -> dict:
-    """Load a JSON file."""
-    with open(path, "r", encoding="utf-8") as f:
-        return json.load(f)
+def stream_yapily_institutions(queue_depth: int = DEFAULT_QUEUE_DEPTH) -> PageQueue:
+    """
+    Start fetching all institutions from Yapily API in the background.
+
+    The /institutions response is one JSON document; its "data" array is
+    parsed item by item as the body downloads (json_stream), and handed on
+    in pages of STREAM_PAGE_SIZE institutions, so planning starts before the
+    download ends. A response the HTTP cache can answer without a request
+    (--offline, or a fresh entry) is read whole and split into pages;
+    otherwise the streamed body is stored in the cache once it was read.
+
+    Args:
+        queue_depth: Pages buffered before the download waits for the consumer
+
+    Returns:
+        The page queue; consume it in a `with` block
+    """
+    print(f"Fetching institutions from Yapily API (streaming through a queue of {queue_depth} pages)...")
+
+    def produce(pages: PageQueue) -> None:
+        headers = get_api_headers()
+        if not headers:
+            print("  Failed to fetch institutions")
+            return
+        url = f"{YAPILY_API_URL}/institutions"
+        cache = HTTP_CLIENT.cache
+        try:
+            cached = cache.cached("GET", url, None, headers) if cache is not None else None
+            if cached is not None:
+                institutions = cached.json().get("data") or []
+                print(f"  Fetched {len(institutions)} institutions (from the HTTP cache)")
+                for start in range(0, len(institutions), STREAM_PAGE_SIZE):
+                    pages.put(institutions[start:start + STREAM_PAGE_SIZE])
+                return
 
+            print("  API request to /institutions...")
+            with HTTP_CLIENT.stream("GET", url, headers=headers) as response:
+                if response.status != 200:
+                    body = response.read().decode("utf-8", errors="replace")
+                    print(f"  Request failed: {response.status} - {body[:200]}")
+                    return
+                # The body is kept only to be stored in the cache afterwards
+                chunks = [] if cache is not None else None
 
-def save_json(path: Path, data: dict) -> None:
-    """Save data to a JSON file."""
-    with open(path, "w", encoding="utf-8") as f:
-        json.dump(data, f, indent=2, ensure_ascii=False)
-        f.write("\n")
+                def read_body() -> Iterator[bytes]:
+                    for chunk in response.iter_bytes():
+                        if chunks is not None:
+                            chunks.append(chunk)
+                        yield chunk
 
+                body = read_body()
+                page = []
+                for institution in iter_array_items(body, "data"):
+                    page.append(institution)
+                    if len(page) == STREAM_PAGE_SIZE:
+                        pages.put(page)
+                        page = []
+                if page:
+                    pages.put(page)
+                # Trailing whitespace, so the connection is released for reuse
+                for _ in body:
+                    pass
+            if chunks is not None:
+                cache.store_response("GET", url, None, headers,
+                                     Response(response.status, response.headers, b"".join(chunks),
+                                              response.url, response.timing))
+        except (OSError, http.client.HTTPException, ValueError) as e:
+            print(f"  Warning: API request failed: {e}")
 
-def get_existing_provider_ids() -> set[str]:
-    """Get the set of existing account provider IDs."""
-    provider_ids = set()
-    for json_file in ACCOUNT_PROVIDERS_PATH.glob("*.json"):
-        provider_ids.add(json_file.stem)
-    return provider_ids
+    return PageQueue(queue_depth).start(produce)
+
+
+def load_json(path: Path) -> dict:
+    """Load a JSON file."""
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
 
 
 def find_matching_provider(bank_id: str, existing_ids: set[str]) -> Optional[str]:
@@ -440,9 +461,7 @@ def load_yapily_institution_ids() -> dict:
 
 def save_yapily_institution_ids(mappings: dict) -> None:
     """Save the Yapily institution ID mappings."""
-    with open(YAPILY_INSTITUTION_IDS_PATH, "w", encoding="utf-8") as f:
-        json.dump(mappings, f, indent=2, ensure_ascii=False)
-        f.write("\n")
+    save_json(YAPILY_INSTITUTION_IDS_PATH, mappings)
 
 
 def get_countries_from_institution(institution: dict) -> list[str]:
@@ -489,6 +508,27 @@ def get_icon_url_from_institution(institution: dict) -> Optional[str]:
     return None
 
 
+def snapshot_record(institution: dict) -> dict:
+    """The fields of an institution that provider reconciliation uses."""
+    return {
+        "name": institution.get("name"),
+        "fullName": institution.get("fullName"),
+        "countries": get_countries_from_institution(institution),
+        "icon": get_icon_url_from_institution(institution),
+    }
+
+
+def institution_snapshot(full: bool = False) -> AggregatorSnapshot:
+    """
+    The institutions of the last run, to reconcile only the ones that changed.
+
+    Args:
+        full: Reconcile every institution, not only the changed ones
+    """
+    return AggregatorSnapshot("yapily", SNAPSHOT_PATH, key=lambda institution: institution.get("id", ""),
+                              normalize=snapshot_record, full=full)
+
+
 def create_account_provider(institution: dict) -> dict:
     """Create a new account provider entry from Yapily institution data."""
     name = institution.get("name") or institution.get("fullName", "Unknown")
@@ -528,24 +568,6 @@ def create_account_provider(institution: dict) -> dict:
     return provider
 
 
-def add_yapily_to_existing_provider(provider_path: Path) -> bool:
-    """Add 'yapily' to an existing provider's apiAggregators list."""
-    provider = load_json(provider_path)
-    
-    aggregators = provider.get("apiAggregators", [])
-    if aggregators is None:
-        aggregators = []
-    
-    if "yapily" not in aggregators:
-        aggregators.append("yapily")
-        aggregators.sort()
-        provider["apiAggregators"] = aggregators
-        save_json(provider_path, provider)
-        return True
-    
-    return False
-
-
 def is_test_institution(institution: dict) -> bool:
     """Check if an institution is a test/sandbox institution."""
     inst_id = institution.get("id", "").lower()
@@ -607,65 +629,64 @@ def update_yapily_coverage(institutions: list[dict], use_known_coverage: bool =
         print("  No changes to market coverage.")
 
 
-def update_bank_providers_from_known_list() -> None:
-    """Update account providers using the known Yapily banks list."""
+def update_bank_providers_from_known_list(dry_run: bool = False, apply_fuzzy: bool = False) -> None:
+    """Update account providers using the known Yapily banks list (fuzzy matches are reported only)."""
     print("\n=== Updating Bank Providers (from known list) ===\n")
     
     print(f"Processing {len(YAPILY_KNOWN_BANKS)} known Yapily banks...")
     
-    existing_ids = get_existing_provider_ids()
-    print(f"Found {len(existing_ids)} existing account providers")
+    index = load_provider_index(ACCOUNT_PROVIDERS_PATH)
+    print(f"Found {len(index.ids)} existing account providers")
     
-    updated_count = 0
-    skipped_count = 0
-    not_found_count = 0
+    # Plan all changes in memory; files are written once, when the plan is executed
+    plan = ReconcilePlan(index, "yapily", apply_fuzzy=apply_fuzzy)
     
     for bank in YAPILY_KNOWN_BANKS:
         bank_id = bank["id"]
         name = bank["name"]
         
         # Try to find a matching existing provider
-        matching_id = find_matching_provider(bank_id, existing_ids)
-        
+        matching_id, score = plan.match(name, bank_id, bank["countries"][0], find_matching_provider)
         if matching_id:
-            provider_path = ACCOUNT_PROVIDERS_PATH / f"{matching_id}.json"
-            if add_yapily_to_existing_provider(provider_path):
-                updated_count += 1
-                if matching_id != bank_id:
-                    print(f"  Updated: {name} -> {matching_id}.json (added yapily)")
-                else:
-                    print(f"  Updated: {name} (added yapily)")
-            else:
-                skipped_count += 1
+            plan.update(name, bank_id, matching_id, score=score)
         else:
-            not_found_count += 1
+            plan.skip(name, "not found in existing providers")
     
-    print(f"\nSummary:")
-    print(f"  {updated_count} providers updated with yapily aggregator")
-    print(f"  {skipped_count} already had yapily (no changes needed)")
-    print(f"  {not_found_count} not found in existing providers (skipped)")
-
-
-def update_bank_providers(institutions: list[dict], skip_providers: bool = False) -> None:
-    """Create/update account providers from fetched institution data."""
-    print("\n=== Updating Bank Providers ===\n")
-    
-    if skip_providers:
-        print("Skipping provider updates (--skip-providers flag set)")
+    if dry_run:
+        plan.print_plan()
+        plan.discard()
         return
     
-    print(f"Processing {len(institutions)} institutions...")
-    
-    existing_ids = get_existing_provider_ids()
-    print(f"Found {len(existing_ids)} existing account providers")
+    stats = plan.execute()
     
+    print(f"\nSummary:")
+    print(f"  {stats['updated']} providers updated with yapily aggregator")
+    print(f"  {stats['unchanged']} already had yapily (no changes needed)")
+    print(f"  {stats['fuzzy']} fuzzy matches not applied (use --apply-fuzzy)")
+    print(f"  {stats['skipped']} not found in existing providers (skipped)")
+
+
+def plan_bank_providers(institutions: Iterable[dict], index: ProviderIndex,
+                        apply_fuzzy: bool = False) -> tuple[ReconcilePlan, dict]:
+    """
+    Match fetched institutions against the providers and plan the changes.
+
+    Args:
+        institutions: Institutions from get_yapily_institutions(), or the
+            items of a stream_yapily_institutions() queue
+        index: The provider index (planned providers are added to it)
+        apply_fuzzy: Update providers found only by fuzzy matching (default:
+            report them)
+
+    Returns:
+        Tuple of (plan, Yapily institution ID mappings including this run's)
+    """
     # Load existing Yapily institution ID mappings
     yapily_id_mappings = load_yapily_institution_ids()
     
-    new_count = 0
-    updated_count = 0
-    skipped_count = 0
-    skipped_test = 0
+    # Plan all changes in memory; files are written once, when the plan is executed.
+    # Institutions mapped in earlier runs go straight to their provider.
+    plan = ReconcilePlan(index, "yapily", reverse_id_mappings(yapily_id_mappings), apply_fuzzy=apply_fuzzy)
     
     for institution in institutions:
         name = institution.get("name") or institution.get("fullName", "")
@@ -674,50 +695,143 @@ def update_bank_providers(institutions: list[dict], skip_providers: bool = False
         
         # Skip test institutions
         if is_test_institution(institution):
-            skipped_test += 1
+            plan.skip(name, "test/sandbox institution")
             continue
         
         inst_id = institution.get("id", "")
+        if plan.known(name, inst_id, source=institution):
+            continue
+        
         bank_id = slugify(name)
         
         if not bank_id:
             continue
         
-        matching_id = find_matching_provider(bank_id, existing_ids)
-        
+        countries = get_countries_from_institution(institution)
+        matching_id, score = plan.match(name, bank_id, countries[0] if countries else None,
+                                        find_matching_provider)
         if matching_id:
-            provider_path = ACCOUNT_PROVIDERS_PATH / f"{matching_id}.json"
-            if add_yapily_to_existing_provider(provider_path):
-                updated_count += 1
-                if matching_id != bank_id:
-                    print(f"  Updated: {name} -> {matching_id}.json (added yapily)")
-                else:
-                    print(f"  Updated: {name} (added yapily)")
-            else:
-                skipped_count += 1
-            # Save institution ID mapping
-            if inst_id:
-                yapily_id_mappings[matching_id] = inst_id
+            entry = plan.update(name, bank_id, matching_id, score=score, source=institution)
         else:
-            provider_path = ACCOUNT_PROVIDERS_PATH / f"{bank_id}.json"
-            provider = create_account_provider(institution)
-            save_json(provider_path, provider)
-            existing_ids.add(bank_id)
-            new_count += 1
-            print(f"  Created: {name} ({bank_id}.json)")
-            # Save institution ID mapping
-            if inst_id:
-                yapily_id_mappings[bank_id] = inst_id
-    
-    # Save updated institution ID mappings
+            entry = plan.create(name, create_account_provider(institution), source=institution)
+        # Save institution ID mapping (not for fuzzy matches that are only reported)
+        if inst_id and entry.action != FUZZY:
+            yapily_id_mappings[matching_id or bank_id] = inst_id
+    
+    print(f"{plan.known_count} institutions found by their Yapily institution ID (not matched again)")
+    return plan, yapily_id_mappings
+
+
+def report_bank_providers(stats: dict, yapily_id_mappings: dict) -> None:
+    """Save the institution ID mappings and print the summary of an executed plan."""
     save_yapily_institution_ids(yapily_id_mappings)
     print(f"\nSaved {len(yapily_id_mappings)} Yapily institution ID mappings to yapily_institution_ids.json")
     
     print(f"\nSummary:")
-    print(f"  {new_count} new providers created")
-    print(f"  {updated_count} updated with yapily aggregator")
-    print(f"  {skipped_count} already had yapily (no changes needed)")
-    print(f"  {skipped_test} test/sandbox institutions skipped")
+    print(f"  {stats['created']} new providers created")
+    print(f"  {stats['updated']} updated with yapily aggregator")
+    print(f"  {stats['unchanged']} already had yapily (no changes needed)")
+    print(f"  {stats['conflicts']} conflicting names merged into new providers")
+    print(f"  {stats['fuzzy']} fuzzy matches not applied (use --apply-fuzzy)")
+    print(f"  {stats['skipped']} test/sandbox institutions skipped")
+
+
+def update_bank_providers(institutions: list[dict], skip_providers: bool = False, dry_run: bool = False,
+                          full: bool = False, apply_fuzzy: bool = False) -> None:
+    """
+    Create/update account providers from fetched institution data.
+
+    Args:
+        institutions: Institutions from get_yapily_institutions()
+        skip_providers: Do nothing
+        dry_run: Print the planned changes instead of making them
+        full: Reconcile every institution, not only the ones that changed
+            since the last run's snapshot, and check every provider file
+            for edits made in place
+        apply_fuzzy: Update providers found only by fuzzy matching (default:
+            report them)
+    """
+    print("\n=== Updating Bank Providers ===\n")
+    
+    if skip_providers:
+        print("Skipping provider updates (--skip-providers flag set)")
+        return
+    
+    print(f"Processing {len(institutions)} institutions...")
+    
+    index = load_provider_index(ACCOUNT_PROVIDERS_PATH, verify=full)
+    print(f"Found {len(index.ids)} existing account providers")
+    
+    snapshot = institution_snapshot(full)
+    plan, yapily_id_mappings = plan_bank_providers(snapshot.delta(institutions), index, apply_fuzzy)
+    snapshot.print_report()
+    
+    if dry_run:
+        plan.print_plan()
+        plan.discard()
+        return
+    
+    stats = plan.execute()
+    index.save()
+    report_bank_providers(stats, yapily_id_mappings)
+    snapshot.forget(plan.unapplied())
+    snapshot.save()
+
+
+def stream_bank_providers(queue_depth: int = DEFAULT_QUEUE_DEPTH, dry_run: bool = False,
+                          full: bool = False, apply_fuzzy: bool = False) -> list[dict]:
+    """
+    Fetch institutions and create/update account providers while they download.
+
+    Args:
+        queue_depth: Pages buffered between the download and the planning
+        dry_run: Print the planned changes instead of making them
+        full: Reconcile every institution, not only the ones that changed
+            since the last run's snapshot, and check every provider file
+            for edits made in place
+        apply_fuzzy: Update providers found only by fuzzy matching (default:
+            report them)
+
+    Returns:
+        The fetched institutions with only SUMMARY_KEYS, for the statistics
+        and market coverage
+    """
+    print("\n=== Updating Bank Providers ===\n")
+    
+    summaries = []
+    snapshot = institution_snapshot(full)
+    
+    def summarize(institutions):
+        for institution in institutions:
+            summaries.append({key: institution[key] for key in SUMMARY_KEYS if key in institution})
+            yield institution
+    
+    with stream_yapily_institutions(queue_depth) as pages:
+        # Loaded while the response downloads
+        index = load_provider_index(ACCOUNT_PROVIDERS_PATH, verify=full)
+        print(f"Found {len(index.ids)} existing account providers")
+        plan, yapily_id_mappings = plan_bank_providers(snapshot.delta(summarize(pages.items())), index,
+                                                       apply_fuzzy)
+    print(f"Processed {pages.items_consumed} institutions from {pages.pages_consumed} pages "
+          f"(at most {pages.peak} of {pages.depth} pages buffered)")
+    
+    if not summaries:
+        print("No institutions fetched. Skipping provider updates.")
+        return summaries
+    
+    snapshot.print_report()
+    
+    if dry_run:
+        plan.print_plan()
+        plan.discard()
+        return summaries
+    
+    stats = plan.execute()
+    index.save()
+    report_bank_providers(stats, yapily_id_mappings)
+    snapshot.forget(plan.unapplied())
+    snapshot.save()
+    return summaries
 
 
 def print_statistics(institutions: list[dict]) -> None:
@@ -763,7 +877,7 @@ Examples:
     # Only update market coverage (skip provider updates)
     python yapily_scraper.py --coverage-only
     
-    # Show statistics only (dry run)
+    # Show statistics and the planned provider changes (dry run)
     python yapily_scraper.py --dry-run
 
 Credentials:
@@ -801,8 +915,32 @@ Credentials:
         action="store_true",
         help="Update market coverage using known Yapily countries (no API call needed)"
     )
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="Match institutions while the /institutions response is still downloading"
+    )
+    parser.add_argument(
+        "--queue-depth",
+        type=int,
+        default=DEFAULT_QUEUE_DEPTH,
+        help=f"Pages of {STREAM_PAGE_SIZE} institutions buffered with --stream (default: {DEFAULT_QUEUE_DEPTH})"
+    )
+    parser.add_argument(
+        "--full",
+        action="store_true",
+        help="Reconcile every institution, not only those changed since the last run's snapshot, "
+             "and check provider files for edits made in place"
+    )
+    parser.add_argument(
+        "--apply-fuzzy",
+        action="store_true",
+        help="Add the aggregator to providers found only by fuzzy name matching (default: report them)"
+    )
     
+    add_cache_arguments(parser)
     args = parser.parse_args()
+    HTTP_CLIENT.cache = cache_from_args(args)
     
     print("=" * 60)
     print("Yapily Coverage Scraper")
@@ -813,11 +951,10 @@ Credentials:
         print("\nUsing known Yapily coverage (no API call)...")
         if not args.dry_run:
             update_yapily_coverage([], use_known_coverage=True)
-            if not args.coverage_only and not args.skip_providers:
-                update_bank_providers_from_known_list()
         else:
             print(f"\n[DRY RUN] Would update market coverage with {len(YAPILY_KNOWN_COUNTRIES)} countries")
-            print(f"[DRY RUN] Would update providers from {len(YAPILY_KNOWN_BANKS)} known banks")
+        if not args.coverage_only and not args.skip_providers:
+            update_bank_providers_from_known_list(dry_run=args.dry_run, apply_fuzzy=args.apply_fuzzy)
         
         print("\n" + "=" * 60)
         print("Done!")
@@ -841,8 +978,13 @@ Credentials:
     
     print("\nYapily API credentials detected.")
     
-    # Fetch institutions
-    institutions = get_yapily_institutions()
+    # Fetch institutions (with --stream, providers are updated while they download)
+    streamed = args.stream and not (args.coverage_only or args.skip_providers or args.stats_only)
+    if streamed:
+        institutions = stream_bank_providers(args.queue_depth, dry_run=args.dry_run, full=args.full,
+                                             apply_fuzzy=args.apply_fuzzy)
+    else:
+        institutions = get_yapily_institutions()
     
     if not institutions:
         print("\n" + "=" * 60)
@@ -862,7 +1004,7 @@ Credentials:
         if not args.dry_run and not args.stats_only:
             update_yapily_coverage([], use_known_coverage=True)
             if not args.coverage_only and not args.skip_providers:
-                update_bank_providers_from_known_list()
+                update_bank_providers_from_known_list(apply_fuzzy=args.apply_fuzzy)
         
         print("\n" + "=" * 60)
         print("Done!")
@@ -885,14 +1027,14 @@ Credentials:
     else:
         print("\n[DRY RUN] Would update market coverage")
     
-    # Update providers
-    if not args.coverage_only:
-        if not args.dry_run:
-            update_bank_providers(institutions, skip_providers=args.skip_providers)
-        else:
-            print("[DRY RUN] Would process bank providers")
-    else:
+    # Update providers (done while downloading with --stream)
+    if args.coverage_only:
         print("\nSkipping provider updates (--coverage-only flag set)")
+    elif not streamed:
+        update_bank_providers(institutions, skip_providers=args.skip_providers, dry_run=args.dry_run,
+                              full=args.full, apply_fuzzy=args.apply_fuzzy)
+    
+    HTTP_CLIENT.print_timings()
     
     print("\n" + "=" * 60)
     print("Done!")
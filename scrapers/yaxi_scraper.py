@@ -8,18 +8,30 @@ Sources:
 - https://docs.yaxi.tech/getting-started.html
 """
 
+import argparse
+import http.client
 import json
-import subprocess
 from pathlib import Path
-from urllib.request import urlopen, Request
+from typing import Iterable, Optional
 
-from plaid_scraper import load_json, save_json, slugify
+from aggregator_snapshot import AggregatorSnapshot
+from http_cache import add_cache_arguments, cache_from_args
+from http_client import HTTPClient
+from json_writer import save_json
+from provider_index import ProviderIndex, load_provider_index
+from provider_reconcile import FUZZY, ReconcilePlan, reverse_id_mappings
+from slugs import slugify
 
 BASE_PATH = Path(__file__).parent.parent
 ACCOUNT_PROVIDERS_PATH = BASE_PATH / "data" / "account-providers"
 CONNECTION_IDS_PATH = Path(__file__).parent / "yaxi_connection_ids.json"
+# Connections of the last run, to reconcile only the changes (see aggregator_snapshot.py)
+SNAPSHOT_PATH = BASE_PATH / "scraped-data" / "yaxi"
+
+YAXI_SEARCH_URL = "https://api.yaxi.tech/search"
 
 REQUEST_TIMEOUT = 30
+HTTP_CLIENT = HTTPClient(timeout=REQUEST_TIMEOUT)
 
 def create_account_provider(connection: dict) -> dict:
     name = connection["displayName"]
@@ -53,94 +65,162 @@ def create_account_provider(connection: dict) -> dict:
     return provider
 
 
-def add_to_existing_provider(provider_path: Path) -> bool:
-    provider = load_json(provider_path)
-
-    aggregators = provider.get("apiAggregators", [])
-    if aggregators is None:
-        aggregators = []
+def connection_snapshot(full: bool = False) -> AggregatorSnapshot:
+    """
+    The connections of the last run, to reconcile only the ones that changed.
 
-    if "yaxi" not in aggregators:
-        aggregators.append("yaxi")
-        aggregators.sort()
-        provider["apiAggregators"] = aggregators
-        save_json(provider_path, provider)
-        return True
+    Args:
+        full: Reconcile every connection, not only the changed ones
+    """
+    return AggregatorSnapshot(
+        "yaxi", SNAPSHOT_PATH,
+        key=lambda connection: connection["id"],
+        normalize=lambda connection: {"name": connection["displayName"], "countries": connection["countries"]},
+        full=full,
+    )
 
-    return False
-
-
-def update_bank_providers() -> None:
-    """Fetch bank data from YAXI API and create/update account providers."""
-    print("\n=== Updating Bank Providers ===\n")
 
+def fetch_connections() -> Optional[list[dict]]:
+    """Fetch all connections from the YAXI search API (None if the request failed)."""
     print("Fetching connections from YAXI API...")
     try:
-        with urlopen(
-            Request(
-                url="https://api.yaxi.tech/search",
-                headers={"Content-Type": "application/json"},
-                data=b'{"filters": [{"term": ""}], "ibanDetection": false}',
-            ),
-            timeout=REQUEST_TIMEOUT,
-        ) as f:
-            connections = json.loads(f.read())
-    except Exception as e:
+        response = HTTP_CLIENT.post_json(
+            YAXI_SEARCH_URL,
+            {"filters": [{"term": ""}], "ibanDetection": False},
+        )
+        response.raise_for_status()
+        connections = response.json()
+    except (OSError, http.client.HTTPException, ValueError) as e:
         print(f"  Warning: API request failed: {e}")
-        return
+        return None
+    print(f"  {response.timing}")
+    return connections
 
-    print(f"Processing {len(connections)} connections...")
 
-    existing_ids = set()
-    for json_file in ACCOUNT_PROVIDERS_PATH.glob("*.json"):
-        existing_ids.add(json_file.stem)
-    print(f"Found {len(existing_ids)} existing account providers")
+def plan_bank_providers(connections: Iterable[dict], index: ProviderIndex,
+                        apply_fuzzy: bool = False) -> tuple[ReconcilePlan, dict]:
+    """
+    Match fetched connections against the providers and plan the changes.
 
+    Args:
+        connections: Connections from fetch_connections()
+        index: The provider index (planned providers are added to it)
+        apply_fuzzy: Update providers found only by fuzzy matching (default:
+            report them)
+
+    Returns:
+        Tuple of (plan, YAXI connection ID mappings including this run's)
+    """
     if CONNECTION_IDS_PATH.exists():
         with open(CONNECTION_IDS_PATH, "r", encoding="utf-8") as f:
             id_mappings = json.load(f)
     else:
         id_mappings = {}
 
-    new_count = 0
-    updated_count = 0
-    skipped_count = 0
+    # Plan all changes in memory; files are written once, when the plan is executed.
+    # Connections mapped in earlier runs go straight to their provider.
+    plan = ReconcilePlan(index, "yaxi", reverse_id_mappings(id_mappings), apply_fuzzy=apply_fuzzy)
 
     for connection in connections:
         name = connection["displayName"]
 
+        if plan.known(name, connection["id"], source=connection):
+            continue
+
         bank_id = slugify(name)
 
-        provider_path = ACCOUNT_PROVIDERS_PATH / f"{bank_id}.json"
+        countries = connection["countries"]
+        matching_id, score = plan.match(name, bank_id, countries[0] if countries else None)
 
-        if bank_id in existing_ids:
-            if add_to_existing_provider(provider_path):
-                updated_count += 1
-                print(f"  Updated: {name} (added yaxi)")
-            else:
-                skipped_count += 1
+        if matching_id:
+            entry = plan.update(name, bank_id, matching_id, score=score, source=connection)
         else:
-            provider = create_account_provider(connection)
-            save_json(provider_path, provider)
-            existing_ids.add(bank_id)
-            new_count += 1
-            print(f"  Created: {name} ({bank_id}.json)")
-        id_mappings[bank_id] = connection["id"]
-
-    with open(CONNECTION_IDS_PATH, "w", encoding="utf-8") as f:
-        json.dump(id_mappings, f, indent=2, ensure_ascii=False)
-        f.write("\n")
+            entry = plan.create(name, create_account_provider(connection), source=connection)
+        # Fuzzy matches that are only reported get no mapping
+        if entry.action != FUZZY:
+            id_mappings[matching_id or bank_id] = connection["id"]
+
+    print(f"{plan.known_count} connections found by their YAXI connection ID (not matched again)")
+    return plan, id_mappings
+
+
+def report_bank_providers(stats: dict, id_mappings: dict) -> None:
+    """Save the connection ID mappings and print the summary of an executed plan."""
+    save_json(CONNECTION_IDS_PATH, id_mappings)
     print(f"Saved {len(id_mappings)} YAXI connection ID mappings")
 
-    print(f"\nSummary: {new_count} new, {updated_count} updated, {skipped_count} already had yaxi")
+    print(f"\nSummary: {stats['created']} new, {stats['updated']} updated, "
+          f"{stats['unchanged']} already had yaxi, {stats['conflicts']} conflicting names merged, "
+          f"{stats['fuzzy']} fuzzy matches not applied")
+
+
+def update_bank_providers(dry_run: bool = False, full: bool = False, apply_fuzzy: bool = False) -> None:
+    """
+    Fetch bank data from YAXI API and create/update account providers.
+
+    Args:
+        dry_run: Print the planned changes instead of making them
+        full: Reconcile every connection, not only the ones that changed
+            since the last run's snapshot, and check every provider file
+            for edits made in place
+        apply_fuzzy: Update providers found only by fuzzy matching (default:
+            report them)
+    """
+    print("\n=== Updating Bank Providers ===\n")
+
+    connections = fetch_connections()
+    if connections is None:
+        return
+
+    print(f"Processing {len(connections)} connections...")
+
+    index = load_provider_index(ACCOUNT_PROVIDERS_PATH, verify=full)
+    print(f"Found {len(index.ids)} existing account providers")
+
+    snapshot = connection_snapshot(full)
+    plan, id_mappings = plan_bank_providers(snapshot.delta(connections), index, apply_fuzzy)
+    snapshot.print_report()
+
+    if dry_run:
+        plan.print_plan()
+        plan.discard()
+        return
+
+    stats = plan.execute()
+    index.save()
+    report_bank_providers(stats, id_mappings)
+    snapshot.forget(plan.unapplied())
+    snapshot.save()
+
 
 def main():
-    """Main entry point."""
+    """Main entry point with argument parsing."""
+    parser = argparse.ArgumentParser(description="Update YAXI bank providers")
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="Show the planned provider changes without making any"
+    )
+    parser.add_argument(
+        "--full",
+        action="store_true",
+        help="Reconcile every connection, not only those changed since the last run's snapshot, "
+             "and check provider files for edits made in place"
+    )
+    parser.add_argument(
+        "--apply-fuzzy",
+        action="store_true",
+        help="Add the aggregator to providers found only by fuzzy name matching (default: report them)"
+    )
+    add_cache_arguments(parser)
+    args = parser.parse_args()
+    HTTP_CLIENT.cache = cache_from_args(args)
+
     print("=" * 60)
     print("YAXI Coverage Scraper")
     print("=" * 60)
 
-    update_bank_providers()
+    update_bank_providers(dry_run=args.dry_run, full=args.full, apply_fuzzy=args.apply_fuzzy)
 
     print("\n" + "=" * 60)
     print("Done!")